@@ -0,0 +1,182 @@
+"""Answer a file of questions concurrently.
+
+    python batch.py questions.jsonl -o answers.jsonl --concurrency 32
+    cat questions.txt | python batch.py - --order completion
+
+Input lines are either JSON objects ({"id", "question", "user_type"?}) or
+plain question text. Output is one JSON object per input line, in input
+order by default. Input is streamed; at most a few windows of questions
+are held in memory at once.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import engine
+import openrouter_client
+import rate_limiter
+
+
+def parse_line(n, line):
+    """Turn one input line into a work item (None for blank lines)."""
+    line = line.strip()
+    if not line:
+        return None
+    if line.startswith("{"):
+        try:
+            item = json.loads(line)
+        except ValueError:
+            return {"id": n, "question": "", "error": "invalid JSON"}
+        item.setdefault("id", n)
+        return item
+    return {"id": n, "question": line}
+
+
+async def read_items(stream):
+    """Yield work items from a text stream without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    n = 0
+    while True:
+        line = await loop.run_in_executor(None, stream.readline)
+        if not line:
+            return
+        n += 1
+        item = parse_line(n, line)
+        if item is not None:
+            yield item
+
+
+class BatchRunner:
+    """Resolve custom responses inline, send misses upstream with bounded concurrency."""
+
+    def __init__(self, api_key, concurrency=16, use_cache=True):
+        self.api_key = api_key
+        self.concurrency = concurrency
+        self.use_cache = use_cache
+        self.counts = {"custom": 0, "model": 0, "error": 0}
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch")
+        self._slots = asyncio.Semaphore(concurrency)
+
+    async def answer(self, item):
+        """One output record; any failure becomes that item's error row."""
+        question = item.get("question")
+        # null or non-string questions are errors, not the text "None" sent upstream
+        record = {"id": item["id"], "question": question.strip() if isinstance(question, str) else question}
+        try:
+            return await self._answer(item, record)
+        except Exception as exc:  # e.g. a malformed upstream body; the rest of the batch goes on
+            record["error"] = f"{type(exc).__name__}: {exc}"
+            self.counts["error"] += 1
+            return record
+
+    async def _answer(self, item, record):
+        question = record["question"]
+        if item.get("error") or not question or not isinstance(question, str):
+            record["error"] = item.get("error") or "empty question"
+            self.counts["error"] += 1
+            return record
+
+        profile = item.get("user_type") or engine.detect_user_type(question)
+        record["profile"] = profile
+
+        match = engine.match_custom_response(question, profile)
+        if match:
+            record.update(source="custom", answer=match[0], match=match[1], score=match[2])
+            self.counts["custom"] += 1
+            return record
+
+        async with self._slots:
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(
+                self._executor,
+                lambda: engine.call_deepseek_api(question, self.api_key, use_cache=self.use_cache, user_type=profile),
+            )
+        if "choices" in result:
+            record.update(source="model", answer=result["choices"][0]["message"]["content"])
+            self.counts["model"] += 1
+        else:
+            record["error"] = result.get("error", "Unknown error")
+            self.counts["error"] += 1
+        return record
+
+    async def run(self, items, write, order="input"):
+        """Answer every item, calling write(record) in input or completion order."""
+        # bounds memory: a slow head-of-line item can hold back at most this many results
+        window = self.concurrency * 4
+        if order == "input":
+            pending = deque()
+            async for item in items:
+                pending.append(asyncio.ensure_future(self.answer(item)))
+                while len(pending) >= window or (pending and pending[0].done()):
+                    write(await pending.popleft())
+            while pending:
+                write(await pending.popleft())
+        else:
+            pending = set()
+            async for item in items:
+                pending.add(asyncio.ensure_future(self.answer(item)))
+                if len(pending) >= window:
+                    done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        write(task.result())
+            for task in asyncio.as_completed(pending):
+                write(await task)
+
+    def close(self):
+        self._executor.shutdown(wait=False)
+
+
+async def run_batch(stream, out, api_key, concurrency=16, order="input", use_cache=True):
+    runner = BatchRunner(api_key, concurrency=concurrency, use_cache=use_cache)
+
+    def write(record):
+        out.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    try:
+        await runner.run(read_items(stream), write, order=order)
+    finally:
+        out.flush()
+        runner.close()
+    return runner.counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Answer a JSONL/text file of questions concurrently.")
+    parser.add_argument("input", nargs="?", default="-", help="input file, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="output JSONL file, or - for stdout")
+    parser.add_argument("-c", "--concurrency", type=int, default=16, help="max in-flight upstream requests (also the rate limiter cap)")
+    parser.add_argument("--order", choices=["input", "completion"], default="input")
+    parser.add_argument("--no-cache", action="store_true", help="bypass the response cache")
+    args = parser.parse_args(argv)
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    api_key = os.getenv("OPENROUTER_API_KEY", "").strip()
+    # one pooled connection per in-flight request, and let the limiter admit as many
+    openrouter_client.configure(pool_size=args.concurrency)
+    rate_limiter.configure(max_concurrency=args.concurrency)
+
+    stream = sys.stdin if args.input == "-" else open(args.input, encoding="utf-8")
+    out = sys.stdout if args.output == "-" else open(args.output, "w", encoding="utf-8")
+    start = time.perf_counter()
+    try:
+        counts = asyncio.run(run_batch(stream, out, api_key, args.concurrency, args.order, not args.no_cache))
+    finally:
+        if stream is not sys.stdin:
+            stream.close()
+        if out is not sys.stdout:
+            out.close()
+    elapsed = time.perf_counter() - start
+    total = sum(counts.values())
+    print(f"{total} questions in {elapsed:.1f}s ({counts['custom']} custom, {counts['model']} model, "
+          f"{counts['error']} errors)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Benchmark: per-rerun chat rendering, full history vs ChatHistory window.
+
+    python benchmarks/bench_chat_history.py --messages 2000
+
+Streamlit itself isn't needed; this times building what each rerun sends
+(one markdown element per message before, one element for the window now)
+and the messages held in session state.
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from chat_history import ChatHistory  # noqa: E402
+
+
+def message_html(msg):
+    # same markup as streamlit_app.message_html
+    role = "user" if msg["role"] == "user" else "ai"
+    return f"<div class='msg {role}'>{msg['content']}</div><div class='clear'></div>"
+
+
+def per_rerun(fn, reruns):
+    start = time.perf_counter()
+    for _ in range(reruns):
+        fn()
+    return (time.perf_counter() - start) / reruns
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--window", type=int, default=50)
+    parser.add_argument("--memory", type=int, default=200)
+    parser.add_argument("--reruns", type=int, default=200)
+    args = parser.parse_args()
+
+    answer = "Here is a reasonably long answer with some <b>markup</b> in it. " * 8
+    plain = []
+    history = ChatHistory(message_html, max_in_memory=args.memory)
+    for n in range(args.messages):
+        role, content = ("user", f"question {n}?") if n % 2 == 0 else ("ai", answer)
+        plain.append({"role": role, "content": content})
+        history.append(role, content)
+
+    full = per_rerun(lambda: [message_html(m) for m in plain], args.reruns)
+    windowed = per_rerun(lambda: history.html(len(history) - args.window), args.reruns)
+    start = time.perf_counter()
+    history.html(0, args.window)
+    page_back = time.perf_counter() - start
+
+    print(f"messages:            {args.messages} ({history.spilled} spilled to disk)")
+    print(f"full history:        {full * 1e3:.2f} ms/rerun, {args.messages} elements")
+    print(f"window of {args.window}:        {windowed * 1e3:.3f} ms/rerun, 1 element ({full / windowed:.0f}x)")
+    print(f"page to the oldest:  {page_back * 1e3:.2f} ms (read back from disk)")
+    print(f"in session state:    {len(history) - history.spilled} messages (was {args.messages})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Benchmark: original per-keyword detect_user_type vs the compiled ProfileClassifier.
+
+    python benchmarks/bench_classifier.py --lines 1000000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from profile_classifier import PROFILE_KEYWORDS, ProfileClassifier  # noqa: E402
+
+VOCAB = ("the a of to and how can i my why does this code work please help with data "
+         "python list error fix run file should we use it for our when".split())
+
+
+def original_detect_user_type(question):
+    # the pre-classifier implementation: one any() scan per profile
+    question_lower = question.lower()
+    for name, words in PROFILE_KEYWORDS:
+        if any(word in question_lower for word in words):
+            return name
+    return "general"
+
+
+def make_corpus(lines, seed=0):
+    """Every line freshly generated (worst case: no repeats)."""
+    rnd = random.Random(seed)
+    keywords = [word for _, words in PROFILE_KEYWORDS for word in words]
+    corpus = []
+    for _ in range(lines):
+        words = rnd.choices(VOCAB, k=rnd.randint(4, 14))
+        if rnd.random() < 0.5:
+            words.insert(rnd.randint(0, len(words)), rnd.choice(keywords))
+        corpus.append(" ".join(words).capitalize() + "?")
+    return corpus
+
+
+def make_log_corpus(lines, distinct, seed=1):
+    """Log-like: lines drawn from `distinct` questions with a Zipf-ish skew."""
+    rnd = random.Random(seed)
+    pool = make_corpus(distinct, seed)
+    weights = [1 / (rank + 1) for rank in range(distinct)]
+    return rnd.choices(pool, weights=weights, k=lines)
+
+
+def best_of(runs, fn):
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = fn()
+        times.append(time.perf_counter() - start)
+    return min(times), result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lines", type=int, default=1_000_000)
+    parser.add_argument("--distinct", type=int, default=10_000, help="distinct questions in the log-like corpus")
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    classifier = ProfileClassifier()
+    corpora = [("unique lines", make_corpus(args.lines)),
+               (f"log-like ({args.distinct} distinct)", make_log_corpus(args.lines, args.distinct))]
+    print(f"lines: {args.lines}")
+    for name, corpus in corpora:
+        base, expected = best_of(args.runs, lambda: [original_detect_user_type(q) for q in corpus])
+        single, got_single = best_of(args.runs, lambda: [classifier.classify(q) for q in corpus])
+        batch, got_batch = best_of(args.runs, lambda: classifier.classify_many(corpus))
+        assert got_single == expected and got_batch == expected, "classifier disagrees with the original"
+
+        print(f"{name}:")
+        print(f"  original:        {base:.2f} s  ({args.lines / base:,.0f} lines/s)")
+        print(f"  classify():      {single:.2f} s  ({base / single:.2f}x)")
+        print(f"  classify_many(): {batch:.2f} s  ({base / batch:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
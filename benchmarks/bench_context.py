@@ -0,0 +1,58 @@
+"""Benchmark: prompt size and build time with chat_context vs the full history.
+
+    python benchmarks/bench_context.py --turns 200 --budget 1024
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from chat_context import Conversation, count_tokens, prompt  # noqa: E402
+
+
+def full_history(turns, question):
+    # every earlier turn, re-sent each time
+    messages = []
+    for q, a in turns:
+        messages.append({"role": "user", "content": prompt(q)})
+        messages.append({"role": "assistant", "content": a})
+    return messages + [{"role": "user", "content": prompt(question)}]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--turns", type=int, default=200)
+    parser.add_argument("--budget", type=int, default=1024)
+    args = parser.parse_args()
+
+    answer = "Python is a high-level language. " + "It has a large standard library and many packages. " * 6
+    conversation = Conversation(args.budget)
+    turns = []
+    packed_time = full_time = 0.0
+    packed_tokens = full_tokens = 0
+    for n in range(args.turns):
+        question = f"follow-up question number {n} about the previous answer?"
+        start = time.perf_counter()
+        messages, _ = conversation.messages(question)
+        conversation.add(question, answer)
+        packed_time += time.perf_counter() - start
+        packed_tokens = sum(count_tokens(m["content"]) for m in messages)
+
+        start = time.perf_counter()
+        messages = full_history(turns, question)
+        turns.append((question, answer))
+        full_time += time.perf_counter() - start
+        full_tokens = sum(count_tokens(m["content"]) for m in messages)
+
+    stats = conversation.stats()
+    print(f"turns:               {args.turns} (budget {args.budget} tokens)")
+    print(f"full history:        {full_tokens} tokens in the last prompt, {full_time / args.turns * 1e6:.1f} us/turn")
+    print(f"chat_context:        {packed_tokens} tokens in the last prompt, {packed_time / args.turns * 1e6:.1f} us/turn")
+    print(f"kept / summarized:   {stats['turns']} turns, {stats['summary_lines']} summary lines "
+          f"({stats['dropped']} dropped)")
+
+
+if __name__ == "__main__":
+    main()
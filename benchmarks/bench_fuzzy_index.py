@@ -0,0 +1,93 @@
+"""Benchmark: FuzzyIndex build, teach and typo-tolerant lookup.
+
+    python benchmarks/bench_fuzzy_index.py --entries 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from bench_response_index import make_keys  # noqa: E402
+from fuzzy_index import FuzzyIndex  # noqa: E402
+
+
+def typo(text, rnd):
+    """One random swap, drop or duplicate of a letter."""
+    i = rnd.randrange(max(1, len(text) - 1))
+    kind = rnd.randrange(3)
+    if kind == 0:
+        return text[:i] + text[i + 1:i + 2] + text[i:i + 1] + text[i + 2:]
+    if kind == 1:
+        return text[:i] + text[i + 1:]
+    return text[:i] + text[i] + text[i:]
+
+
+def best_of(runs, fn, questions):
+    """Per-question (mean, p50, p99) from the fastest of several runs, plus its results."""
+    best = None
+    for _ in range(runs):
+        times, results = [], []
+        for q in questions:
+            start = time.perf_counter()
+            results.append(fn(q))
+            times.append(time.perf_counter() - start)
+        if best is None or sum(times) < sum(best[0]):
+            best = times, results
+    times, results = best
+    ordered = sorted(times)
+    return (sum(times) / len(times), ordered[len(ordered) // 2], ordered[len(ordered) * 99 // 100]), results
+
+
+def fmt(stats):
+    mean, p50, p99 = stats
+    return f"{mean * 1e3:.3f} ms/question (p50 {p50 * 1e3:.3f}, p99 {p99 * 1e3:.2f})"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--questions", type=int, default=1000)
+    parser.add_argument("--threshold", type=float, default=None)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    rnd = random.Random(3)
+    keys, words = make_keys(args.entries)
+
+    start = time.perf_counter()
+    index = FuzzyIndex(keys, threshold=args.threshold)
+    build = time.perf_counter() - start
+    # second build under tracemalloc, which slows it down too much to time
+    tracemalloc.start()
+    traced = FuzzyIndex(keys)
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del traced
+
+    start = time.perf_counter()
+    for n in range(100):
+        index.add(f"a freshly taught question {n}")
+    teach = (time.perf_counter() - start) / 100
+
+    targets = rnd.sample(keys, args.questions)
+    typos = [typo(key, rnd) for key in targets]
+    misses = [" ".join(rnd.choice(words) + "q" for _ in range(4)) for _ in range(args.questions)]
+
+    typo_time, found = best_of(args.runs, index.best, typos)
+    miss_time, missed = best_of(args.runs, index.best, misses)
+    false_hits = sum(hit is not None for hit in missed)
+
+    recovered = sum(hit is not None and hit[1] == key for hit, key in zip(found, targets))
+    print(f"entries:          {args.entries} (threshold {index.threshold})")
+    print(f"index build:      {build:.2f} s, {memory / 2**20:.0f} MiB")
+    print(f"teach (add):      {teach * 1e6:.1f} us")
+    print(f"typo lookup:      {fmt(typo_time)}, {recovered / len(typos):.0%} recovered")
+    print(f"miss lookup:      {fmt(miss_time)}, {false_hits} false hits")
+
+
+if __name__ == "__main__":
+    main()
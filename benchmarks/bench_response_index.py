@@ -0,0 +1,91 @@
+"""Benchmark: linear custom-response scan vs ResponseIndex.
+
+    python benchmarks/bench_response_index.py --entries 100000
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from response_index import ResponseIndex  # noqa: E402
+
+PREFIXES = ["what is", "how do i", "explain", "why does", "can you", "tell me about", "define", ""]
+
+
+def make_keys(count, seed=1):
+    rnd = random.Random(seed)
+    words = ["".join(rnd.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rnd.randint(3, 9)))
+             for _ in range(5000)]
+    keys = set()
+    while len(keys) < count:
+        phrase = " ".join(rnd.choice(words) for _ in range(rnd.randint(1, 3)))
+        keys.add(f"{rnd.choice(PREFIXES)} {phrase}".strip())
+    return list(keys), words
+
+
+def make_questions(keys, words, count, seed=2):
+    rnd = random.Random(seed)
+    questions = []
+    for i in range(count):
+        kind = i % 4
+        if kind == 0:
+            questions.append(rnd.choice(keys))  # exact
+        elif kind == 1:
+            questions.append(f"hey, {rnd.choice(keys)} please?")  # key in question
+        elif kind == 2:
+            questions.append(rnd.choice(keys)[2:-2] or "x")  # question in key
+        else:
+            questions.append(" ".join(rnd.choice(words) + "q" for _ in range(4)))  # miss
+    return questions
+
+
+def linear_scan(responses, q):
+    # the original streamlit_app.get_custom_response fallback
+    if q in responses:
+        return q
+    for key in responses:
+        if key in q or q in key:
+            return key
+    return None
+
+
+def timed(fn, questions):
+    start = time.perf_counter()
+    for q in questions:
+        fn(q)
+    return (time.perf_counter() - start) / len(questions)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entries", type=int, default=100_000)
+    parser.add_argument("--questions", type=int, default=200)
+    args = parser.parse_args()
+
+    keys, words = make_keys(args.entries)
+    responses = {key: {"general": "answer"} for key in keys}
+    questions = make_questions(keys, words, args.questions)
+
+    start = time.perf_counter()
+    index = ResponseIndex(keys)
+    build = time.perf_counter() - start
+
+    start = time.perf_counter()
+    index.add("a freshly taught question")
+    teach = time.perf_counter() - start
+
+    scan = timed(lambda q: linear_scan(responses, q), questions)
+    indexed = timed(index.best_match, questions)
+
+    print(f"entries:        {args.entries}")
+    print(f"index build:    {build:.2f} s")
+    print(f"teach (add):    {teach * 1e6:.1f} us")
+    print(f"linear scan:    {scan * 1e3:.3f} ms/question")
+    print(f"indexed lookup: {indexed * 1e3:.3f} ms/question ({scan / indexed:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+"""Startup budget check: `python -X importtime` for the importable entry modules.
+
+    python benchmarks/check_import_time.py [--budget-ms 50] [--runs 5]
+
+Fails (exit 1) when a module's cumulative import time (best of N runs)
+exceeds the budget, or when importing it pulls in one of the heavy
+modules that must stay lazy.
+"""
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+
+MODULES = ["engine", "main"]
+# only imported on the code paths that actually need them
+LAZY = ["requests", "urllib3", "webbrowser", "dotenv", "streamlit", "flask", "sqlite3"]
+
+
+def import_profile(module):
+    """Return ({imported module name: cumulative us}) for one cold import."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    )
+    timings = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            timings[name.strip()] = int(cumulative)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--budget-ms", type=float, default=float(os.getenv("ALPHA_IMPORT_BUDGET_MS", "50")))
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    failed = False
+    for module in MODULES:
+        runs = [import_profile(module) for _ in range(args.runs)]
+        best_ms = min(run[module] for run in runs) / 1000
+        eager = sorted({name for run in runs for name in run if name.split(".")[0] in LAZY})
+        ok = best_ms <= args.budget_ms and not eager
+        failed |= not ok
+        print(f"{'ok  ' if ok else 'FAIL'} {module:<8} {best_ms:7.1f} ms (budget {args.budget_ms:g} ms)")
+        if eager:
+            print(f"     eagerly imports: {', '.join(eager)}")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
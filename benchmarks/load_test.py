@@ -0,0 +1,432 @@
+"""Load test: replay conversation traces against the engine or server.py, upstream served by a local stub.
+
+    python benchmarks/load_test.py --synthesize 200 --vus 5,10,20,40 --duration 30
+    python benchmarks/load_test.py --trace cli.jsonl --rate 10,20,40,80 --duration 60 --output load.json
+    python benchmarks/load_test.py --synthesize 200 --rate 20 --spawn-server
+    python benchmarks/load_test.py --trace cli.jsonl --vus 50 --target http://127.0.0.1:5000 --stub-port 8089
+
+Traces are JSONL as recorded by main.py with ALPHA_TRACE_FILE (traces.py):
+ask, profile and teach events per session. --rate is an open-loop arrival
+rate (events/s, Poisson); latency is measured from each event's scheduled
+time, so queueing shows up instead of being hidden by a slow client.
+--vus runs that many closed-loop users, each replaying whole sessions with
+their recorded think time (scaled by --think-scale). Comma-separated
+values run one step per value, which is how to find the scaling knee.
+--target or --spawn-server exercises server.py instead of the in-process
+engine. To keep a --target service's traffic local, start it with
+OPENROUTER_URL=http://127.0.0.1:<port>/api/v1/chat/completions and pass
+the same --stub-port; the stub's URL is printed at startup.
+"""
+import argparse
+import contextlib
+import itertools
+import json
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+import stub_openrouter  # noqa: E402
+import traces  # noqa: E402
+from run_suite import STUB_KEY, cli_turn, summarize  # noqa: E402
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+PROFILES = ["general", "beginner", "expert", "student", "professional"]
+
+
+def rss_mb(pid=None):
+    """Resident memory of a process in MiB (Linux /proc), or None."""
+    try:
+        with open(f"/proc/{pid or 'self'}/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+    except OSError:
+        return None
+    return None
+
+
+def synthesize(count, seed=7):
+    """Sessions shaped like the CLI loop: skewed questions, some profile switches and teachings."""
+    rnd = random.Random(seed)
+    topics = [f"topic {n}" for n in range(300)]
+    weights = [1 / (rank + 1) for rank in range(len(topics))]
+    templates = ["what is {}", "how do i use {}", "explain {} simply", "why does {} fail", "{} example please"]
+    sessions = {}
+    for n in range(count):
+        events, t = [], 0.0
+        for _ in range(rnd.randint(3, 12)):
+            t += rnd.expovariate(1 / 5)
+            roll = rnd.random()
+            if roll < 0.08:
+                events.append({"t": round(t, 3), "op": "profile", "type": rnd.choice(PROFILES)})
+            elif roll < 0.10:
+                topic = rnd.choices(topics, weights)[0]
+                events.append({"t": round(t, 3), "op": "teach", "question": f"what is {topic}",
+                               "user_type": rnd.choice(PROFILES), "answer": f"{topic} is a taught answer."})
+            elif roll < 0.25:
+                events.append({"t": round(t, 3), "op": "ask", "question": rnd.choice(["hello", "hi", "what is python"])})
+            else:
+                topic = rnd.choices(topics, weights)[0]
+                events.append({"t": round(t, 3), "op": "ask", "question": rnd.choice(templates).format(topic)})
+        sessions[f"s{n}"] = events
+    return sessions
+
+
+class EngineTarget:
+    """Runs events in-process, the way main.py's command loop does."""
+
+    name = "engine"
+
+    def __init__(self, stream):
+        import engine
+        import sessions
+
+        self.engine = engine
+        self.stream = stream
+        self.manager = sessions.SessionManager()
+
+    def run(self, session_id, event):
+        """(ok, error kind or None)."""
+        op = event["op"]
+        if op == "ask":
+            ok, _ = cli_turn(event["question"], STUB_KEY, self.stream, self.manager, session_id=session_id)
+            return ok, None if ok else "upstream"
+        if op == "profile":
+            self.manager.set_type(session_id, event["type"])
+        else:
+            self.engine.teach(event["question"], event["user_type"], event["answer"])
+        return True, None
+
+    def pid(self):
+        return None
+
+    def close(self):
+        pass
+
+
+class HttpTarget:
+    """Runs events against server.py's JSON endpoints."""
+
+    name = "http"
+
+    def __init__(self, base_url, pool_size, process=None):
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        self.base_url = base_url.rstrip("/")
+        self.http = requests.Session()
+        self.http.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        self.requests = requests
+        self.process = process
+
+    def run(self, session_id, event):
+        op = event["op"]
+        if op == "ask":
+            path, body = "/chat", {"question": event["question"], "session_id": session_id}
+        elif op == "profile":
+            path, body = "/profile", {"session_id": session_id, "type": event["type"]}
+        else:
+            path, body = "/teach", {k: event[k] for k in ("question", "answer", "user_type")}
+        try:
+            response = self.http.post(self.base_url + path, json=body, timeout=120)
+        except self.requests.RequestException as e:
+            return False, type(e).__name__
+        return response.status_code < 400, None if response.status_code < 400 else str(response.status_code)
+
+    def pid(self):
+        return self.process.pid if self.process is not None else None
+
+    def close(self):
+        self.http.close()
+        if self.process is not None:
+            self.process.terminate()
+            self.process.wait(timeout=10)
+
+
+def spawn_server(stub_url, workdir, port):
+    """Start server.py on the stub; returns (base_url, process)."""
+    env = dict(os.environ, OPENROUTER_URL=stub_url, OPENROUTER_API_KEY=STUB_KEY, ALPHA_PORT=str(port),
+               ALPHA_HOST="127.0.0.1", ALPHA_TEACH_DB=os.path.join(workdir, "server-teach.db"), ALPHA_CACHE_BYPASS="1")
+    process = subprocess.Popen([sys.executable, "server.py"], cwd=ROOT, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    import requests
+
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit(f"server.py exited with status {process.returncode}")
+        try:
+            if requests.get(base_url + "/health", timeout=1).ok:
+                return base_url, process
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.terminate()
+    raise SystemExit("server.py did not become healthy within 30s")
+
+
+class Recorder:
+    """Completed events plus a memory/in-flight sample per interval."""
+
+    def __init__(self, pid):
+        self.pid = pid
+        self.results = []  # (finished at, op, latency, ok, error kind)
+        self.samples = []  # (t, in flight, rss MiB)
+        self.in_flight = 0
+        self._lock = threading.Lock()
+        self.start = time.monotonic()
+
+    def begin(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def done(self, op, latency, ok, kind):
+        with self._lock:
+            self.in_flight -= 1
+            self.results.append((time.monotonic() - self.start, op, latency, ok, kind))
+
+    def sample(self):
+        self.samples.append((time.monotonic() - self.start, self.in_flight, rss_mb(self.pid)))
+
+    def report(self, wall, interval):
+        results = list(self.results)
+        errors = [r for r in results if not r[3]]
+        kinds = {}
+        for r in errors:
+            kinds[r[4] or "error"] = kinds.get(r[4] or "error", 0) + 1
+        by_op = {}
+        for r in results:
+            by_op.setdefault(r[1], []).append(r[2])
+        timeline = []
+        for t, in_flight, rss in self.samples:
+            window = [r for r in results if t - interval < r[0] <= t]
+            timeline.append({
+                "t": round(t, 1),
+                "completed_per_s": round(len(window) / interval, 2),
+                "errors": sum(not r[3] for r in window),
+                "p95_ms": summarize([r[2] for r in window]).get("p95_ms"),
+                "in_flight": in_flight,
+                "rss_mb": rss,
+            })
+        memory = [s[2] for s in self.samples if s[2] is not None]
+        return {
+            "completed": len(results),
+            "throughput_per_s": round(len(results) / wall, 2) if wall else 0,
+            "error_rate": round(len(errors) / len(results), 4) if results else 0,
+            "errors": kinds,
+            "latency": summarize([r[2] for r in results]),
+            "latency_by_op": {op: summarize(times) for op, times in sorted(by_op.items())},
+            "memory_mb": {"start": memory[0], "end": memory[-1], "peak": max(memory),
+                          "growth": round(memory[-1] - memory[0], 1)} if memory else None,
+            "timeline": timeline,
+        }
+
+
+def _sampler(recorder, interval, stop):
+    while not stop.wait(interval):
+        recorder.sample()
+
+
+def session_stream(sessions, tag):
+    """Endless (session id, events) replays; ids get a loop suffix so replays don't share state."""
+    for loop in itertools.count():
+        for session_id, events in sessions.items():
+            yield f"{tag}{session_id}-{loop}", events
+
+
+def run_open(target, sessions, rate, duration, max_in_flight, recorder):
+    """Open loop: Poisson arrivals at `rate` events/s, interleaving sessions in order."""
+    from concurrent.futures import ThreadPoolExecutor
+
+    rnd = random.Random(11)
+    active = []  # [session id, events, next index]
+    replays = session_stream(sessions, "open-")
+
+    def next_event():
+        # keep a few sessions open at once so their events interleave
+        while len(active) < max(1, int(rate)):
+            session_id, events = next(replays)
+            if events:
+                active.append([session_id, events, 0])
+        slot = active[rnd.randrange(len(active))]
+        event = slot[1][slot[2]]
+        slot[2] += 1
+        if slot[2] == len(slot[1]):
+            active.remove(slot)
+        return slot[0], event
+
+    def fire(session_id, event, scheduled):
+        try:
+            ok, kind = target.run(session_id, event)
+        except Exception as e:  # keep the run going; the failure is the measurement
+            ok, kind = False, type(e).__name__
+        recorder.done(event["op"], time.monotonic() - scheduled, ok, kind)
+
+    start = time.monotonic()
+    scheduled = start
+    with ThreadPoolExecutor(max_workers=max_in_flight) as pool:
+        while True:
+            scheduled += rnd.expovariate(rate)
+            if scheduled - start >= duration:
+                break
+            delay = scheduled - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            session_id, event = next_event()
+            if recorder.in_flight >= max_in_flight:
+                # the generator itself is saturated; count it rather than queue without bound
+                recorder.begin()
+                recorder.done(event["op"], 0.0, False, "dropped")
+                continue
+            recorder.begin()
+            pool.submit(fire, session_id, event, scheduled)
+
+
+def run_vus(target, sessions, vus, duration, think_scale, recorder):
+    """Closed loop: each virtual user replays whole sessions back to back."""
+    replays = session_stream(sessions, "vu-")
+    replays_lock = threading.Lock()
+    deadline = time.monotonic() + duration
+
+    def user():
+        while time.monotonic() < deadline:
+            with replays_lock:
+                session_id, events = next(replays)
+            previous = 0.0
+            for event in events:
+                think = (event.get("t", previous) - previous) * think_scale
+                previous = event.get("t", previous)
+                if think > 0:
+                    time.sleep(min(think, max(0.0, deadline - time.monotonic())))
+                if time.monotonic() >= deadline:
+                    return
+                recorder.begin()
+                started = time.monotonic()
+                try:
+                    ok, kind = target.run(session_id, event)
+                except Exception as e:
+                    ok, kind = False, type(e).__name__
+                recorder.done(event["op"], time.monotonic() - started, ok, kind)
+
+    threads = [threading.Thread(target=user, name=f"vu-{n}", daemon=True) for n in range(vus)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+def print_step(label, report):
+    latency = report["latency"]
+    memory = report["memory_mb"] or {}
+    print(f"{label:>12}  {report['throughput_per_s']:>8.1f}/s  p50 {latency.get('p50_ms', 0):>8.1f} ms  "
+          f"p95 {latency.get('p95_ms', 0):>8.1f} ms  p99 {latency.get('p99_ms', 0):>8.1f} ms  "
+          f"errors {report['error_rate']:>6.1%}  rss {memory.get('end', '-')} MiB", file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--trace", help="JSONL trace file (see traces.py)")
+    source.add_argument("--synthesize", type=int, metavar="SESSIONS", help="generate this many sessions instead")
+    load = parser.add_mutually_exclusive_group(required=True)
+    load.add_argument("--rate", help="open-loop events/s; comma-separated for several steps")
+    load.add_argument("--vus", help="closed-loop virtual users; comma-separated for several steps")
+    parser.add_argument("--duration", type=float, default=30, help="seconds per step")
+    parser.add_argument("--think-scale", type=float, default=0.0, help="multiplier on recorded think time (--vus)")
+    parser.add_argument("--max-in-flight", type=int, default=256, help="open-loop concurrency cap")
+    parser.add_argument("--interval", type=float, default=1.0, help="timeline sample period, seconds")
+    parser.add_argument("--stream", action="store_true", help="engine target: stream answers")
+    parser.add_argument("--target", help="base URL of a running server.py (default: in-process engine)")
+    parser.add_argument("--spawn-server", action="store_true", help="start server.py on the stub")
+    parser.add_argument("--server-port", type=int, default=5077)
+    parser.add_argument("--stub-port", type=int, default=0, help="stub port (default: a free one)")
+    parser.add_argument("--keep-workdir", action="store_true", help="keep the temp dir with the stores (printed)")
+    parser.add_argument("--output", help="write the JSON report here (default: stdout)")
+    stub_openrouter.add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.trace:
+        with open(args.trace, encoding="utf-8") as f:
+            sessions = traces.load(f)
+    else:
+        sessions = synthesize(args.synthesize)
+    if not sessions:
+        raise SystemExit("no sessions to replay")
+
+    workdir = tempfile.mkdtemp(prefix="alpha-load-")
+    os.environ["ALPHA_CACHE_BYPASS"] = "1"
+    os.environ["ALPHA_TEACH_DB"] = os.path.join(workdir, "teach.db")
+    stub = stub_openrouter.from_args(args, port=args.stub_port).start()
+    print(f"stub listening on {stub.url}", file=sys.stderr)
+    import openrouter_client
+
+    openrouter_client.configure(url=stub.url)
+
+    if args.spawn_server:
+        base_url, process = spawn_server(stub.url, workdir, args.server_port)
+        target = HttpTarget(base_url, args.max_in_flight, process)
+    elif args.target:
+        target = HttpTarget(args.target, args.max_in_flight)
+    else:
+        target = EngineTarget(args.stream)
+
+    mode = "rate" if args.rate else "vus"
+    steps = [float(v) if mode == "rate" else int(v) for v in (args.rate or args.vus).split(",")]
+    results = []
+    # keep stdout for the JSON report, whatever the sections print
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            for step in steps:
+                recorder = Recorder(target.pid())
+                recorder.sample()
+                stop = threading.Event()
+                sampler = threading.Thread(target=_sampler, args=(recorder, args.interval, stop), daemon=True)
+                sampler.start()
+                start = time.monotonic()
+                if mode == "rate":
+                    run_open(target, sessions, step, args.duration, args.max_in_flight, recorder)
+                else:
+                    run_vus(target, sessions, step, args.duration, args.think_scale, recorder)
+                # open-loop stragglers are waited for inside run_open
+                wall = time.monotonic() - start
+                stop.set()
+                sampler.join()
+                recorder.sample()
+                report = recorder.report(wall, args.interval)
+                report[mode] = step
+                results.append(report)
+                print_step(f"{mode} {step:g}", report)
+    finally:
+        target.close()
+        stub.stop()
+        if args.keep_workdir:
+            print(f"workdir kept: {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    output = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "target": target.name,
+        "sessions": len(sessions),
+        "settings": {key: value for key, value in vars(args).items() if key != "output"},
+        "stub": stub.counters,
+        "steps": results,
+    }
+    text = json.dumps(output, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"wrote {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
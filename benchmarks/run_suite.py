@@ -0,0 +1,276 @@
+"""Benchmark suite: classifier, custom responses and end-to-end latency against a local stub.
+
+    python benchmarks/run_suite.py --output before.json
+    python benchmarks/run_suite.py --output after.json --latency 0.2 --jitter 0.1 --error-rate 0.02
+    python benchmarks/run_suite.py --compare before.json after.json
+
+Nothing goes to openrouter.ai: upstream calls hit stub_openrouter.py on a
+free local port. The response cache is bypassed and taught responses go to
+a throwaway SQLite file, so runs are repeatable. The headless Streamlit
+section needs streamlit installed and is recorded as skipped otherwise;
+the end-to-end sections need requests.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+STUB_KEY = "stub-key"
+
+
+def summarize(times, wall=None, errors=0):
+    """Latency percentiles (ms) and, given the wall time, throughput."""
+    ordered = sorted(times)
+    if not ordered:
+        return {"count": 0}
+
+    def pct(p):
+        return round(ordered[min(len(ordered) - 1, len(ordered) * p // 100)] * 1e3, 4)
+
+    stats = {"count": len(ordered), "mean_ms": round(sum(ordered) / len(ordered) * 1e3, 4),
+             "p50_ms": pct(50), "p95_ms": pct(95), "p99_ms": pct(99), "max_ms": round(ordered[-1] * 1e3, 4)}
+    if wall is not None:
+        stats["throughput_per_s"] = round(len(ordered) / wall, 2)
+        stats["error_rate"] = round(errors / len(ordered), 4)
+    return stats
+
+
+def timed(fn, items):
+    times = []
+    for item in items:
+        start = time.perf_counter()
+        fn(item)
+        times.append(time.perf_counter() - start)
+    return times
+
+
+def bench_classifier(args):
+    import engine
+    from bench_classifier import make_corpus
+
+    corpus = make_corpus(args.questions)
+    return summarize(timed(engine.detect_user_type, corpus))
+
+
+def bench_custom_responses(args):
+    import engine
+    import response_store
+    import teach_store
+    from bench_response_index import make_keys
+
+    rnd = random.Random(5)
+    store = teach_store.get_store()
+    shared = response_store.SharedResponses({}, store)
+    overlay = shared.overlay()
+    keys, words = make_keys(max(args.pack_sizes))
+    results = {}
+    loaded = 0
+    for size in sorted(args.pack_sizes):
+        lines = (json.dumps({"question": key, "responses": {"general": f"answer {n}"}})
+                 for n, key in enumerate(keys[loaded:size], loaded))
+        start = time.perf_counter()
+        store.import_jsonl(lines)
+        import_s = time.perf_counter() - start
+        loaded = size
+
+        sample = rnd.sample(keys[:size], min(args.questions, size))
+        # a pack key inside a longer question
+        longer = [f"please tell me {key} today" for key in sample]
+        # a question inside a pack key: the key without its first word
+        shorter = [key.split(" ", 1)[1] if " " in key else key[1:] for key in sample]
+        misses = [" ".join(rnd.choice(words) + "q" for _ in range(4)) for _ in sample]
+        results[str(size)] = {
+            "import_s": round(import_s, 3),
+            "engine_exact": summarize(timed(engine.get_custom_response, sample)),
+            "engine_miss": summarize(timed(engine.get_custom_response, misses)),
+            "overlay_exact": summarize(timed(overlay.lookup, sample)),
+            "overlay_containment": summarize(timed(overlay.lookup, longer)),
+            "overlay_contained": summarize(timed(overlay.lookup, shorter)),
+            "overlay_miss": summarize(timed(overlay.lookup, misses)),
+        }
+    return results
+
+
+def cli_turn(question, api_key, stream, manager, session_id=None):
+    """One CLI question, the way main.py runs it; returns (ok, seconds to first token)."""
+    import engine
+
+    session_id = session_id or f"bench-{threading.get_ident()}"
+    user_type = manager.record_question(session_id, question, engine.detect_user_type(question))
+    if engine.match_custom_response(question, user_type):
+        return True, None
+    start = time.perf_counter()
+    first = []
+
+    def on_token(text):
+        if not first:
+            first.append(time.perf_counter() - start)
+
+    result = engine.call_deepseek_api(question, api_key, user_type=user_type, on_token=on_token if stream else None,
+                                      context=manager.conversation(session_id))
+    if "choices" in result:
+        manager.record_answer(session_id, question, result["choices"][0]["message"]["content"])
+    return "choices" in result, (first[0] if first else None)
+
+
+def bench_end_to_end(args, stream):
+    from concurrent.futures import ThreadPoolExecutor
+
+    import sessions
+
+    manager = sessions.SessionManager()
+    questions = [f"benchmark question {n} about topic {n % 97}?" for n in range(args.requests)]
+    times, ttfts, errors = [], [], 0
+
+    def run(question):
+        start = time.perf_counter()
+        ok, ttft = cli_turn(question, STUB_KEY, stream, manager)
+        return time.perf_counter() - start, ok, ttft
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for elapsed, ok, ttft in pool.map(run, questions):
+            times.append(elapsed)
+            errors += not ok
+            if ttft is not None:
+                ttfts.append(ttft)
+    stats = summarize(times, time.perf_counter() - start, errors)
+    if stream:
+        stats["time_to_first_token"] = summarize(ttfts)
+    return stats
+
+
+def bench_streamlit(args):
+    try:
+        from streamlit.testing.v1 import AppTest
+    except ImportError as e:
+        return {"skipped": f"streamlit not installed ({e})"}
+
+    at = AppTest.from_file(os.path.join(ROOT, "streamlit_app.py"), default_timeout=args.timeout)
+    at.run()
+    times, errors = [], 0
+    start_all = time.perf_counter()
+    for n in range(args.ui_questions):
+        start = time.perf_counter()
+        at.text_input(key="input_text").input(f"streamlit benchmark question {n}?")
+        next(button for button in at.button if button.label == "Send").click()
+        at.run()
+        # the answer arrives on a background job; reruns poll it like the fragment does
+        while at.session_state["pending_jobs"] and time.perf_counter() - start < args.timeout:
+            time.sleep(0.005)
+            at.run()
+        times.append(time.perf_counter() - start)
+        history = at.session_state["messages"]
+        last = history.messages(len(history) - 1)[0]["content"]
+        errors += last.startswith("Error:") or bool(at.exception)
+    return summarize(times, time.perf_counter() - start_all, errors)
+
+
+def compare(old_path, new_path):
+    """Print every numeric metric of two result files side by side."""
+    def flatten(data, prefix=""):
+        for key, value in data.items():
+            if isinstance(value, dict):
+                yield from flatten(value, f"{prefix}{key}.")
+            elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                yield f"{prefix}{key}", value
+
+    with open(old_path, encoding="utf-8") as f:
+        old = dict(flatten(json.load(f)["results"]))
+    with open(new_path, encoding="utf-8") as f:
+        new = dict(flatten(json.load(f)["results"]))
+    print(f"{'metric':60} {'old':>12} {'new':>12} {'change':>8}")
+    for key in sorted(old.keys() & new.keys()):
+        if key.endswith(".count"):
+            continue
+        a, b = old[key], new[key]
+        change = f"{(b - a) / a:+.0%}" if a else ""
+        print(f"{key:60} {a:>12g} {b:>12g} {change:>8}")
+
+
+def main():
+    import stub_openrouter
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="write results JSON here (default: stdout)")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="diff two result files and exit")
+    parser.add_argument("--questions", type=int, default=2000, help="lookups per measurement")
+    parser.add_argument("--pack-sizes", type=lambda s: [int(n) for n in s.split(",")], default=[100, 1000, 10000])
+    parser.add_argument("--requests", type=int, default=200, help="end-to-end questions per mode")
+    parser.add_argument("--concurrency", type=int, default=1)
+    parser.add_argument("--ui-questions", type=int, default=20)
+    parser.add_argument("--timeout", type=float, default=30)
+    parser.add_argument("--max-retries", type=int, default=None, help="client retries (default: the client's)")
+    parser.add_argument("--only", default="classifier,custom_responses,cli_blocking,cli_stream,streamlit")
+    parser.add_argument("--keep-workdir", action="store_true", help="keep the temp dir with the stores (printed)")
+    stub_openrouter.add_arguments(parser)
+    args = parser.parse_args()
+    if args.compare:
+        compare(*args.compare)
+        return
+
+    workdir = tempfile.mkdtemp(prefix="alpha-bench-")
+    # set before the app modules read them
+    os.environ["ALPHA_CACHE_BYPASS"] = "1"
+    os.environ["ALPHA_TEACH_DB"] = os.path.join(workdir, "teach.db")
+    os.environ["OPENROUTER_API_KEY"] = STUB_KEY
+
+    stub = stub_openrouter.from_args(args).start()
+    os.environ["OPENROUTER_URL"] = stub.url
+    import openrouter_client
+
+    openrouter_client.configure(url=stub.url, max_retries=args.max_retries)
+
+    sections = {
+        "classifier": bench_classifier,
+        "custom_responses": bench_custom_responses,
+        "cli_blocking": lambda a: bench_end_to_end(a, stream=False),
+        "cli_stream": lambda a: bench_end_to_end(a, stream=True),
+        "streamlit": bench_streamlit,
+    }
+    results = {}
+    # keep stdout for the JSON report, whatever the sections print
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            for name in args.only.split(","):
+                print(f"running {name}...", file=sys.stderr)
+                try:
+                    results[name] = sections[name](args)
+                except ImportError as e:
+                    results[name] = {"skipped": f"missing dependency ({e})"}
+    finally:
+        stub.stop()
+        if args.keep_workdir:
+            print(f"workdir kept: {workdir}", file=sys.stderr)
+        else:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "settings": {key: value for key, value in vars(args).items() if key not in ("output", "compare")},
+        "stub": stub.counters,
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+        print(f"wrote {args.output}", file=sys.stderr)
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+"""Local stand-in for OpenRouter's /api/v1/chat/completions, for benchmarks.
+
+    python benchmarks/stub_openrouter.py --port 8089 --latency 0.2 --error-rate 0.05
+
+Then point the apps at it with
+OPENROUTER_URL=http://127.0.0.1:8089/api/v1/chat/completions. Replies
+after a configurable latency (plus optional exponential jitter), fails a
+configurable share of requests, and streams SSE chunks when the payload
+asks for "stream": true. Standard library only.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+PATH = "/api/v1/chat/completions"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # keep-alive, so the pooled client reuses connections as it would upstream
+    protocol_version = "HTTP/1.1"
+    # headers and body go out as separate writes; don't let Nagle + delayed ACK add 40 ms
+    disable_nagle_algorithm = True
+
+    def log_message(self, *args):
+        pass
+
+    def do_POST(self):
+        stub = self.server.stub
+        body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+        if self.path.split("?")[0] != PATH:
+            return self._reply(404, {"error": {"code": 404, "message": "not found"}})
+        try:
+            payload = json.loads(body)
+            question = payload["messages"][-1]["content"]
+        except (ValueError, KeyError, IndexError, TypeError):
+            return self._reply(400, {"error": {"code": 400, "message": "bad payload"}})
+
+        stub.count("requests")
+        time.sleep(stub.delay())
+        if stub.error_rate and random.random() < stub.error_rate:
+            stub.count("errors")
+            return self._reply(stub.error_status, {"error": {"code": stub.error_status, "message": "stub error"}})
+
+        words = stub.answer(question).split(" ")
+        if payload.get("stream"):
+            stub.count("streams")
+            return self._stream(words, stub.token_delay)
+        self._reply(200, {
+            "id": "stub",
+            "model": payload.get("model"),
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": " ".join(words)},
+                         "finish_reason": "stop"}],
+        })
+
+    def _reply(self, status, data):
+        raw = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+    def _chunk(self, text):
+        raw = text.encode("utf-8")
+        self.wfile.write(f"{len(raw):x}\r\n".encode("ascii") + raw + b"\r\n")
+        self.wfile.flush()
+
+    def _stream(self, words, token_delay):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self._chunk(": OPENROUTER PROCESSING\n\n")
+        for n, word in enumerate(words):
+            if token_delay:
+                time.sleep(token_delay)
+            text = word if n == 0 else " " + word
+            self._chunk("data: " + json.dumps({"choices": [{"index": 0, "delta": {"content": text}}]}) + "\n\n")
+        self._chunk("data: [DONE]\n\n")
+        self.wfile.write(b"0\r\n\r\n")
+
+
+class StubServer:
+    """Threaded stub on 127.0.0.1; port=0 picks a free port."""
+
+    def __init__(self, latency=0.05, jitter=0.0, error_rate=0.0, error_status=500, token_delay=0.0,
+                 answer_words=40, port=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.token_delay = token_delay
+        self.answer_words = answer_words
+        self.counters = {"requests": 0, "errors": 0, "streams": 0}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), _Handler)
+        self._server.daemon_threads = True
+        self._server.stub = self
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}{PATH}"
+
+    def count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def delay(self):
+        return self.latency + (random.expovariate(1 / self.jitter) if self.jitter else 0.0)
+
+    def answer(self, prompt):
+        head = " ".join(prompt.split()[:8])
+        filler = " ".join(f"word{n}" for n in range(max(0, self.answer_words - 4)))
+        return f"Stub answer to: {head}. {filler}".strip()
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, name="stub-openrouter", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def add_arguments(parser):
+    """Stub options shared by the benchmark scripts."""
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds before each reply")
+    parser.add_argument("--jitter", type=float, default=0.0, help="mean of extra exponential delay")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="share of requests that fail")
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--token-delay", type=float, default=0.0, help="seconds between streamed chunks")
+
+
+def from_args(args, port=0):
+    return StubServer(latency=args.latency, jitter=args.jitter, error_rate=args.error_rate,
+                      error_status=args.error_status, token_delay=args.token_delay, port=port)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    add_arguments(parser)
+    parser.add_argument("--port", type=int, default=8089)
+    args = parser.parse_args()
+    stub = from_args(args, args.port)
+    print(f"stub listening on {stub.url}")
+    try:
+        stub.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        print(json.dumps(stub.counters))
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
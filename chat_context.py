@@ -0,0 +1,176 @@
+import hashlib
+import json
+import os
+import threading
+from collections import deque
+
+# Opt-in multi-turn context for upstream calls. A Conversation keeps recent
+# (question, answer) turns and packs them into the chat `messages` array
+# under a token budget. Turns that no longer fit are folded into a short
+# extractive summary (first sentence of each answer), and the oldest summary
+# lines are dropped once the summary outgrows its share of the budget.
+# Compaction happens once, when a turn is added; the packed prefix and its
+# digest (part of the response-cache key) are kept until the next change.
+#
+# Env settings:
+#   ALPHA_CONTEXT_TOKENS   prompt budget in estimated tokens (default 0 = off)
+
+BUDGET = int(os.getenv("ALPHA_CONTEXT_TOKENS", "0"))
+# share of the budget the summary of older turns may use
+SUMMARY_SHARE = 0.25
+# role/formatting tokens added per message
+MESSAGE_OVERHEAD = 4
+QUESTION_CHARS = 120
+ANSWER_CHARS = 200
+SUMMARY_HEADER = "Earlier in this conversation:"
+
+
+def count_tokens(text: str) -> int:
+    """Tokens one message costs against the context budget: ~4 characters per token plus MESSAGE_OVERHEAD.
+
+    Not comparable with openrouter_client.estimate_tokens, which counts no
+    per-message overhead and adds max_tokens for its rate-limit bucket.
+    """
+    return len(text) // 4 + 1 + MESSAGE_OVERHEAD
+
+
+def prompt(question: str) -> str:
+    return f"Question: {question}\nAnswer:"
+
+
+def _clip(text, limit):
+    text = " ".join(text.split())
+    return text if len(text) <= limit else text[:limit - 3].rstrip() + "..."
+
+
+def summarize_turn(question, answer):
+    """One summary line: the question and the first sentence of its answer."""
+    first = answer.strip().split(". ", 1)[0]
+    return f"- {_clip(question, QUESTION_CHARS)} -> {_clip(first, ANSWER_CHARS)}"
+
+
+class Conversation:
+    """Recent turns of one chat, packed into a budgeted messages prefix."""
+
+    def __init__(self, budget=None):
+        self.budget = BUDGET if budget is None else budget
+        self.summary_budget = int(self.budget * SUMMARY_SHARE)
+        self._turns = deque()  # (question, answer, tokens)
+        self._turn_tokens = 0
+        self._summary = deque()  # (line, tokens)
+        self._summary_tokens = 0
+        self.chars = 0
+        self.compacted = 0
+        self.dropped = 0
+        self._prefix = None  # cached (messages, digest)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._turns)
+
+    def _summary_cost(self):
+        return self._summary_tokens + count_tokens(SUMMARY_HEADER) if self._summary else 0
+
+    @property
+    def tokens(self):
+        """Estimated tokens of the packed prefix."""
+        return self._summary_cost() + self._turn_tokens
+
+    def add(self, question, answer):
+        """Record a finished turn, compacting older turns that no longer fit."""
+        tokens = count_tokens(prompt(question)) + count_tokens(answer)
+        with self._lock:
+            self._turns.append((question, answer, tokens))
+            self._turn_tokens += tokens
+            self.chars += len(question) + len(answer)
+            # leave a quarter of the budget for the next question
+            while self._turns and self.tokens > self.budget * 3 // 4:
+                self._compact_oldest()
+            self._prefix = None
+
+    def _add_summary(self, line):
+        tokens = count_tokens(line)
+        self._summary.append((line, tokens))
+        self._summary_tokens += tokens
+        self.chars += len(line)
+        while self._summary and self._summary_tokens > self.summary_budget:
+            line, tokens = self._summary.popleft()
+            self._summary_tokens -= tokens
+            self.chars -= len(line)
+            self.dropped += 1
+
+    def _compact_oldest(self):
+        question, answer, tokens = self._turns.popleft()
+        self._turn_tokens -= tokens
+        self.chars -= len(question) + len(answer)
+        self._add_summary(summarize_turn(question, answer))
+        self.compacted += 1
+
+    def _packed(self):
+        # caller holds the lock
+        if self._prefix is None:
+            messages = []
+            if self._summary:
+                lines = "\n".join(line for line, _ in self._summary)
+                messages.append({"role": "system", "content": f"{SUMMARY_HEADER}\n{lines}"})
+            for question, answer, _ in self._turns:
+                messages.append({"role": "user", "content": prompt(question)})
+                messages.append({"role": "assistant", "content": answer})
+            self._prefix = messages, _digest(messages)
+        return self._prefix
+
+    def messages(self, question):
+        """(messages, digest) for asking question; digest is None without prior context."""
+        final = {"role": "user", "content": prompt(question)}
+        with self._lock:
+            prefix, digest = self._packed()
+            over = count_tokens(final["content"]) + self.tokens - self.budget
+            if over > 0:
+                # an unusually long question: leave out the oldest context for this call only
+                skip = 0
+                if self._summary:
+                    over -= self._summary_cost()
+                    skip = 1
+                for _, _, tokens in self._turns:
+                    if over <= 0:
+                        break
+                    over -= tokens
+                    skip += 2
+                prefix = prefix[skip:]
+                digest = _digest(prefix)
+            return prefix + [final], digest
+
+    def stats(self):
+        with self._lock:
+            return {
+                "turns": len(self._turns),
+                "summary_lines": len(self._summary),
+                "tokens": self.tokens,
+                "budget": self.budget,
+                "compacted": self.compacted,
+                "dropped": self.dropped,
+            }
+
+    def to_dict(self):
+        with self._lock:
+            return {
+                "summary": [line for line, _ in self._summary],
+                "turns": [[question, answer] for question, answer, _ in self._turns],
+            }
+
+    @classmethod
+    def from_dict(cls, data, budget=None):
+        conversation = cls(budget)
+        with conversation._lock:
+            for line in data.get("summary", ()):
+                conversation._add_summary(line)
+        for question, answer in data.get("turns", ()):
+            conversation.add(question, answer)
+        return conversation
+
+
+def _digest(messages):
+    if not messages:
+        return None
+    raw = json.dumps(messages, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
@@ -0,0 +1,98 @@
+import json
+import os
+import tempfile
+import threading
+import weakref
+
+# Capped chat log for the Streamlit app. The newest max_in_memory messages
+# stay in session state; older ones are spilled to a per-session temp JSONL
+# file (deleted with the history) and read back only when the user pages
+# to them. Each message's rendered HTML is cached on the message, so a
+# rerun joins cached fragments instead of rebuilding the whole history.
+
+
+def _remove(spill, path):
+    spill.close()
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class ChatHistory:
+    """Append-only message list with a memory cap and cached HTML fragments."""
+
+    def __init__(self, render, max_in_memory=200, spill_dir=None):
+        self.render = render
+        self.max_in_memory = max_in_memory
+        self._spill_dir = spill_dir
+        self._recent = []  # newest messages
+        self._first_recent = 0  # index of _recent[0]
+        self._offsets = []  # byte offset of each spilled message
+        self._spill = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return self._first_recent + len(self._recent)
+
+    @property
+    def spilled(self):
+        return self._first_recent
+
+    def append(self, role, content):
+        """Add a message; returns its index."""
+        with self._lock:
+            self._recent.append({"role": role, "content": content})
+            index = len(self) - 1
+            overflow = len(self._recent) - self.max_in_memory
+            if overflow > 0:
+                self._spill_oldest(overflow)
+            return index
+
+    def update(self, index, content):
+        """Replace a message's content (only messages still in memory)."""
+        with self._lock:
+            if index < self._first_recent:
+                raise IndexError("message already spilled to disk")
+            if self._recent[index - self._first_recent]["content"] == content:
+                return
+            self._recent[index - self._first_recent] = dict(self._recent[index - self._first_recent],
+                                                            content=content, html=None)
+
+    def _spill_oldest(self, count):
+        if self._spill is None:
+            fd, path = tempfile.mkstemp(prefix="alpha-chat-", suffix=".jsonl", dir=self._spill_dir)
+            self._spill = os.fdopen(fd, "w+b")
+            weakref.finalize(self, _remove, self._spill, path)
+        self._spill.seek(0, os.SEEK_END)
+        for message in self._recent[:count]:
+            # spill with the HTML so paging back doesn't re-render
+            message["html"] = message.get("html") or self.render(message)
+            self._offsets.append(self._spill.tell())
+            self._spill.write(json.dumps(message, ensure_ascii=False).encode("utf-8") + b"\n")
+        self._spill.flush()
+        del self._recent[:count]
+        self._first_recent += count
+
+    def messages(self, start=0, stop=None):
+        """Messages [start, stop), reading spilled ones back from disk."""
+        with self._lock:
+            stop = len(self) if stop is None else min(stop, len(self))
+            start = max(0, start)
+            result = []
+            if start < self._first_recent:
+                self._spill.seek(self._offsets[start])
+                for _ in range(start, min(stop, self._first_recent)):
+                    result.append(json.loads(self._spill.readline()))
+            result.extend(self._recent[max(0, start - self._first_recent):max(0, stop - self._first_recent)])
+            return result
+
+    def html(self, start=0, stop=None):
+        """Rendered HTML for messages [start, stop); each message is rendered once."""
+        fragments = []
+        for message in self.messages(start, stop):
+            if not message.get("html"):
+                # in-memory messages are the same dicts, so this caches for the next rerun
+                message["html"] = self.render(message)
+            fragments.append(message["html"])
+        return "".join(fragments)
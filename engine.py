@@ -0,0 +1,271 @@
+import sys
+import time
+
+from singleflight import SingleFlight
+
+# Importable chat engine shared by main.py (CLI) and server.py.
+# Keep this module cheap to import: no network libraries, no dotenv, no
+# side effects. requests is only imported when an upstream call is made,
+# and the pipeline modules (classifier, caches, stores, metrics) by the
+# functions that use them; benchmarks/check_import_time.py guards this.
+
+# Identical questions in flight at the same time share one upstream call
+upstream_flights = SingleFlight()
+
+TEMPERATURE = 0.7
+
+# Custom responses with multiple options based on user type
+custom_responses = {
+    "what is your name": {
+        "general": "I am alpha AI, your helpful assistant.",
+        "beginner": "Hi! I'm alpha AI, your friendly AI helper. I'm here to make things simple for you!",
+        "expert": "I am alpha AI, an advanced language model designed for complex problem-solving and analysis.",
+        "student": "Hello! I'm alpha AI, your study buddy. I can help you learn and understand concepts better.",
+        "professional": "I am alpha AI, your professional AI assistant for business and technical tasks."
+    },
+    "what is python": {
+        "general": "Python is a high-level programming language known for its simplicity and readability.",
+        "beginner": "Python is like a friendly programming language that's easy to learn! It's great for beginners because it reads almost like English.",
+        "expert": "Python is a dynamically-typed, interpreted high-level language with extensive libraries for data science, web development, and automation.",
+        "student": "Python is a programming language perfect for learning! It's used in schools because it's easy to understand and has many applications.",
+        "professional": "Python is a versatile programming language widely used in enterprise applications, data analysis, machine learning, and web development."
+    },
+    "hello": {
+        "general": "Hello! How can I help you today?",
+        "beginner": "Hi there! Welcome! Don't worry if you're new to this - I'll explain everything clearly.",
+        "expert": "Hello. What technical challenge can I help you solve today?",
+        "student": "Hey! Ready to learn something new? What topic interests you?",
+        "professional": "Good day. How can I assist you with your work today?"
+    },
+    "hi": {
+        "general": "Hi there! What would you like to know?",
+        "beginner": "Hi! I'm excited to help you learn! What would you like to explore?",
+        "expert": "Hi. What complex problem are we tackling today?",
+        "student": "Hi! Let's dive into some learning. What subject are you working on?",
+        "professional": "Hi. What business or technical task can I help you with?"
+    }
+}
+
+# Initialize DeepSeek via OpenRouter API
+def call_deepseek_api(question, api_key: str, on_token=None, use_cache=True, user_type="general", max_tokens=256,
+                      context=None):
+    """Ask the model. With on_token, stream the reply and call on_token(chunk) as it arrives.
+
+    context (a chat_context.Conversation) sends earlier turns along; the
+    caller records the new turn with context.add() once it is answered.
+    """
+    if not api_key:
+        return {"error": "Missing API key."}
+    import hedging
+    import metrics
+    import response_cache
+
+    if context is not None:
+        messages, digest = context.messages(question)
+    else:
+        messages, digest = [{"role": "user", "content": f"Question: {question}\nAnswer:"}], None
+    data = {
+        # primary of the ALPHA_MODELS list; hedging/fallback may answer from the others
+        "model": hedging.get_targets()[0].model,
+        "messages": messages,
+        "temperature": TEMPERATURE,
+        "max_tokens": max_tokens
+    }
+    
+    cache_key = cache_key_for(question, user_type, max_tokens, digest)
+    
+    # Repeated questions are answered from the response cache
+    if use_cache:
+        cached = response_cache.get_cache().get(cache_key)
+        metrics.inc("response_cache_lookups_total", result="miss" if cached is None else "hit")
+        if cached is not None:
+            if on_token is not None:
+                on_token(cached["choices"][0]["message"]["content"])
+            return cached
+    
+    streamed = []
+    
+    def fetch():
+        with metrics.span("upstream", mode="blocking" if on_token is None else "stream") as span:
+            if on_token is not None:
+                streamed.append(True)
+                result = _stream_deepseek_api(data, api_key, on_token)
+            else:
+                result = _post_deepseek_api(data, api_key)
+            span.label(result="ok" if "choices" in result else "error")
+        if use_cache and "choices" in result:
+            response_cache.get_cache().set(cache_key, result)
+        return result
+    
+    # The key is part of the flight so one user's bad key can't fail another's request
+    result = upstream_flights.do((cache_key, api_key), fetch)
+    if on_token is not None and not streamed and "choices" in result:
+        # joined someone else's call: deliver the finished reply in one piece
+        on_token(result["choices"][0]["message"]["content"])
+    return result
+
+def cache_key_for(question, user_type="general", max_tokens=256, context_digest=None):
+    """The response-cache key call_deepseek_api uses for this question."""
+    import hedging
+    import response_cache
+
+    params = {"temperature": TEMPERATURE, "max_tokens": max_tokens}
+    if context_digest is not None:
+        # the same question after different turns is a different request
+        params["context"] = context_digest
+    return response_cache.make_key(question, user_type, hedging.get_targets()[0].model, params)
+
+def _post_deepseek_api(data, api_key: str):
+    import requests
+
+    import hedging
+    import metrics
+    import rate_limiter
+
+    try:
+        response, _ = hedging.post_hedged(data, api_key)
+    except requests.RequestException as e:
+        print(f"API Error: {e}", file=sys.stderr)
+        return {"error": f"Request failed: {e}"}
+    except rate_limiter.RateLimitTimeout as e:
+        print(f"API Error: rate limited, {e}", file=sys.stderr)
+        return {"error": f"Rate limited: {e}"}
+    
+    if response.status_code != 200:
+        print(f"API Error: {response.status_code}", file=sys.stderr)
+        print(f"Response: {response.text}", file=sys.stderr)
+        return {"error": f"HTTP {response.status_code}"}
+    
+    with metrics.span("parse"):
+        return response.json()
+
+def _stream_deepseek_api(data, api_key: str, on_token):
+    # Same result shape as the blocking call, assembled from the streamed chunks.
+    # Falls back to the next ALPHA_MODELS target if one fails before its first token.
+    import requests
+
+    import hedging
+    import metrics
+    import openrouter_client
+    import rate_limiter
+
+    parts = []
+    targets = hedging.get_targets()
+    start = time.perf_counter()
+    for i, target in enumerate(targets):
+        last = i == len(targets) - 1
+        try:
+            for text in openrouter_client.stream_chat(dict(data, model=target.model), api_key, url=target.url):
+                if not parts:
+                    metrics.observe("first_token", time.perf_counter() - start)
+                parts.append(text)
+                on_token(text)
+        except openrouter_client.UpstreamError as e:
+            if not parts and not last and e.status_code not in hedging.NO_FALLBACK_STATUSES:
+                continue
+            print(f"API Error: {e.status_code}", file=sys.stderr)
+            print(f"Response: {e.text}", file=sys.stderr)
+            return {"error": f"HTTP {e.status_code}"}
+        except requests.RequestException as e:
+            if not parts and not last:
+                continue
+            print(f"API Error: {e}", file=sys.stderr)
+            return {"error": f"Request failed: {e}"}
+        except rate_limiter.RateLimitTimeout as e:
+            print(f"API Error: rate limited, {e}", file=sys.stderr)
+            return {"error": f"Rate limited: {e}"}
+        break
+    
+    return {"choices": [{"message": {"role": "assistant", "content": "".join(parts)}}]}
+
+def detect_user_type(question):
+    """Simple user type detection based on question patterns"""
+    import metrics
+    import profile_classifier
+
+    with metrics.span("detect"):
+        return profile_classifier.detect_user_type(question)
+
+def get_all_responses(question):
+    """Every answer for a question by user type; taught answers override built-in ones."""
+    import teach_store
+
+    question_lower = question.lower()
+    responses = custom_responses.get(question_lower)
+    store = teach_store.get_store()
+    taught = store.get(question_lower.strip()) if store is not None else None
+    if taught:
+        return {**responses, **taught} if isinstance(responses, dict) else taught
+    return responses
+
+def _pick_response(responses, user_type):
+    if isinstance(responses, dict):
+        # Multiple responses available - choose based on user type
+        if user_type in responses:
+            return responses[user_type]
+        else:
+            return responses.get("general", "I don't have a specific response for that.")
+    else:
+        # Single response (backward compatibility)
+        return responses
+
+_fuzzy_builtin = None
+
+def _closest_key(question):
+    """(score, key) of the most similar built-in or taught question, or None."""
+    global _fuzzy_builtin
+    import fuzzy_index
+    import teach_store
+
+    if _fuzzy_builtin is None:
+        _fuzzy_builtin = fuzzy_index.FuzzyIndex(custom_responses)
+    hits = [_fuzzy_builtin.best(question)]
+    store = teach_store.get_store()
+    if store is not None:
+        hits.append(store.fuzzy_index().best(question))
+    hits = [hit for hit in hits if hit is not None]
+    return max(hits, key=lambda hit: hit[0]) if hits else None
+
+def match_custom_response(question, user_type="general"):
+    """(answer, matched key, score) or None; exact keys score 1.0, typos go through fuzzy_index."""
+    import metrics
+
+    with metrics.span("custom_lookup") as span:
+        match = _match_custom_response(question, user_type)
+        result = "miss" if match is None else "exact" if match[1] == question.lower() else "fuzzy"
+        span.label(result=result)
+    metrics.inc("custom_lookups_total", result=result)
+    return match
+
+def _match_custom_response(question, user_type):
+    import fuzzy_index
+
+    responses = get_all_responses(question)
+    if responses is not None:
+        return _pick_response(responses, user_type), question.lower(), 1.0
+    if not fuzzy_index.ENABLED:
+        return None
+    hit = _closest_key(question)
+    if hit is None:
+        return None
+    score, key = hit
+    return _pick_response(get_all_responses(key), user_type), key, score
+
+def get_custom_response(question, user_type="general"):
+    """Get appropriate response based on user type"""
+    match = match_custom_response(question, user_type)
+    return match[0] if match else None
+
+def teach(question, user_type, answer):
+    """Store a taught answer (durably when ALPHA_TEACH_DB is on); returns all answers for the question."""
+    import teach_store
+
+    question_lower = question.strip().lower()
+    store = teach_store.get_store()
+    if store is not None:
+        store.set(question_lower, user_type, answer)
+    else:
+        custom_responses.setdefault(question_lower, {})[user_type] = answer
+        if _fuzzy_builtin is not None:
+            _fuzzy_builtin.add(question_lower)
+    return get_all_responses(question_lower)
@@ -0,0 +1,317 @@
+import math
+import os
+import threading
+from bisect import bisect_right
+from collections import Counter
+
+from response_cache import normalize_question
+
+# Typo-tolerant lookup over custom response keys ("what is pyhton",
+# "whats python?" -> "what is python").
+#
+# Similarity is the Jaccard index of padded character trigram sets. Lookups
+# use prefix filtering: a key reaching the threshold must share at least one
+# of the query's rarest grams, so only those postings are scanned, and only
+# for keys whose gram count is within the size bounds the threshold allows.
+# Postings are scanned rarest gram first, in growing batches. After each
+# batch the keys sharing the most grams are scored; once a good match is
+# known the prefix shrinks to what could still beat it, so the common
+# grams at the end are usually never scanned.
+#
+# Trigram similarity alone can't tell a typo from another question ("what
+# is cython" scores higher against "what is python" than "what is pyhton"
+# does), so best() only returns a key the question reads as a misspelling
+# of: word by word, every differing word is one adjacent swap away, or one
+# dropped or doubled letter for words of MIN_EDIT_WORD letters or more, or
+# differs only in spacing. Swapped-in letters usually spell another word,
+# so they never match.
+#
+# Candidates are checked as they are scored, so the pruning bound rises with
+# the best typo match, not the best trigram match. A typo keeps the key's
+# letters but for one dropped or doubled letter per long word, so questions
+# with at most one long word, or two and common grams, are looked up by
+# their sorted letters instead: questions rejected as typos would otherwise
+# scan the postings of their common grams ("tell me about ...") with the
+# bound never rising.
+#
+#   ALPHA_FUZZY=1              turn fuzzy matching on (default off)
+#   ALPHA_FUZZY_THRESHOLD      minimum similarity, 0..1 (default 0.5)
+
+GRAM = 3
+EPS = 1e-9
+# postings scanned before the first scoring pass (then x4 per pass)
+BATCH_POSTINGS = 256
+# keys scored per intermediate pass
+PROBE = 8
+# total postings worth scanning to tighten the bound before final scoring
+EXTRA_POSTINGS = 4096
+# prefix postings past which a question with two long words is looked up by
+# its letters (~700 variants, about as slow as 3-4k postings) rather than its grams
+ANAGRAM_POSTINGS = 4000
+# shorter words lose or gain a letter and become other words ("hell", "hello")
+MIN_EDIT_WORD = 6
+CONTRACTIONS = {"whats": "what is", "whos": "who is", "hows": "how is", "wheres": "where is",
+                "thats": "that is", "im": "i am", "youre": "you are", "s": "is", "re": "are", "m": "am"}
+ENABLED = os.getenv("ALPHA_FUZZY", "0") == "1"
+THRESHOLD = float(os.getenv("ALPHA_FUZZY_THRESHOLD", "0.5"))
+
+
+def _padded(text):
+    return f" {normalize_question(text)} "
+
+
+def grams(text):
+    """Trigram set of the normalized, space-padded text."""
+    text = _padded(text)
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+
+def similarity(a, b):
+    """Jaccard similarity of two texts' trigram sets (the score search() reports)."""
+    a, b = grams(a), grams(b)
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def _words(text):
+    words = []
+    for word in normalize_question(text).split():
+        words.extend(CONTRACTIONS.get(word, word).split())
+    return words
+
+
+def _misspells(word, key_word):
+    if len(word) == len(key_word):
+        diff = [i for i in range(len(word)) if word[i] != key_word[i]]
+        return (len(diff) == 2 and diff[1] == diff[0] + 1
+                and word[diff[0]] == key_word[diff[1]] and word[diff[1]] == key_word[diff[0]])
+    if abs(len(word) - len(key_word)) != 1 or len(key_word) < MIN_EDIT_WORD:
+        return False
+    short, long = sorted((word, key_word), key=len)
+    return any(long[:i] + long[i + 1:] == short for i in range(len(long)))
+
+
+def typo_checker(question):
+    """is_typo(question, key) as a function of key, with the question's words prepared once."""
+    from difflib import SequenceMatcher
+
+    a = _words(question)
+    words = set(a)
+    # word -> whether it can stand for a misspelled or respaced question word;
+    # candidate keys share most of their words, so each is judged once
+    near = {}
+
+    def check(key, b=None):
+        b = _words(key) if b is None else b
+        # cheap necessary condition first: every word only the key has must be
+        # a misspelling of, or part of a respaced, word of the question
+        for w in b:
+            if w not in words:
+                ok = near.get(w)
+                if ok is None:
+                    ok = near[w] = any(_misspells(v, w) or v in w or w in v for v in a)
+                if not ok:
+                    return False
+        for op, i1, i2, j1, j2 in SequenceMatcher(None, a, b, autojunk=False).get_opcodes():
+            if op == "equal" or "".join(a[i1:i2]) == "".join(b[j1:j2]):
+                continue
+            if i2 - i1 != j2 - j1 or not all(map(_misspells, a[i1:i2], b[j1:j2])):
+                return False
+        return True
+
+    return check
+
+
+def is_typo(question, key):
+    """True when question reads as key with typos rather than as a different question."""
+    return typo_checker(question)(key)
+
+
+class FuzzyIndex:
+    """Incrementally updated n-gram index; thread-safe."""
+
+    def __init__(self, keys=(), threshold=None):
+        self.threshold = THRESHOLD if threshold is None else threshold
+        self._keys = []
+        # normalized, padded key text and its gram count, for scoring
+        self._texts = []
+        self._sizes = []
+        # key words for the typo check, split once, and their letter count
+        self._words = []
+        self._letters = []
+        self._ids = {}
+        # gram -> [key ids]
+        self._postings = {}
+        # sorted letters of the key words -> [key ids], and every letter seen
+        self._anagrams = {}
+        self._alphabet = set()
+        self._lock = threading.Lock()
+        for key in keys:
+            self.add(key)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._ids
+
+    def add(self, key):
+        """Index a key (no-op if already present)."""
+        with self._lock:
+            if not key or key in self._ids:
+                return
+            key_id = self._ids[key] = len(self._keys)
+            self._keys.append(key)
+            text = _padded(key)
+            key_grams = {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+            size = len(key_grams)
+            self._texts.append(text)
+            self._sizes.append(size)
+            words = tuple(_words(key))
+            self._words.append(words)
+            self._letters.append(sum(map(len, words)))
+            letters = "".join(words)
+            self._anagrams.setdefault("".join(sorted(letters)), []).append(key_id)
+            self._alphabet.update(letters)
+            for gram in key_grams:
+                self._postings.setdefault(gram, []).append(key_id)
+
+    def _df(self, gram):
+        return len(self._postings.get(gram, ()))
+
+    def search(self, question, threshold=None, limit=5, accept=None):
+        """[(score, key)] with Jaccard similarity >= threshold, best first.
+
+        accept(key) -> bool filters candidates as they are scored, so the
+        pruning bound rises with the best accepted key, not any key.
+        """
+        return self._search(question, threshold, limit, accept)
+
+    def _search(self, question, threshold=None, limit=5, accept=None, letters=None):
+        # letters: (lo, hi) bounds on the letter count of the keys considered
+        t = self.threshold if threshold is None else threshold
+        query = grams(question)
+        q = len(query)
+        if not q or t <= 0 or limit < 1:
+            return []
+        with self._lock:
+            postings = [self._postings.get(gram, ()) for gram in sorted(query, key=self._df)]
+
+        counts = Counter()
+        scored = {}  # key id -> score
+        top = []  # best scores >= t, at most limit
+        floor = t
+        done = 0
+        budget = BATCH_POSTINGS
+        while True:
+            # a key scoring >= floor shares one of the q - ceil(floor * q) + 1 rarest grams
+            prefix = q - math.ceil(floor * q - EPS) + 1
+            if done >= prefix:
+                break
+            batch = 0
+            while done < prefix and batch < budget:
+                counts.update(postings[done])
+                batch += len(postings[done])
+                done += 1
+            budget *= 4
+            if done < prefix:
+                # not done yet: score the front-runners only, to raise the floor early
+                probe = counts.most_common(PROBE)
+                if letters is not None:
+                    probe = [(i, c) for i, c in probe if letters[0] <= self._letters[i] <= letters[1]]
+                floor = self._collect(query, probe, q - done, t, floor, limit, scored, top, accept)
+        # grams past the prefix can't add candidates, but counting them for
+        # the ones we have tightens the c + rest bound and spares exact scoring
+        scanned = sum(map(len, postings[:done]))
+        candidates = set(counts)
+        while done < q and scanned + len(postings[done]) <= EXTRA_POSTINGS:
+            counts.update(candidates.intersection(postings[done]))
+            scanned += len(postings[done])
+            done += 1
+        rest = q - done
+        # keys that can't reach the floor even sharing every unscanned gram are dropped
+        # before sorting; most keys share a single gram
+        cmin = math.ceil(floor * q - rest - EPS)
+        front = [i for i, c in counts.items() if c >= cmin]
+        if letters is not None:
+            lo, hi, sizes = letters[0], letters[1], self._letters
+            front = [i for i in front if lo <= sizes[i] <= hi]
+        front.sort(key=counts.__getitem__, reverse=True)
+        self._collect(query, ((i, counts[i]) for i in front), rest, t, floor, limit, scored, top, accept)
+
+        hits = [(round(score, 4), self._keys[i]) for i, score in scored.items() if score >= t - EPS]
+        hits.sort(key=lambda item: (-item[0], len(item[1]), item[1]))
+        return hits[:limit]
+
+    def _collect(self, query, candidates, rest, t, floor, limit, scored, top, accept=None):
+        # candidates: (key id, processed grams shared), most first. A key
+        # sharing c can share at most c + rest overall, so stop once that
+        # can't reach the floor.
+        q = len(query)
+        sizes, texts = self._sizes, self._texts
+        for i, c in candidates:
+            if c + rest < floor * q - EPS:
+                break
+            if i in scored:
+                continue
+            size = sizes[i]
+            overlap = min(c + rest, size)
+            if overlap < floor * (q + size - overlap) - EPS:
+                continue
+            text = texts[i]
+            common = len(query & {text[j:j + GRAM] for j in range(len(text) - GRAM + 1)})
+            score = scored[i] = common / (q + size - common)
+            if score >= floor - EPS and accept is not None and not accept(self._keys[i]):
+                # rejected: remembered so it isn't scored again, never returned
+                scored[i] = -1.0
+            elif score >= floor - EPS:
+                top.append(score)
+                top.sort(reverse=True)
+                del top[limit:]
+                if len(top) == limit:
+                    floor = max(t, top[-1])
+        return floor
+
+    def best(self, question, threshold=None):
+        """(score, key) of the closest key the question is a typo of, or None."""
+        t = self.threshold if threshold is None else threshold
+        check, ids, words = typo_checker(question), self._ids, self._words
+        # swaps and respacing keep the letters of the question; a dropped or
+        # doubled letter adds or removes one, in words long enough for that
+        question_words = _words(question)
+        letters = "".join(question_words)
+        long_words = [word for word in question_words if len(word) >= MIN_EDIT_WORD - 1]
+        if len(long_words) <= 1 or len(long_words) == 2 and self._prefix_postings(question, t) > ANAGRAM_POSTINGS:
+            return self._best_anagram(question, t, letters, long_words, check)
+        slack = len(long_words)
+        hits = self._search(question, t, 1, lambda key: check(key, words[ids[key]]),
+                            (len(letters) - slack, len(letters) + slack))
+        return hits[0] if hits else None
+
+    def _prefix_postings(self, question, t):
+        # postings a search scans before any match raises the bound
+        query = grams(question)
+        with self._lock:
+            sizes = sorted(map(self._df, query))
+        return sum(sizes[:len(query) - math.ceil(t * len(query) - EPS) + 1])
+
+    def _best_anagram(self, question, t, letters, long_words, check):
+        # sorted letters of every key the question could misspell
+        variants = {"".join(sorted(letters))}
+        with self._lock:
+            for word in long_words:
+                edited = set()
+                for text in variants:
+                    edited.update(text.replace(c, "", 1) for c in set(word))
+                    edited.update(text[:i] + c + text[i:] for c in self._alphabet for i in (bisect_right(text, c),))
+                variants |= edited
+            ids = [i for variant in variants for i in self._anagrams.get(variant, ())]
+        query = grams(question)
+        q = len(query)
+        hits = []
+        for i in ids:
+            text, size = self._texts[i], self._sizes[i]
+            common = len(query & {text[j:j + GRAM] for j in range(len(text) - GRAM + 1)})
+            score = common / (q + size - common)
+            if score >= t - EPS and check(self._keys[i], self._words[i]):
+                hits.append((round(score, 4), self._keys[i]))
+        return min(hits, key=lambda item: (-item[0], len(item[1]), item[1]), default=None)
@@ -0,0 +1,218 @@
+import os
+import threading
+import time
+from collections import deque
+
+import openrouter_client
+
+# Ordered upstream targets with hedging and fallback.
+#
+# ALPHA_MODELS is a comma-separated list of "model" or "model@endpoint-url"
+# entries, primary first. A blocking call starts on the primary; if it has not
+# answered within that target's hedge delay (its tracked p95 latency), a
+# duplicate goes to the next target and the first 200 wins. Hard errors fall
+# back to the next target straight away. Losers are cancelled: their replies
+# are discarded and they stop retrying.
+#
+#   ALPHA_HEDGE=0             turn hedging off (fallback still applies)
+#   ALPHA_HEDGE_DELAY         delay before enough samples exist (default 4s)
+#   ALPHA_HEDGE_MIN_DELAY     lower bound for the p95-based delay (default 0.5s)
+
+DEFAULT_MODEL = "deepseek/deepseek-chat"
+HEDGE_ENABLED = os.getenv("ALPHA_HEDGE", "1") != "0"
+HEDGE_DELAY = float(os.getenv("ALPHA_HEDGE_DELAY", "4"))
+HEDGE_MIN_DELAY = float(os.getenv("ALPHA_HEDGE_MIN_DELAY", "0.5"))
+# p95 is only trusted once a target has this many samples
+MIN_SAMPLES = 20
+WINDOW = 200
+
+# auth failures are the same on every target; don't fan them out
+NO_FALLBACK_STATUSES = {401, 403}
+
+
+class Target:
+    __slots__ = ("model", "url")
+
+    def __init__(self, model, url=None):
+        self.model = model
+        self.url = url
+
+    def __repr__(self):
+        return f"Target({self.model!r}, {self.url!r})"
+
+    @property
+    def key(self):
+        """Latency-tracking key: the same model behind another endpoint is another target."""
+        return self.model, self.url
+
+
+def parse_targets(spec):
+    """'model-a, model-b@https://host/v1/chat/completions' -> [Target, Target]."""
+    targets = []
+    for entry in (spec or "").split(","):
+        entry = entry.strip()
+        if not entry:
+            continue
+        model, _, url = entry.partition("@")
+        targets.append(Target(model.strip(), url.strip() or None))
+    return targets or [Target(DEFAULT_MODEL)]
+
+
+_targets = parse_targets(os.getenv("ALPHA_MODELS", DEFAULT_MODEL))
+
+
+def get_targets():
+    return _targets
+
+
+def configure(models=None, hedge=None, hedge_delay=None):
+    """Override the target list ("a,b@url" or a list of Targets) and hedge settings."""
+    global _targets, HEDGE_ENABLED, HEDGE_DELAY
+    if models is not None:
+        _targets = parse_targets(models) if isinstance(models, str) else list(models)
+    if hedge is not None:
+        HEDGE_ENABLED = bool(hedge)
+    if hedge_delay is not None:
+        HEDGE_DELAY = float(hedge_delay)
+
+
+class LatencyTracker:
+    """Rolling latency window per target, used for the adaptive hedge delay."""
+
+    def __init__(self, window=WINDOW):
+        self._samples = {}
+        self._window = window
+        self._lock = threading.Lock()
+
+    def record(self, key, seconds):
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self._window)).append(seconds)
+
+    def quantile(self, key, q):
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < MIN_SAMPLES:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def hedge_delay(self, key):
+        p95 = self.quantile(key, 0.95)
+        return HEDGE_DELAY if p95 is None else max(HEDGE_MIN_DELAY, p95)
+
+
+latency = LatencyTracker()
+# hedges and fallbacks actually launched (for the debug panels)
+counters = {"hedged": 0, "fallbacks": 0}
+_counters_lock = threading.Lock()
+
+_executor = None
+
+
+def _count(name):
+    with _counters_lock:
+        counters[name] += 1
+
+
+def _get_executor():
+    # created on first multi-target call; single-model setups never need it
+    global _executor
+    with _counters_lock:
+        if _executor is None:
+            from concurrent.futures import ThreadPoolExecutor
+
+            _executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="hedge")
+        return _executor
+
+
+def _attempt(payload, api_key, target, cancel):
+    start = time.monotonic()
+    response = openrouter_client.post_chat(dict(payload, model=target.model), api_key,
+                                           url=target.url, cancel=cancel)
+    if cancel.is_set():
+        response.close()
+    elif response.status_code == 200:
+        latency.record(target.key, time.monotonic() - start)
+    return response
+
+
+def _not_ok(future):
+    return future.exception() is not None or future.result().status_code != 200
+
+
+def _close(outcome):
+    if outcome is not None and not isinstance(outcome[0], Exception):
+        outcome[0].close()
+
+
+def post_hedged(payload, api_key, targets=None, hedge=None):
+    """POST to the first target that answers, hedging slow ones and falling back on errors.
+
+    Returns (requests.Response, Target) for the winning (or last failing)
+    attempt. Raises the last exception when every target failed that way.
+    """
+    targets = targets or get_targets()
+    if len(targets) == 1:
+        # nothing to hedge or fall back to; skip the thread hop
+        return _attempt(payload, api_key, targets[0], threading.Event()), targets[0]
+    from concurrent.futures import FIRST_COMPLETED, wait
+
+    hedge = HEDGE_ENABLED if hedge is None else hedge
+    executor = _get_executor()
+    pending = {}
+    launched = 0
+    last_launch = 0.0
+    last_failure = None
+
+    def launch():
+        nonlocal launched, last_launch
+        target = targets[launched]
+        cancel = threading.Event()
+        pending[executor.submit(_attempt, payload, api_key, target, cancel)] = (target, cancel)
+        launched += 1
+        last_launch = time.monotonic()
+
+    def cancel_all():
+        for _, cancel in pending.values():
+            cancel.set()
+
+    launch()
+    while pending:
+        timeout = None
+        if hedge and launched < len(targets):
+            delay = latency.hedge_delay(targets[launched - 1].key)
+            timeout = max(0.0, last_launch + delay - time.monotonic())
+        done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+        if not done:
+            _count("hedged")
+            launch()
+            continue
+
+        winner = None
+        # a 200 beats an auth failure that finished in the same round
+        for future in sorted(done, key=_not_ok):
+            target, _ = pending.pop(future)
+            try:
+                response = future.result()
+            except Exception as e:
+                outcome = (e, target)
+            else:
+                outcome = (response, target)
+                if winner is None and (response.status_code == 200
+                                       or response.status_code in NO_FALLBACK_STATUSES):
+                    winner = outcome
+                    continue
+            # only the latest failure is returned; release the connections of the rest
+            _close(last_failure)
+            last_failure = outcome
+            if winner is None and launched < len(targets):
+                _count("fallbacks")
+                launch()
+        if winner is not None:
+            cancel_all()
+            _close(last_failure)
+            return winner
+
+    failure, target = last_failure
+    if isinstance(failure, Exception):
+        raise failure
+    return failure, target
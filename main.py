@@ -1,80 +1,13 @@
-import requests
-import json
 import os
-import webbrowser
-from dotenv import load_dotenv
+from engine import call_deepseek_api, detect_user_type, match_custom_response, teach
 
-load_dotenv()
+current_api_key = ""
 
-current_api_key = os.getenv('OPENROUTER_API_KEY', '').strip()
+# Print answers token by token as they arrive (toggle with StReAm)
+stream_enabled = True
 
-# User profile tracking
-user_profile = {
-    "type": "general",  # general, beginner, expert, student, professional
-    "interests": [],
-    "previous_questions": []
-}
-
-# Custom responses with multiple options based on user type
-custom_responses = {
-    "what is your name": {
-        "general": "I am alpha AI, your helpful assistant.",
-        "beginner": "Hi! I'm alpha AI, your friendly AI helper. I'm here to make things simple for you!",
-        "expert": "I am alpha AI, an advanced language model designed for complex problem-solving and analysis.",
-        "student": "Hello! I'm alpha AI, your study buddy. I can help you learn and understand concepts better.",
-        "professional": "I am alpha AI, your professional AI assistant for business and technical tasks."
-    },
-    "what is python": {
-        "general": "Python is a high-level programming language known for its simplicity and readability.",
-        "beginner": "Python is like a friendly programming language that's easy to learn! It's great for beginners because it reads almost like English.",
-        "expert": "Python is a dynamically-typed, interpreted high-level language with extensive libraries for data science, web development, and automation.",
-        "student": "Python is a programming language perfect for learning! It's used in schools because it's easy to understand and has many applications.",
-        "professional": "Python is a versatile programming language widely used in enterprise applications, data analysis, machine learning, and web development."
-    },
-    "hello": {
-        "general": "Hello! How can I help you today?",
-        "beginner": "Hi there! Welcome! Don't worry if you're new to this - I'll explain everything clearly.",
-        "expert": "Hello. What technical challenge can I help you solve today?",
-        "student": "Hey! Ready to learn something new? What topic interests you?",
-        "professional": "Good day. How can I assist you with your work today?"
-    },
-    "hi": {
-        "general": "Hi there! What would you like to know?",
-        "beginner": "Hi! I'm excited to help you learn! What would you like to explore?",
-        "expert": "Hi. What complex problem are we tackling today?",
-        "student": "Hi! Let's dive into some learning. What subject are you working on?",
-        "professional": "Hi. What business or technical task can I help you with?"
-    }
-}
-
-# Initialize DeepSeek via OpenRouter API
-def call_deepseek_api(question, api_key: str):
-    url = "https://openrouter.ai/api/v1/chat/completions"
-    if not api_key:
-        return {"error": "Missing API key. Type ChAnGe to set it."}
-
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {api_key}"
-    }
-    
-    data = {
-        "model": "deepseek/deepseek-chat",
-        "messages": [
-            {"role": "user", "content": f"Question: {question}\nAnswer:"}
-        ],
-        "temperature": 0.7,
-        "max_tokens": 256
-    }
-    
-    response = requests.post(url, headers=headers, json=data)
-    
-    if response.status_code != 200:
-        print(f"API Error: {response.status_code}")
-        print(f"Response: {response.text}")
-        return {"error": f"HTTP {response.status_code}"}
-    
-    return response.json()
+# User profile tracking (type, interests, last 10 questions) for this CLI session
+SESSION_ID = "cli"
 
 def _mask_key(key: str) -> str:
     if not key:
@@ -83,170 +16,191 @@ def _mask_key(key: str) -> str:
         return "*" * len(key)
     return f"{key[:4]}...{key[-4:]}"
 
-def detect_user_type(question):
-    """Simple user type detection based on question patterns"""
-    question_lower = question.lower()
-    
-    # Beginner indicators
-    beginner_words = ["what is", "how do i", "explain", "simple", "easy", "beginner", "new to", "don't understand"]
-    if any(word in question_lower for word in beginner_words):
-        return "beginner"
-    
-    # Expert indicators  
-    expert_words = ["algorithm", "optimization", "architecture", "implementation", "performance", "scalability", "enterprise"]
-    if any(word in question_lower for word in expert_words):
-        return "expert"
-    
-    # Student indicators
-    student_words = ["homework", "assignment", "study", "exam", "course", "learn", "tutorial", "practice"]
-    if any(word in question_lower for word in student_words):
-        return "student"
-    
-    # Professional indicators
-    professional_words = ["business", "project", "team", "meeting", "deadline", "client", "budget", "strategy"]
-    if any(word in question_lower for word in professional_words):
-        return "professional"
-    
-    return "general"
-
-def get_custom_response(question):
-    """Get appropriate response based on user type"""
-    question_lower = question.lower()
-    
-    if question_lower in custom_responses:
-        responses = custom_responses[question_lower]
-        if isinstance(responses, dict):
-            # Multiple responses available - choose based on user type
-            user_type = user_profile["type"]
-            if user_type in responses:
-                return responses[user_type]
-            else:
-                return responses.get("general", "I don't have a specific response for that.")
-        else:
-            # Single response (backward compatibility)
-            return responses
-    
-    return None
+def _announce_taught(changes, remote):
+    # another process (Streamlit, server, another CLI) taught something
+    if remote:
+        print(f"\n[{len(changes)} custom response(s) taught elsewhere are now available]")
 
 # Interactive chat loop
-print("Alpha AI Chat - Type 'quit' to exit | Type 'ChAnGe' to set API key | Type 'TeAcH' to add custom responses | Type 'PrOfIlE' to set user type | Type 'WeAtHeR' for weather")
-print("-" * 40)
+def main():
+    global current_api_key, stream_enabled
+    from dotenv import load_dotenv
+
+    import metrics
+    import question_log
+    import sessions
+    import teach_store
+    import traces
+    import warmup
+
+    load_dotenv()
+    current_api_key = os.getenv('OPENROUTER_API_KEY', '').strip()
+    stream_enabled = os.getenv('ALPHA_STREAM', '1') != '0'
+    session_manager = sessions.get_manager()
+    # ALPHA_TRACE_FILE records this session for benchmarks/load_test.py
+    tracer = traces.TraceRecorder(traces.TRACE_PATH) if traces.TRACE_PATH else None
+
+    print("Alpha AI Chat - Type 'quit' to exit | Type 'ChAnGe' to set API key | Type 'TeAcH' to add custom responses | Type 'PrOfIlE' to set user type | Type 'WeAtHeR' for weather | Type 'StReAm' to toggle streaming | Type 'MeTrIcS' for stage timings")
+    print("-" * 40)
 
-while True:
-    question = input("\nYou: ").strip()
+    store = teach_store.get_store()
+    if store is not None:
+        store.subscribe(_announce_taught)
+    # pre-answers frequent logged questions when ALPHA_WARMUP=1 (see warmup.py)
+    warmup.start_background(current_api_key)
+
+    while True:
+        if store is not None:
+            store.poll()
+        question = input("\nYou: ").strip()
+    
+        if question.lower() in ['quit', 'exit', 'bye']:
+            print("Goodbye!")
+            break
+    
+        if question == 'ChAnGe':
+            new_key = input("Enter new OpenRouter API key: ").strip()
+            if new_key:
+                current_api_key = new_key
+                print("API key updated.")
+            else:
+                print("No key entered. API key not changed.")
+            continue
     
-    if question.lower() in ['quit', 'exit', 'bye']:
-        print("Goodbye!")
-        break
+        if question == 'StAtUs':
+            print(f"Current API key: {_mask_key(current_api_key)}")
+            probe = call_deepseek_api("ping", current_api_key, use_cache=False,
+                                      user_type=session_manager.get_type(SESSION_ID))
+            if "choices" in probe:
+                print("Status: key appears valid.")
+            else:
+                print(f"Status: key may be invalid. Error: {probe.get('error', 'Unknown error')}")
+            continue
     
-    if question == 'ChAnGe':
-        new_key = input("Enter new OpenRouter API key: ").strip()
-        if new_key:
-            current_api_key = new_key
-            print("API key updated.")
-        else:
-            print("No key entered. API key not changed.")
-        continue
+        if question == 'StReAm':
+            stream_enabled = not stream_enabled
+            print(f"Streaming {'enabled' if stream_enabled else 'disabled'}.")
+            continue
     
-    if question == 'StAtUs':
-        print(f"Current API key: {_mask_key(current_api_key)}")
-        probe = call_deepseek_api("ping", current_api_key)
-        if "choices" in probe:
-            print("Status: key appears valid.")
-        else:
-            print(f"Status: key may be invalid. Error: {probe.get('error', 'Unknown error')}")
-        continue
+        if question == 'MeTrIcS':
+            if metrics.ENABLED:
+                print(metrics.export_prometheus(), end="")
+            else:
+                print("Metrics are off. Start with ALPHA_METRICS=1 to collect stage timings.")
+            continue
     
-    if question == 'TeAcH':
-        print("Teaching mode - Add custom responses")
-        print("Available user types: general, beginner, expert, student, professional")
-        user_type = input("Enter user type (required): ").strip().lower()
+        if question == 'TeAcH':
+            print("Teaching mode - Add custom responses")
+            print("Available user types: general, beginner, expert, student, professional")
+            user_type = input("Enter user type (required): ").strip().lower()
         
-        if user_type not in ["general", "beginner", "expert", "student", "professional"]:
-            print("Invalid user type. Please choose from: general, beginner, expert, student, professional")
-            continue
+            if user_type not in ["general", "beginner", "expert", "student", "professional"]:
+                print("Invalid user type. Please choose from: general, beginner, expert, student, professional")
+                continue
             
-        teach_question = input("Enter the question: ").strip().lower()
-        if teach_question:
-            teach_answer = input("Enter the answer: ").strip()
-            if teach_answer:
-                if teach_question not in custom_responses:
-                    custom_responses[teach_question] = {}
-                custom_responses[teach_question][user_type] = teach_answer
-                print(f"Added: '{teach_question}' for {user_type} -> '{teach_answer}'")
+            teach_question = input("Enter the question: ").strip().lower()
+            if teach_question:
+                teach_answer = input("Enter the answer: ").strip()
+                if teach_answer:
+                    responses = teach(teach_question, user_type, teach_answer)
+                    if tracer is not None:
+                        tracer.record("teach", question=teach_question, user_type=user_type, answer=teach_answer)
+                    print(f"Added: '{teach_question}' for {user_type} -> '{teach_answer}'")
                 
-                # Show all responses for this question if multiple exist
-                if len(custom_responses[teach_question]) > 1:
-                    print(f"All responses for '{teach_question}':")
-                    for profile, response in custom_responses[teach_question].items():
-                        print(f"  {profile}: {response}")
+                    # Show all responses for this question if multiple exist
+                    if len(responses) > 1:
+                        print(f"All responses for '{teach_question}':")
+                        for profile, response in responses.items():
+                            print(f"  {profile}: {response}")
+                else:
+                    print("No answer provided.")
             else:
-                print("No answer provided.")
-        else:
-            print("No question provided.")
-        continue
-    
-    if question == 'PrOfIlE':
-        print(f"Current profile: {user_profile}")
-        print("Available types: general, beginner, expert, student, professional")
-        new_type = input("Set your user type: ").strip().lower()
-        if new_type in ["general", "beginner", "expert", "student", "professional"]:
-            user_profile["type"] = new_type
-            print(f"User type set to: {new_type}")
-        else:
-            print("Invalid user type.")
-        continue
-    
-    if question == 'WeAtHeR':
-        city = input("Enter city name: ").strip()
-        if city:
-            # Open weather website for the city
-            weather_url = f"https://www.google.com/search?q=weather+{city.replace(' ', '+')}"
-            try:
-                webbrowser.open(weather_url)
-                print(f"Alpha: Opening weather information for {city} in your browser...")
-            except Exception as e:
-                print(f"Alpha: Could not open browser. Please visit: {weather_url}")
-        else:
-            print("Alpha: No city provided.")
-        continue
+                print("No question provided.")
+            continue
     
-    if question.startswith('weather in '):
-        city = question[len('weather in '):].strip()
-        if city:
-            weather_url = f"https://www.google.com/search?q=weather+{city.replace(' ', '+')}"
-            try:
-                webbrowser.open(weather_url)
-                print(f"Alpha: Opening weather information for {city} in your browser...")
-            except Exception as e:
-                print(f"Alpha: Could not open browser. Please visit: {weather_url}")
-        else:
-            print("Alpha: Please specify a city, e.g., weather in London")
-        continue
+        if question == 'PrOfIlE':
+            print(f"Current profile: {session_manager.profile(SESSION_ID)}")
+            print("Available types: general, beginner, expert, student, professional")
+            new_type = input("Set your user type: ").strip().lower()
+            if new_type in ["general", "beginner", "expert", "student", "professional"]:
+                session_manager.set_type(SESSION_ID, new_type)
+                if tracer is not None:
+                    tracer.record("profile", type=new_type)
+                print(f"User type set to: {new_type}")
+            else:
+                print("Invalid user type.")
+            continue
     
-    if not question:
-        print("Please enter a question.")
-        continue
+        if question == 'WeAtHeR':
+            city = input("Enter city name: ").strip()
+            if city:
+                import webbrowser
+
+                # Open weather website for the city
+                weather_url = f"https://www.google.com/search?q=weather+{city.replace(' ', '+')}"
+                try:
+                    webbrowser.open(weather_url)
+                    print(f"Alpha: Opening weather information for {city} in your browser...")
+                except Exception as e:
+                    print(f"Alpha: Could not open browser. Please visit: {weather_url}")
+            else:
+                print("Alpha: No city provided.")
+            continue
     
-    # Update user profile based on question
-    detected_type = detect_user_type(question)
-    if detected_type != "general":
-        user_profile["type"] = detected_type
+        if question.startswith('weather in '):
+            city = question[len('weather in '):].strip()
+            if city:
+                import webbrowser
+
+                weather_url = f"https://www.google.com/search?q=weather+{city.replace(' ', '+')}"
+                try:
+                    webbrowser.open(weather_url)
+                    print(f"Alpha: Opening weather information for {city} in your browser...")
+                except Exception as e:
+                    print(f"Alpha: Could not open browser. Please visit: {weather_url}")
+            else:
+                print("Alpha: Please specify a city, e.g., weather in London")
+            continue
     
-    # Track previous questions
-    user_profile["previous_questions"].append(question)
-    if len(user_profile["previous_questions"]) > 10:  # Keep only last 10
-        user_profile["previous_questions"] = user_profile["previous_questions"][-10:]
+        if not question:
+            print("Please enter a question.")
+            continue
     
-    # Check for custom responses first
-    custom_response = get_custom_response(question)
-    if custom_response:
-        print("Alpha:", custom_response)
-    else:
-        print("Alpha: ", end="")
-        result = call_deepseek_api(question, current_api_key)
-        
-        if "choices" in result:
-            print(result["choices"][0]["message"]["content"])
+        if tracer is not None:
+            tracer.record("ask", question=question)
+    
+        # Update user profile based on question and track it among the last 10
+        user_type = session_manager.record_question(SESSION_ID, question, detect_user_type(question))
+    
+        # Check for custom responses first (typos match the closest question)
+        match = match_custom_response(question, user_type)
+        question_log.record(question, user_type, match is not None)
+        if match:
+            custom_response, matched, score = match
+            if score < 1:
+                print(f"(closest custom response: '{matched}', similarity {score:.2f})")
+            print("Alpha:", custom_response)
+            session_manager.record_answer(SESSION_ID, question, custom_response)
         else:
-            print("Error:", result.get("error", "Unknown error"))
+            # earlier turns go along when ALPHA_CONTEXT_TOKENS is set (see chat_context.py)
+            context = session_manager.conversation(SESSION_ID)
+            print("Alpha: ", end="", flush=True)
+            if stream_enabled:
+                result = call_deepseek_api(question, current_api_key, user_type=user_type, context=context,
+                                           on_token=lambda text: print(text, end="", flush=True))
+                if "choices" in result:
+                    print()
+            else:
+                result = call_deepseek_api(question, current_api_key, user_type=user_type, context=context)
+                if "choices" in result:
+                    print(result["choices"][0]["message"]["content"])
+        
+            if "choices" in result:
+                session_manager.record_answer(SESSION_ID, question, result["choices"][0]["message"]["content"])
+            elif not current_api_key:
+                print("Error:", result.get("error", "Unknown error"), "Type ChAnGe to set it.")
+            else:
+                print("Error:", result.get("error", "Unknown error"))
+
+if __name__ == "__main__":
+    main()
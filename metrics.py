@@ -0,0 +1,199 @@
+import json
+import os
+import sys
+import threading
+import time
+
+# Per-stage timing spans and counters for the question pipeline
+# (detect -> custom lookup -> upstream request -> parse), exported as
+# Prometheus text (server.py serves it at /metrics) and optionally written
+# as one JSON line per span. Off by default: span() then hands back a shared
+# no-op and inc()/observe() return at once.
+#
+# Env settings:
+#   ALPHA_METRICS       "1" turns collection on
+#   ALPHA_METRICS_LOG   JSON-lines span log: a file path, or "-" for stderr (unset = off)
+
+ENABLED = os.getenv("ALPHA_METRICS", "0") == "1"
+LOG_PATH = os.getenv("ALPHA_METRICS_LOG") or None
+
+PREFIX = "alpha_"
+# histogram bucket upper bounds, seconds
+BUCKETS = (0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+_lock = threading.Lock()
+_counters = {}  # (name, labels) -> value
+_histograms = {}  # (stage, labels) -> [bucket counts..., +Inf count, sum]
+_sinks = []
+
+
+def _key(name, labels):
+    return name, tuple(sorted(labels.items())) if labels else ()
+
+
+def inc(name, amount=1, **labels):
+    """Add to a counter, e.g. inc("custom_lookups_total", result="hit")."""
+    if not ENABLED:
+        return
+    key = _key(name, labels)
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def observe(stage, seconds, **labels):
+    """Record one stage duration; sinks (JSON log, add_sink callbacks) see it too."""
+    if not ENABLED:
+        return
+    key = _key(stage, labels)
+    with _lock:
+        row = _histograms.get(key)
+        if row is None:
+            row = _histograms[key] = [0] * (len(BUCKETS) + 2)
+        for i, bound in enumerate(BUCKETS):
+            if seconds <= bound:
+                row[i] += 1
+                break
+        else:
+            row[len(BUCKETS)] += 1
+        row[-1] += seconds
+        sinks = list(_sinks)
+    for sink in sinks:
+        sink(stage, seconds, labels)
+
+
+class _Span:
+    __slots__ = ("stage", "labels", "start")
+
+    def __init__(self, stage, labels):
+        self.stage = stage
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def label(self, **labels):
+        self.labels.update(labels)
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.labels["error"] = exc_type.__name__
+        observe(self.stage, time.perf_counter() - self.start, **self.labels)
+
+
+class _NoSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def label(self, **labels):
+        pass
+
+    def __exit__(self, exc_type, exc, tb):
+        return None
+
+
+_NO_SPAN = _NoSpan()
+
+
+def span(stage, **labels):
+    """Time a `with` block as one stage; span.label(...) adds labels known only inside it."""
+    if not ENABLED:
+        return _NO_SPAN
+    return _Span(stage, labels)
+
+
+def add_sink(callback):
+    """Also send every observation to callback(stage, seconds, labels)."""
+    with _lock:
+        _sinks.append(callback)
+
+
+def remove_sink(callback):
+    with _lock:
+        _sinks.remove(callback)
+
+
+class JsonLogSink:
+    """Writes one JSON object per span to a stream."""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self._lock = threading.Lock()
+
+    def __call__(self, stage, seconds, labels):
+        line = json.dumps({"ts": round(time.time(), 6), "stage": stage, "ms": round(seconds * 1e3, 3), **labels})
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+
+def configure(enabled=None, log_path=None):
+    """Turn collection on/off and attach a JSON span log ("-" = stderr)."""
+    global ENABLED
+    if enabled is not None:
+        ENABLED = bool(enabled)
+    if log_path:
+        stream = sys.stderr if log_path == "-" else open(log_path, "a", encoding="utf-8")
+        add_sink(JsonLogSink(stream))
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+def snapshot():
+    """Counters and per-stage count/sum as plain dicts (debug panels, tests)."""
+    with _lock:
+        counters = {_render(PREFIX + name, labels): value for (name, labels), value in _counters.items()}
+        stages = {_render(stage, labels): {"count": sum(row[:-1]), "sum_s": round(row[-1], 6)}
+                  for (stage, labels), row in _histograms.items()}
+    return {"enabled": ENABLED, "counters": counters, "stages": stages}
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _render(name, labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return name
+    return name + "{" + ",".join(f'{k}="{_escape(v)}"' for k, v in pairs) + "}"
+
+
+def export_prometheus():
+    """Every counter and stage histogram in Prometheus text exposition format."""
+    with _lock:
+        counters = sorted(_counters.items())
+        histograms = sorted((key, list(row)) for key, row in _histograms.items())
+    lines = []
+    typed = set()
+    for (name, labels), value in counters:
+        metric = PREFIX + name
+        if metric not in typed:
+            typed.add(metric)
+            lines.append(f"# TYPE {metric} counter")
+        lines.append(f"{_render(metric, labels)} {value}")
+    metric = PREFIX + "stage_seconds"
+    if histograms:
+        lines.append(f"# HELP {metric} Time spent per pipeline stage.")
+        lines.append(f"# TYPE {metric} histogram")
+    for (stage, labels), row in histograms:
+        labels = (("stage", stage),) + labels
+        cumulative = 0
+        for bound, count in zip(BUCKETS, row):
+            cumulative += count
+            lines.append(f"{_render(metric + '_bucket', labels, [('le', bound)])} {cumulative}")
+        cumulative += row[len(BUCKETS)]
+        lines.append(f"{_render(metric + '_bucket', labels, [('le', '+Inf')])} {cumulative}")
+        lines.append(f"{_render(metric + '_sum', labels)} {row[-1]:.6f}")
+        lines.append(f"{_render(metric + '_count', labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+if LOG_PATH:
+    configure(log_path=LOG_PATH)
@@ -0,0 +1,230 @@
+import json
+import os
+import random
+import threading
+import time
+from collections import OrderedDict
+
+import metrics
+import rate_limiter
+
+# Shared, pooled HTTP client for OpenRouter. Both main.py and streamlit_app.py
+# go through here so connections (TCP + TLS) are reused between questions.
+# requests is imported on first use to keep startup cheap.
+
+API_URL = os.getenv("OPENROUTER_URL", "https://openrouter.ai/api/v1/chat/completions")
+
+# Tunables (env overrides, or call configure() at startup)
+POOL_SIZE = int(os.getenv("OPENROUTER_POOL_SIZE", "10"))
+CONNECT_TIMEOUT = float(os.getenv("OPENROUTER_CONNECT_TIMEOUT", "5"))
+READ_TIMEOUT = float(os.getenv("OPENROUTER_READ_TIMEOUT", "30"))
+MAX_RETRIES = int(os.getenv("OPENROUTER_MAX_RETRIES", "3"))
+BACKOFF_BASE = float(os.getenv("OPENROUTER_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("OPENROUTER_BACKOFF_MAX", "8"))
+# per-key sessions kept; the least recently used one is closed past this
+MAX_SESSIONS = int(os.getenv("OPENROUTER_MAX_SESSIONS", "4"))
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+# statuses that mean "slow down" to the rate limiter
+THROTTLE_STATUSES = {429, 503}
+
+
+class UpstreamError(Exception):
+    """Non-200 reply (or in-stream error event) from the completions endpoint."""
+
+    def __init__(self, status_code, text=""):
+        super().__init__(f"HTTP {status_code}: {text}")
+        self.status_code = status_code
+        self.text = text
+
+
+_sessions = OrderedDict()  # api key -> session, least recently used first
+_sessions_lock = threading.Lock()
+
+
+def configure(url=None, pool_size=None, connect_timeout=None, read_timeout=None,
+              max_retries=None, backoff_base=None, backoff_max=None):
+    """Override client settings. Existing pooled sessions are dropped."""
+    global API_URL, POOL_SIZE, CONNECT_TIMEOUT, READ_TIMEOUT, MAX_RETRIES, BACKOFF_BASE, BACKOFF_MAX
+    if url is not None:
+        API_URL = url
+    if pool_size is not None:
+        POOL_SIZE = int(pool_size)
+    if connect_timeout is not None:
+        CONNECT_TIMEOUT = float(connect_timeout)
+    if read_timeout is not None:
+        READ_TIMEOUT = float(read_timeout)
+    if max_retries is not None:
+        MAX_RETRIES = int(max_retries)
+    if backoff_base is not None:
+        BACKOFF_BASE = float(backoff_base)
+    if backoff_max is not None:
+        BACKOFF_MAX = float(backoff_max)
+    close_sessions()
+
+
+def get_session(api_key: str):
+    """Return the keep-alive session for this API key (one pool per key, MAX_SESSIONS kept)."""
+    evicted = []
+    with _sessions_lock:
+        session = _sessions.get(api_key)
+        if session is not None:
+            _sessions.move_to_end(api_key)
+        else:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            session = requests.Session()
+            # retries are handled in post_chat so we control the backoff
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=POOL_SIZE, max_retries=0)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            session.headers.update({
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {api_key}"
+            })
+            _sessions[api_key] = session
+            while len(_sessions) > max(1, MAX_SESSIONS):
+                evicted.append(_sessions.popitem(last=False)[1])
+    # replaced keys (CLI ChAnGe, per-request server keys) don't keep their pools
+    for old in evicted:
+        old.close()
+    return session
+
+
+def close_sessions():
+    """Close every pooled session (used on shutdown and by configure())."""
+    with _sessions_lock:
+        sessions = list(_sessions.values())
+        _sessions.clear()
+    for session in sessions:
+        session.close()
+
+
+def backoff_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff for the given retry attempt (0-based)."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * (2 ** attempt)))
+
+
+def estimate_tokens(payload: dict) -> int:
+    """Rough token cost of a request for the tokens/min bucket (~4 chars per token)."""
+    prompt = sum(len(str(m.get("content", ""))) for m in payload.get("messages", []))
+    return prompt // 4 + int(payload.get("max_tokens", 0))
+
+
+def post_chat(payload: dict, api_key: str, timeout=None, max_retries=None, url=None, cancel=None):
+    """POST a chat completion payload, retrying 429/5xx and connection resets.
+
+    Every attempt goes through the API key's rate limiter. Returns the final
+    requests.Response (which may still be a non-200). Raises
+    requests.RequestException once retries are exhausted and
+    rate_limiter.RateLimitTimeout when no slot frees up in time.
+    url overrides the endpoint; setting the cancel Event stops further retries.
+    """
+    return _send(payload, api_key, timeout, max_retries, url=url, cancel=cancel)
+
+
+def stream_chat(payload: dict, api_key: str, timeout=None, max_retries=None, url=None):
+    """Yield content deltas from a streamed (SSE) chat completion.
+
+    Retries only happen before the first byte; once tokens flow, errors
+    surface as UpstreamError / requests.RequestException to the caller.
+    """
+    response = _send(dict(payload, stream=True), api_key, timeout, max_retries, stream=True, url=url)
+    if response.status_code != 200:
+        with response:
+            raise UpstreamError(response.status_code, response.text)
+    # a successful stream keeps its limiter slot until it is fully read
+    with response:
+        try:
+            yield from _iter_deltas(response)
+        finally:
+            rate_limiter.get_limiter(api_key).release(response.status_code)
+
+
+def _iter_deltas(response):
+    # SSE has no charset in its content type; OpenRouter sends UTF-8
+    response.encoding = "utf-8"
+    for line in response.iter_lines(decode_unicode=True):
+        # skip blank separators and ": OPENROUTER PROCESSING" keep-alive comments
+        if not line or not line.startswith("data:"):
+            continue
+        data = line[5:].strip()
+        if data == "[DONE]":
+            break
+        chunk = json.loads(data)
+        if "error" in chunk:
+            error = chunk["error"]
+            raise UpstreamError(error.get("code", 500), error.get("message", ""))
+        choices = chunk.get("choices") or []
+        if choices:
+            text = (choices[0].get("delta") or {}).get("content")
+            if text:
+                yield text
+
+
+def _connections_opened(session, url):
+    # connections urllib3 has created across the session's host pools
+    pools = session.get_adapter(url).poolmanager.pools
+    return sum(pools[key].num_connections for key in pools.keys())
+
+
+def _connection_kind(session, url, opened_before):
+    if not metrics.ENABLED:
+        return None
+    opened = _connections_opened(session, url) - opened_before
+    if opened:
+        metrics.inc("upstream_connections_opened_total", opened)
+    return "new" if opened else "reused"
+
+
+def _send(payload, api_key, timeout=None, max_retries=None, stream=False, url=None, cancel=None):
+    # The limiter slot is released here, except for a 200 stream=True
+    # response: stream_chat releases that one when the stream ends.
+    import requests
+
+    session = get_session(api_key)
+    limiter = rate_limiter.get_limiter(api_key)
+    tokens = estimate_tokens(payload)
+    deadline = time.monotonic() + rate_limiter.QUEUE_TIMEOUT
+    timeout = timeout or (CONNECT_TIMEOUT, READ_TIMEOUT)
+    retries = MAX_RETRIES if max_retries is None else max_retries
+    url = url or API_URL
+    # encoded once for every attempt (session headers already say JSON)
+    with metrics.span("encode"):
+        body = json.dumps(payload).encode("utf-8")
+
+    attempt = 0
+    while True:
+        limiter.acquire(tokens, deadline)
+        retry_after = None
+        opened = _connections_opened(session, url) if metrics.ENABLED else 0
+        try:
+            with metrics.span("request", stream=str(stream).lower()) as span:
+                response = session.post(url, data=body, timeout=timeout, stream=stream)
+                span.label(status=str(response.status_code), connection=_connection_kind(session, url, opened))
+        except requests.ConnectionError:
+            limiter.release()
+            metrics.inc("upstream_errors_total", kind="connection")
+            if attempt >= retries or (cancel is not None and cancel.is_set()):
+                raise
+            metrics.inc("upstream_retries_total", reason="connection")
+        except BaseException:
+            limiter.release()
+            raise
+        else:
+            status = response.status_code
+            metrics.inc("upstream_responses_total", status=str(status))
+            if status in THROTTLE_STATUSES:
+                retry_after = rate_limiter.parse_retry_after(response.headers.get("Retry-After"))
+            if status not in RETRY_STATUSES or attempt >= retries or (cancel is not None and cancel.is_set()):
+                if not (stream and status == 200):
+                    limiter.release(status, retry_after)
+                return response
+            limiter.release(status, retry_after)
+            response.close()
+            metrics.inc("upstream_retries_total", reason=str(status))
+        # with Retry-After the limiter pause does the waiting in acquire()
+        if retry_after is None:
+            time.sleep(backoff_delay(attempt))
+        attempt += 1
@@ -0,0 +1,132 @@
+import re
+import threading
+
+# Shared user-type detection for the CLI, Streamlit, the service and batch jobs.
+# All keyword lists compile into one trie-shaped regex, so a question is
+# scanned once instead of once per keyword; the highest-priority profile
+# among the hits wins (beginner > expert > student > professional).
+
+PROFILE_KEYWORDS = [
+    ("beginner", ["what is", "how do i", "explain", "simple", "easy", "beginner", "new to", "don't understand"]),
+    ("expert", ["algorithm", "optimization", "architecture", "implementation", "performance", "scalability", "enterprise"]),
+    ("student", ["homework", "assignment", "study", "exam", "course", "learn", "tutorial", "practice"]),
+    ("professional", ["business", "project", "team", "meeting", "deadline", "client", "budget", "strategy"]),
+]
+
+DEFAULT_TYPE = "general"
+
+
+def _trie_pattern(words):
+    # "(?:b(?:eginner|u(?:dget|siness))|...)": one branch per distinct prefix,
+    # so the regex engine dispatches on each character instead of trying every word
+    trie = {}
+    for word in words:
+        node = trie
+        for ch in word:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node):
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return f"(?:{body})?" if "" in node else body
+
+    return build(trie)
+
+
+def _hidden_by(priority):
+    # keyword -> higher-priority keywords its match can swallow the start of
+    # ("course" + "easy" in "courseasy"). A left-to-right scan never reports
+    # those, so lines hitting such a keyword check for them separately.
+    hidden = {}
+    for a, rank_a in priority.items():
+        for b, rank_b in priority.items():
+            if rank_b >= rank_a:
+                continue
+            if b in a or any(a.endswith(b[:i]) for i in range(1, min(len(a), len(b)))):
+                hidden.setdefault(a, []).append(b)
+    return hidden
+
+
+class ProfileClassifier:
+    """Single-pass keyword classifier; word_boundaries=True matches whole words only."""
+
+    def __init__(self, keywords=PROFILE_KEYWORDS, word_boundaries=False):
+        self.profiles = [name for name, _ in keywords]
+        self._priority = {}
+        for rank, (_, words) in enumerate(keywords):
+            for word in words:
+                self._priority.setdefault(word.lower(), rank)
+
+        boundary = r"\b" if word_boundaries else ""
+        self._findall = re.compile(boundary + _trie_pattern(list(self._priority)) + boundary).findall
+        # checked in rank order so the first hit found is the best one
+        self._hidden = {
+            a: [(self._priority[b], re.compile(boundary + re.escape(b) + boundary).search)
+                for b in sorted(bs, key=self._priority.__getitem__)]
+            for a, bs in _hidden_by(self._priority).items()
+        }
+
+    def _rank(self, text):
+        hits = self._findall(text)
+        if not hits:
+            return None
+        best = min(map(self._priority.__getitem__, hits))
+        if best:
+            for hit in hits:
+                for rank, search in self._hidden.get(hit, ()):
+                    if rank >= best:
+                        break
+                    if search(text):
+                        best = rank
+                        break
+        return best
+
+    def classify(self, question):
+        best = self._rank(question.lower())
+        return DEFAULT_TYPE if best is None else self.profiles[best]
+
+    def classify_many(self, questions, memo_size=100_000):
+        """Classify an iterable of questions (e.g. a log file); returns a list.
+
+        Logs repeat the same questions a lot, so results are memoized per
+        call (the memo is reset once it holds memo_size entries).
+        """
+        rank = self._rank
+        profiles = self.profiles
+        memo = {}
+        results = []
+        for question in questions:
+            profile = memo.get(question)
+            if profile is None:
+                best = rank(question.lower())
+                profile = DEFAULT_TYPE if best is None else profiles[best]
+                if len(memo) >= memo_size:
+                    memo.clear()
+                memo[question] = profile
+            results.append(profile)
+        return results
+
+
+# compiled on first use; building the pattern is most of this module's import cost
+_default = None
+_default_lock = threading.Lock()
+
+
+def _get_default():
+    global _default
+    if _default is None:
+        with _default_lock:
+            if _default is None:
+                _default = ProfileClassifier()
+    return _default
+
+
+def detect_user_type(question):
+    return _get_default().classify(question)
+
+
+def classify_many(questions):
+    return _get_default().classify_many(questions)
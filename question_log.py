@@ -0,0 +1,76 @@
+import json
+import os
+import threading
+import time
+
+# Rotating log of asked questions, one JSON line each:
+#   {"ts", "question", "type", "custom": true/false}
+# warmup.py aggregates it to pre-answer the most frequent questions that
+# missed the custom responses. Rotation renames path -> path.1 -> ... like
+# logging's RotatingFileHandler; give each process its own path, since
+# rotation isn't coordinated between processes.
+#
+# Env settings:
+#   ALPHA_QUESTION_LOG          log file path (unset = off)
+#   ALPHA_QUESTION_LOG_MB       size before rotating (default 10)
+#   ALPHA_QUESTION_LOG_BACKUPS  rotated files kept (default 5)
+
+PATH = os.getenv("ALPHA_QUESTION_LOG") or None
+MAX_BYTES = int(float(os.getenv("ALPHA_QUESTION_LOG_MB", "10")) * 2**20)
+BACKUPS = int(os.getenv("ALPHA_QUESTION_LOG_BACKUPS", "5"))
+
+
+class QuestionLog:
+    """Append-only JSONL writer with size-based rotation."""
+
+    def __init__(self, path, max_bytes=MAX_BYTES, backups=BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self._out = None
+        self._lock = threading.Lock()
+
+    def files(self):
+        """Current and rotated files, oldest first."""
+        candidates = [f"{self.path}.{n}" for n in range(self.backups, 0, -1)] + [self.path]
+        return [path for path in candidates if os.path.exists(path)]
+
+    def record(self, question, user_type, custom):
+        line = json.dumps({"ts": round(time.time(), 3), "question": question, "type": user_type,
+                           "custom": bool(custom)}, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._out is None:
+                self._out = open(self.path, "a", encoding="utf-8")
+            if self._out.tell() + len(line.encode("utf-8")) > self.max_bytes:
+                self._rotate()
+            self._out.write(line)
+            self._out.flush()
+
+    def _rotate(self):
+        self._out.close()
+        if self.backups:
+            for n in range(self.backups - 1, 0, -1):
+                if os.path.exists(f"{self.path}.{n}"):
+                    os.replace(f"{self.path}.{n}", f"{self.path}.{n + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        self._out = open(self.path, "w", encoding="utf-8")
+
+    def close(self):
+        with self._lock:
+            if self._out is not None:
+                self._out.close()
+                self._out = None
+
+
+_default_log = QuestionLog(PATH) if PATH else None
+
+
+def get_log():
+    """The ALPHA_QUESTION_LOG log, or None when logging is off."""
+    return _default_log
+
+
+def record(question, user_type, custom):
+    """Log one asked question (no-op when ALPHA_QUESTION_LOG is unset)."""
+    if _default_log is not None:
+        _default_log.record(question, user_type, custom)
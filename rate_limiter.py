@@ -0,0 +1,209 @@
+import os
+import threading
+import time
+
+# Client-side pacing for OpenRouter, one limiter per API key. openrouter_client
+# takes a slot before every attempt, so the CLI, Streamlit, the Flask service
+# and batch.py all share it.
+#
+#   - token buckets for requests/min and tokens/min (0 = unlimited)
+#   - AIMD concurrency: +1/limit per success, halve on 429/503
+#   - Retry-After pauses every request on that key until the given time
+#   - queued requests give up with RateLimitTimeout at their deadline
+#
+# Env settings: OPENROUTER_RPM, OPENROUTER_TPM, OPENROUTER_MAX_CONCURRENCY,
+# OPENROUTER_MIN_CONCURRENCY, OPENROUTER_QUEUE_TIMEOUT (seconds).
+
+RPM = float(os.getenv("OPENROUTER_RPM", "0"))
+TPM = float(os.getenv("OPENROUTER_TPM", "0"))
+MAX_CONCURRENCY = int(os.getenv("OPENROUTER_MAX_CONCURRENCY", "16"))
+MIN_CONCURRENCY = int(os.getenv("OPENROUTER_MIN_CONCURRENCY", "1"))
+QUEUE_TIMEOUT = float(os.getenv("OPENROUTER_QUEUE_TIMEOUT", "60"))
+
+# seconds of traffic a bucket may burst
+BURST_SECONDS = 10
+# don't halve again for the same burst of 429s
+DECREASE_COOLDOWN = 1.0
+
+
+class RateLimitTimeout(Exception):
+    """A queued request hit its deadline before the limiter let it through."""
+
+
+class TokenBucket:
+    """Refills at rate_per_min; not thread-safe on its own (RateLimiter locks it)."""
+
+    def __init__(self, rate_per_min, capacity=None):
+        self.rate = rate_per_min / 60.0
+        self.capacity = capacity or max(1.0, self.rate * BURST_SECONDS)
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount, now):
+        """Seconds until amount is available (0 when it is available now)."""
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) / self.rate
+
+    def take(self, amount):
+        self.level -= min(amount, self.capacity)
+
+
+class RateLimiter:
+    """Token-bucket pacing plus AIMD-adaptive concurrency for one API key."""
+
+    def __init__(self, rpm=0, tpm=0, max_concurrency=16, min_concurrency=1):
+        self.requests = TokenBucket(rpm) if rpm > 0 else None
+        self.tokens = TokenBucket(tpm) if tpm > 0 else None
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.limit = float(max_concurrency)
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+        # metrics
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.acquired = 0
+        self.throttled = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def _wait_time(self, tokens, now):
+        # seconds to sleep before retrying, None = wait for a release
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.in_flight >= int(self.limit):
+            return None
+        waits = [bucket.wait_time(amount, now)
+                 for bucket, amount in ((self.requests, 1), (self.tokens, tokens)) if bucket is not None]
+        return max(waits, default=0.0)
+
+    def acquire(self, tokens=0, deadline=None):
+        """Block until a request of ~tokens may be sent; deadline is a time.monotonic() value."""
+        start = time.monotonic()
+        with self._cond:
+            self.queue_depth += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = self._wait_time(tokens, now)
+                    if wait == 0:
+                        break
+                    if deadline is not None:
+                        if now >= deadline:
+                            self.timeouts += 1
+                            raise RateLimitTimeout(f"queued {now - start:.1f}s without a free slot")
+                        wait = deadline - now if wait is None else min(wait, deadline - now)
+                    self._cond.wait(wait)
+
+                if self.requests is not None:
+                    self.requests.take(1)
+                if self.tokens is not None:
+                    self.tokens.take(tokens)
+                self.in_flight += 1
+                self.acquired += 1
+                waited = time.monotonic() - start
+                self.total_wait += waited
+                self.max_wait = max(self.max_wait, waited)
+            finally:
+                self.queue_depth -= 1
+
+    def release(self, status=None, retry_after=None):
+        """Return a slot. status drives AIMD: 2xx grows, 429/503 shrinks (and honours retry_after)."""
+        with self._cond:
+            self.in_flight -= 1
+            now = time.monotonic()
+            if status in (429, 503):
+                self.throttled += 1
+                if now - self._last_decrease >= DECREASE_COOLDOWN:
+                    self.limit = max(float(self.min_concurrency), self.limit / 2)
+                    self._last_decrease = now
+                if retry_after:
+                    self.paused_until = max(self.paused_until, now + retry_after)
+            elif status is not None and 200 <= status < 300:
+                self.limit = min(float(self.max_concurrency), self.limit + 1 / self.limit)
+            self._cond.notify_all()
+
+    def stats(self):
+        with self._cond:
+            return {
+                "concurrency_limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "queue_depth": self.queue_depth,
+                "max_queue_depth": self.max_queue_depth,
+                "acquired": self.acquired,
+                "throttled": self.throttled,
+                "timeouts": self.timeouts,
+                "avg_wait_ms": round(self.total_wait / self.acquired * 1000, 1) if self.acquired else 0.0,
+                "max_wait_ms": round(self.max_wait * 1000, 1),
+            }
+
+
+def parse_retry_after(value):
+    """Seconds from a Retry-After header (delta-seconds or HTTP date), or None."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    from email.utils import parsedate_to_datetime
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def get_limiter(api_key: str) -> RateLimiter:
+    """The shared limiter for an API key."""
+    with _limiters_lock:
+        limiter = _limiters.get(api_key)
+        if limiter is None:
+            limiter = _limiters[api_key] = RateLimiter(RPM, TPM, MAX_CONCURRENCY, MIN_CONCURRENCY)
+        return limiter
+
+
+def configure(rpm=None, tpm=None, max_concurrency=None, min_concurrency=None, queue_timeout=None):
+    """Override limiter settings. Existing limiters are dropped."""
+    global RPM, TPM, MAX_CONCURRENCY, MIN_CONCURRENCY, QUEUE_TIMEOUT
+    if rpm is not None:
+        RPM = float(rpm)
+    if tpm is not None:
+        TPM = float(tpm)
+    if max_concurrency is not None:
+        MAX_CONCURRENCY = int(max_concurrency)
+    if min_concurrency is not None:
+        MIN_CONCURRENCY = int(min_concurrency)
+    if queue_timeout is not None:
+        QUEUE_TIMEOUT = float(queue_timeout)
+    with _limiters_lock:
+        _limiters.clear()
+
+
+def all_stats():
+    """Metrics for every key's limiter, keyed by an opaque id.
+
+    Shown in debug panels and /health to anyone, so no part of any key
+    appears: the id is a short hash, enough to tell limiters apart.
+    """
+    import hashlib
+
+    with _limiters_lock:
+        limiters = list(_limiters.items())
+    return {"key-" + hashlib.sha256(key.encode("utf-8")).hexdigest()[:8]: limiter.stats()
+            for key, limiter in limiters}
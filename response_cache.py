@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+
+# Cache of upstream completions, shared by main.py and streamlit_app.py.
+# Tier 1 is an in-process LRU; tier 2 (optional) is a SQLite file that
+# survives restarts and can be shared between CLI and Streamlit processes.
+#
+# Env settings:
+#   ALPHA_CACHE_SIZE    max entries kept in memory (default 1024)
+#   ALPHA_CACHE_TTL     seconds an answer stays valid (default 86400)
+#   ALPHA_CACHE_DB      path of the SQLite tier (unset = memory only)
+#   ALPHA_CACHE_DB_MAX_ROWS  rows kept in the SQLite tier, soonest to expire
+#                       dropped first (default 100000, 0 = no cap)
+#   ALPHA_CACHE_BYPASS  "1" disables the cache entirely
+
+_PUNCT = re.compile(r"[^\w\s]")
+_SPACES = re.compile(r"\s+")
+
+
+def normalize_question(question: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace ("What is Python?" -> "what is python")."""
+    return _SPACES.sub(" ", _PUNCT.sub(" ", question.lower())).strip()
+
+
+def make_key(question, user_type, model, params) -> str:
+    """Cache key for a question asked by a profile type with the given model and generation params."""
+    raw = json.dumps([normalize_question(question), user_type, model, params], sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """LRU + TTL cache with an optional SQLite tier. Values must be JSON-serializable."""
+
+    def __init__(self, max_entries=1024, ttl=86400, db_path=None, enabled=True, max_rows=100000):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self.enabled = enabled
+        self._memory = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._db = None
+        self.hits = 0
+        self.misses = 0
+        self.disk_hits = 0
+        if db_path:
+            import sqlite3
+
+            self._db = sqlite3.connect(db_path, timeout=5, check_same_thread=False)
+            # WAL lets CLI and Streamlit processes read while another writes
+            self._db.execute("PRAGMA journal_mode=WAL")
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, value TEXT, expires_at REAL)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS responses_expires_at ON responses (expires_at)")
+            # rows expired since the last process are never read again
+            self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),))
+            self._trim()
+            self._db.commit()
+
+    def get(self, key):
+        """Return the cached value, or None on a miss (or when bypassed)."""
+        if not self.enabled:
+            return None
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                if entry[0] > now:
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    return entry[1]
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, expires_at FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None and row[1] > now:
+                    value = json.loads(row[0])
+                    self._remember(key, row[1], value)
+                    self.hits += 1
+                    self.disk_hits += 1
+                    return value
+                if row is not None:
+                    self._db.execute("DELETE FROM responses WHERE key = ? AND expires_at <= ?", (key, now))
+                    self._db.commit()
+
+            self.misses += 1
+            return None
+
+    def set(self, key, value):
+        if not self.enabled:
+            return
+        expires_at = time.time() + self.ttl
+        with self._lock:
+            self._remember(key, expires_at, value)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, expires_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(value), expires_at),
+                )
+                self._trim()
+                self._db.commit()
+
+    def _remember(self, key, expires_at, value):
+        self._memory[key] = (expires_at, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _trim(self):
+        # the rows past max_rows that expire soonest; expired rows go first
+        if self.max_rows > 0:
+            self._db.execute(
+                "DELETE FROM responses WHERE key IN (SELECT key FROM responses ORDER BY expires_at"
+                " LIMIT max((SELECT COUNT(*) FROM responses) - ?, 0))",
+                (self.max_rows,),
+            )
+
+    def purge_expired(self):
+        """Drop expired entries from both tiers."""
+        now = time.time()
+        with self._lock:
+            for key in [k for k, (expires_at, _) in self._memory.items() if expires_at <= now]:
+                del self._memory[key]
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses WHERE expires_at <= ?", (now,))
+                self._db.commit()
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "hits": self.hits,
+                "misses": self.misses,
+                "disk_hits": self.disk_hits,
+                "memory_entries": len(self._memory),
+            }
+
+
+_default_cache = None
+_default_lock = threading.Lock()
+
+
+def get_cache() -> ResponseCache:
+    """Process-wide cache configured from the ALPHA_CACHE_* env settings."""
+    global _default_cache
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResponseCache(
+                max_entries=int(os.getenv("ALPHA_CACHE_SIZE", "1024")),
+                ttl=float(os.getenv("ALPHA_CACHE_TTL", "86400")),
+                db_path=os.getenv("ALPHA_CACHE_DB") or None,
+                enabled=os.getenv("ALPHA_CACHE_BYPASS", "0") != "1",
+                max_rows=int(os.getenv("ALPHA_CACHE_DB_MAX_ROWS", "100000")),
+            )
+        return _default_cache
@@ -0,0 +1,122 @@
+from bisect import insort
+
+# Substring index over custom response keys, replacing the linear
+# "key in q or q in key" scan in streamlit_app.get_custom_response.
+#
+# Match preference (deterministic, independent of dict order):
+#   1. exact key
+#   2. longest key contained in the question
+#   3. shortest key containing the question
+# Ties at the same length go to the lexicographically smallest key.
+
+GRAM = 3
+
+
+def _rank(key):
+    return (len(key), key)
+
+
+class ResponseIndex:
+    """Incrementally updated index of custom response keys."""
+
+    def __init__(self, keys=()):
+        self._keys = set()
+        # distinct key lengths, sorted
+        self._lengths = []
+        # trigram -> keys containing it (for "question in key")
+        self._grams = {}
+        # 1-2 char question -> (len, key) of the best key containing it
+        # (or None); filled on demand since such questions are rare
+        self._short = {}
+        for key in keys:
+            self.add(key)
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key):
+        return key in self._keys
+
+    def add(self, key):
+        """Index a key; cheap enough to call from the Teach handlers."""
+        if not key or key in self._keys:
+            return
+        self._keys.add(key)
+
+        n = len(key)
+        if n not in self._lengths:
+            insort(self._lengths, n)
+
+        for gram in {key[i:i + GRAM] for i in range(n - GRAM + 1)}:
+            self._grams.setdefault(gram, []).append(key)
+
+        rank = (n, key)
+        for sub, best in list(self._short.items()):
+            if sub in key and (best is None or rank < best):
+                self._short[sub] = rank
+
+    def _best_short(self, question):
+        if question not in self._short:
+            self._short[question] = min(((len(k), k) for k in self._keys if question in k), default=None)
+        return self._short[question]
+
+    def _contained_by_length(self, question):
+        # one probe of the key set per (distinct key length, question offset)
+        m = len(question)
+        keys = self._keys
+        for n in reversed(self._lengths):
+            if n > m:
+                continue
+            hits = {question[i:i + n] for i in range(m - n + 1)} & keys
+            if hits:
+                yield sorted(hits)
+
+    def contained_in(self, question):
+        """All keys that occur inside the question, longest first."""
+        return [key for hits in self._contained_by_length(question) for key in hits]
+
+    def containing(self, question):
+        """All keys that contain the question, shortest first."""
+        if not question:
+            return []
+        if len(question) < GRAM:
+            if self._best_short(question) is None:
+                return []
+            # short questions hit many keys; listing them all needs a scan
+            candidates = self._keys
+        else:
+            postings = [self._grams.get(question[i:i + GRAM]) for i in range(len(question) - GRAM + 1)]
+            if not all(postings):
+                return []
+            # verify against the rarest trigram's posting list only
+            candidates = min(postings, key=len)
+        return sorted((k for k in candidates if question in k), key=_rank)
+
+    def matches(self, question):
+        """Every matching key in preference order (see module comment)."""
+        exact = [question] if question in self._keys else []
+        return list(dict.fromkeys(exact + self.contained_in(question) + self.containing(question)))
+
+    def ranked_match(self, question):
+        """(preference, key) for the preferred key, or None.
+
+        Preferences from different indexes compare correctly, so callers
+        layering several indexes can take the min.
+        """
+        if not question:
+            return None
+        if question in self._keys:
+            return (0, 0, question), question
+        for hits in self._contained_by_length(question):
+            return (1, -len(hits[0]), hits[0]), hits[0]
+        if len(question) < GRAM:
+            best = self._best_short(question)
+        else:
+            containing = self.containing(question)
+            best = _rank(containing[0]) if containing else None
+        return ((2,) + best, best[1]) if best else None
+
+    def best_match(self, question):
+        """The single preferred key for the question, or None."""
+        ranked = self.ranked_match(question)
+        return ranked[1] if ranked else None
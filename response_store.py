@@ -0,0 +1,220 @@
+import sys
+import threading
+import weakref
+
+import fuzzy_index
+from response_index import ResponseIndex
+
+# Custom responses for Streamlit sessions without a per-session deepcopy.
+#
+# One SharedResponses per process holds the knowledge pack (responses.py)
+# and its index, layered under the durable teach store (teach_store.py)
+# when one is configured. Each session gets a ResponseOverlay holding only
+# what that session taught; lookups check the overlay, then the shared
+# store. Teaching with promote=True (or overlay.promote()) moves entries
+# into the shared store (and so the teach store) so every session and
+# process sees them. Questions no key matches by containment fall back to
+# the closest key by trigram similarity (fuzzy_index.py).
+
+
+def deep_sizeof(obj, seen=None):
+    """Approximate bytes held by nested dicts/lists/strings (shared objects counted once)."""
+    seen = set() if seen is None else seen
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(k, seen) + deep_sizeof(v, seen) for k, v in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    return size
+
+
+class SharedResponses:
+    """Process-wide response store; read by every session, written only by promotion."""
+
+    def __init__(self, responses, store=None):
+        # one copy per process, so promotion never mutates the imported module
+        self._responses = {key.lower(): dict(answers) for key, answers in responses.items()}
+        self._index = ResponseIndex(self._responses)
+        self._store = store
+        # built on the first fuzzy lookup
+        self._fuzzy = None
+        self._lock = threading.Lock()
+        self._overlays = weakref.WeakSet()
+        self._size = None
+        # bumped when another process teaches something (sessions show a notice)
+        self.remote_changes = 0
+        if store is not None:
+            store.subscribe(self._on_store_change)
+
+    def _on_store_change(self, changes, remote):
+        if remote:
+            self.remote_changes += len(changes)
+
+    def __len__(self):
+        if self._store is None:
+            return len(self._responses)
+        overlap = sum(1 for key in self._responses if key in self._store)
+        return len(self._responses) + self._store.count_questions() - overlap
+
+    def __contains__(self, key):
+        return key in self._responses or (self._store is not None and key in self._store)
+
+    def get(self, key):
+        base = self._responses.get(key)
+        taught = self._store.get(key) if self._store is not None else None
+        if taught:
+            return {**base, **taught} if base else taught
+        return base
+
+    def ranked_match(self, question):
+        with self._lock:
+            ranked = self._index.ranked_match(question)
+        if self._store is not None:
+            taught = self._store.ranked_match(question)
+            if taught and (ranked is None or taught < ranked):
+                ranked = taught
+        return ranked
+
+    def closest(self, question):
+        """(score, key) of the most similar shared question, or None."""
+        with self._lock:
+            if self._fuzzy is None:
+                self._fuzzy = fuzzy_index.FuzzyIndex(self._responses)
+            hits = [self._fuzzy.best(question)]
+        if self._store is not None:
+            hits.append(self._store.fuzzy_index().best(question))
+        hits = [hit for hit in hits if hit is not None]
+        return max(hits, key=lambda hit: hit[0]) if hits else None
+
+    def poll(self):
+        """Pick up teachings committed by other processes."""
+        if self._store is not None:
+            self._store.poll()
+
+    def promote(self, key, answers):
+        """Merge answers ({profile: text}) for key into the shared store."""
+        if self._store is not None:
+            self._store.set_many(key, answers)
+            return
+        with self._lock:
+            merged = dict(self._responses.get(key, ()))
+            merged.update(answers)
+            # replace rather than mutate: readers may hold the old dict
+            self._responses[key] = merged
+            self._index.add(key)
+            if self._fuzzy is not None:
+                self._fuzzy.add(key)
+            self._size = None
+
+    def overlay(self):
+        """A new, empty per-session overlay on this store."""
+        overlay = ResponseOverlay(self)
+        self._overlays.add(overlay)
+        return overlay
+
+    def memory_bytes(self):
+        with self._lock:
+            if self._size is None:
+                self._size = deep_sizeof(self._responses)
+            return self._size
+
+    def memory_stats(self):
+        overlays = list(self._overlays)
+        shared = self.memory_bytes()
+        return {
+            "shared_keys": len(self),
+            "shared_bytes": shared,
+            "sessions": len(overlays),
+            "overlay_bytes": sum(o.memory_bytes() for o in overlays),
+            # what per-session deepcopies of the shared store would cost instead
+            "deepcopy_bytes": shared * len(overlays),
+        }
+
+
+class ResponseOverlay:
+    """One session's taught responses layered over a SharedResponses."""
+
+    def __init__(self, shared):
+        self.shared = shared
+        self._local = {}
+        self._index = ResponseIndex()
+        self._fuzzy = fuzzy_index.FuzzyIndex()
+
+    def __len__(self):
+        return len(self.shared) + sum(1 for key in self._local if key not in self.shared)
+
+    def __contains__(self, key):
+        return key in self._local or key in self.shared
+
+    def get(self, key):
+        """Answers for key by profile, session entries overriding shared ones."""
+        local = self._local.get(key)
+        base = self.shared.get(key)
+        if local is None:
+            return base
+        return {**base, **local} if base else local
+
+    def best_match(self, question):
+        """Preferred key across overlay and shared store (see response_index)."""
+        ranked = [r for r in (self._index.ranked_match(question), self.shared.ranked_match(question)) if r]
+        return min(ranked)[1] if ranked else None
+
+    def match(self, question, user_type="general"):
+        """(answer, matched key, similarity) or None; typos fall back to the closest key."""
+        key = self.best_match(question)
+        if key is not None:
+            score = fuzzy_index.similarity(question, key)
+        elif fuzzy_index.ENABLED:
+            hits = [hit for hit in (self._fuzzy.best(question), self.shared.closest(question)) if hit]
+            if not hits:
+                return None
+            score, key = max(hits, key=lambda hit: hit[0])
+        else:
+            return None
+        answers = self.get(key)
+        answer = answers.get(user_type) or answers.get("general")
+        return (answer, key, round(score, 4)) if answer else None
+
+    def lookup(self, question, user_type="general"):
+        match = self.match(question, user_type)
+        return match[0] if match else None
+
+    def teach(self, question, user_type, answer, promote=False):
+        key = question.strip().lower()
+        if promote:
+            self.shared.promote(key, {user_type: answer})
+            return
+        self._local.setdefault(key, {})[user_type] = answer
+        self._index.add(key)
+        self._fuzzy.add(key)
+
+    def promote(self):
+        """Move every taught entry into the shared store; returns how many keys moved."""
+        local, self._local = self._local, {}
+        self._index = ResponseIndex()
+        self._fuzzy = fuzzy_index.FuzzyIndex()
+        for key, answers in local.items():
+            self.shared.promote(key, answers)
+        return len(local)
+
+    def memory_bytes(self):
+        return deep_sizeof(self._local) + deep_sizeof(vars(self._index)) + deep_sizeof(vars(self._fuzzy))
+
+
+_shared = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_responses():
+    """The process-wide store, loaded from responses.py on first use."""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            from responses import custom_responses
+            import teach_store
+
+            _shared = SharedResponses(custom_responses, teach_store.get_store())
+        return _shared
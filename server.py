@@ -0,0 +1,209 @@
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from dotenv import load_dotenv
+from flask import Flask, Response, jsonify, request
+from flask_cors import CORS
+
+import engine
+import hedging
+import metrics
+import question_log
+import rate_limiter
+import sessions
+import warmup
+
+load_dotenv()
+
+# Headless JSON chat service over the engine.py pipeline:
+#   detect_user_type -> match_custom_response -> call_deepseek_api
+#
+#   POST /chat     {"question", "session_id"?}      -> answer (+ match, score for custom)
+#   POST /teach    {"question", "answer", "user_type"}   (persisted with ALPHA_TEACH_DB, see teach_store.py)
+#   GET  /profile  ?session_id=...                  -> type and recent questions (sessions.py)
+#   POST /profile  {"session_id", "type"}
+#   GET  /health
+#   GET  /metrics  Prometheus text (ALPHA_METRICS=1, see metrics.py)
+#
+# Upstream calls run on a bounded worker pool; once every worker is busy and
+# the wait queue is full, /chat answers 503 with Retry-After instead of piling up.
+
+USER_TYPES = ["general", "beginner", "expert", "student", "professional"]
+
+API_KEY = os.getenv("OPENROUTER_API_KEY", "").strip()
+WORKERS = int(os.getenv("ALPHA_WORKERS", "8"))
+QUEUE_LIMIT = int(os.getenv("ALPHA_QUEUE_LIMIT", "16"))
+UPSTREAM_TIMEOUT = float(os.getenv("ALPHA_UPSTREAM_TIMEOUT", "60"))
+RETRY_AFTER = os.getenv("ALPHA_RETRY_AFTER", "2")
+
+app = Flask(__name__)
+CORS(app)
+
+_executor = ThreadPoolExecutor(max_workers=WORKERS, thread_name_prefix="upstream")
+# running + queued upstream calls
+_slots = threading.BoundedSemaphore(WORKERS + QUEUE_LIMIT)
+_in_flight = 0
+_in_flight_lock = threading.Lock()
+
+_sessions = sessions.get_manager()
+_teach_lock = threading.Lock()
+
+
+def _track(delta):
+    global _in_flight
+    with _in_flight_lock:
+        _in_flight += delta
+
+
+def _release(_future):
+    _track(-1)
+    _slots.release()
+
+
+def _error(message, status):
+    return jsonify({"error": message}), status
+
+
+def _body():
+    """The posted JSON object, {} without a body; None for any other JSON value."""
+    body = request.get_json(silent=True)
+    if body is None:
+        return {}
+    return body if isinstance(body, dict) else None
+
+
+def _text(body, name):
+    # null, numbers and the like are missing, not the text "None" or "42"
+    value = body.get(name)
+    return value.strip() if isinstance(value, str) else ""
+
+
+@app.post("/chat")
+def chat():
+    body = _body()
+    if body is None:
+        return _error("request body must be a JSON object", 400)
+    question = _text(body, "question")
+    if not question:
+        return _error("question is required", 400)
+    session_id = str(body.get("session_id") or uuid.uuid4().hex)
+
+    profile = _sessions.record_question(session_id, question, engine.detect_user_type(question))
+
+    match = engine.match_custom_response(question, profile)
+    question_log.record(question, profile, match is not None)
+    if match:
+        custom, matched, score = match
+        _sessions.record_answer(session_id, question, custom)
+        metrics.inc("chat_requests_total", source="custom")
+        return jsonify({"answer": custom, "source": "custom", "match": matched, "score": score,
+                        "profile": profile, "session_id": session_id})
+
+    if not _slots.acquire(blocking=False):
+        metrics.inc("chat_requests_total", source="rejected")
+        response, status = _error("server busy, retry later", 503)
+        response.headers["Retry-After"] = RETRY_AFTER
+        return response, status
+
+    _track(1)
+    future = _executor.submit(engine.call_deepseek_api, question, API_KEY, user_type=profile,
+                              context=_sessions.conversation(session_id))
+    future.add_done_callback(_release)
+    try:
+        result = future.result(timeout=UPSTREAM_TIMEOUT)
+    except FutureTimeout:
+        metrics.inc("chat_requests_total", source="timeout")
+        return _error("upstream timed out", 504)
+
+    metrics.inc("chat_requests_total", source="model" if "choices" in result else "error")
+    if "choices" not in result:
+        return _error(result.get("error", "Unknown error"), 502)
+    answer = result["choices"][0]["message"]["content"]
+    _sessions.record_answer(session_id, question, answer)
+    return jsonify({"answer": answer, "source": "model", "profile": profile, "session_id": session_id})
+
+
+@app.post("/teach")
+def teach():
+    body = _body()
+    if body is None:
+        return _error("request body must be a JSON object", 400)
+    user_type = _text(body, "user_type").lower()
+    question = _text(body, "question").lower()
+    answer = _text(body, "answer")
+    if user_type not in USER_TYPES:
+        return _error(f"user_type must be one of: {', '.join(USER_TYPES)}", 400)
+    if not question or not answer:
+        return _error("question and answer are required", 400)
+
+    with _teach_lock:
+        responses = dict(engine.teach(question, user_type, answer))
+    return jsonify({"question": question, "responses": responses}), 201
+
+
+@app.get("/profile")
+def get_profile():
+    session_id = request.args.get("session_id", "")
+    if not session_id:
+        return _error("session_id is required", 400)
+    profile = _sessions.profile(session_id, create=False)
+    return jsonify(profile or {"session_id": session_id, "type": "general", "interests": [], "previous_questions": []})
+
+
+@app.post("/profile")
+def set_profile():
+    body = _body()
+    if body is None:
+        return _error("request body must be a JSON object", 400)
+    session_id = _text(body, "session_id")
+    new_type = _text(body, "type").lower()
+    if not session_id:
+        return _error("session_id is required", 400)
+    if new_type not in USER_TYPES:
+        return _error(f"type must be one of: {', '.join(USER_TYPES)}", 400)
+    _sessions.set_type(session_id, new_type)
+    return jsonify({"session_id": session_id, "type": new_type})
+
+
+@app.get("/health")
+def health():
+    with _in_flight_lock:
+        in_flight = _in_flight
+    return jsonify({
+        "status": "ok",
+        "workers": WORKERS,
+        "queue_limit": QUEUE_LIMIT,
+        "in_flight": in_flight,
+        "api_key_set": bool(API_KEY),
+        "rate_limits": rate_limiter.all_stats(),
+        "hedging": dict(hedging.counters),
+        "sessions": _sessions.stats(),
+    })
+
+
+@app.get("/metrics")
+def metrics_text():
+    if not metrics.ENABLED:
+        return _error("metrics are off (set ALPHA_METRICS=1)", 404)
+    with _in_flight_lock:
+        in_flight = _in_flight
+    gauges = [
+        "# TYPE alpha_upstream_in_flight gauge",
+        f"alpha_upstream_in_flight {in_flight}",
+        "# TYPE alpha_sessions gauge",
+        f"alpha_sessions {len(_sessions)}",
+    ]
+    for name, value in sorted(hedging.counters.items()):
+        gauges.append(f"# TYPE alpha_hedging_{name}_total counter")
+        gauges.append(f"alpha_hedging_{name}_total {value}")
+    return Response(metrics.export_prometheus() + "\n".join(gauges) + "\n",
+                    mimetype="text/plain; version=0.0.4")
+
+
+if __name__ == "__main__":
+    # only the dev server warms up; under a WSGI server run warmup.py as its own job instead
+    warmup.start_background(API_KEY)
+    app.run(host=os.getenv("ALPHA_HOST", "0.0.0.0"), port=int(os.getenv("ALPHA_PORT", "5000")), threaded=True)
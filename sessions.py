@@ -0,0 +1,252 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+import chat_context
+
+# Per-session user profiles for the CLI and the Flask service, replacing the
+# module-global user_profile dict. Sessions are small __slots__ objects with
+# a fixed-size ring buffer of recent questions; the manager evicts the least
+# recently used ones past the session count or memory cap, drops idle ones,
+# and can snapshot everything to a JSONL file. With ALPHA_CONTEXT_TOKENS set,
+# each session also carries a chat_context.Conversation of its recent turns.
+#
+# Env settings:
+#   ALPHA_MAX_SESSIONS        live sessions kept (default 10000)
+#   ALPHA_SESSION_IDLE        seconds before an idle session is dropped (default 3600)
+#   ALPHA_SESSION_MEMORY_MB   approximate memory cap for all sessions (default 64)
+#   ALPHA_SESSION_SNAPSHOT    JSONL file loaded at startup and saved at exit (unset = off)
+
+MAX_SESSIONS = int(os.getenv("ALPHA_MAX_SESSIONS", "10000"))
+IDLE_TIMEOUT = float(os.getenv("ALPHA_SESSION_IDLE", "3600"))
+MEMORY_MB = float(os.getenv("ALPHA_SESSION_MEMORY_MB", "64"))
+SNAPSHOT_PATH = os.getenv("ALPHA_SESSION_SNAPSHOT") or None
+
+# recent questions kept per session
+RECENT = 10
+
+
+class Session:
+    """One user's profile; mutate only through SessionManager (it holds the lock)."""
+
+    __slots__ = ("session_id", "type", "interests", "_recent", "_next", "_count", "last_seen", "nbytes", "context")
+
+    def __init__(self, session_id, recent=RECENT):
+        self.session_id = session_id
+        self.type = "general"
+        self.interests = []
+        self._recent = [None] * recent
+        self._next = 0
+        self._count = 0
+        self.last_seen = time.monotonic()
+        self.context = None
+        self.nbytes = sys.getsizeof(self) + sys.getsizeof(self._recent) + sys.getsizeof(session_id)
+
+    def add_question(self, question):
+        old = self._recent[self._next]
+        if old is not None:
+            self.nbytes -= sys.getsizeof(old)
+        self._recent[self._next] = question
+        self.nbytes += sys.getsizeof(question)
+        self._next = (self._next + 1) % len(self._recent)
+        self._count = min(self._count + 1, len(self._recent))
+
+    @property
+    def previous_questions(self):
+        """Recent questions, oldest first."""
+        size = len(self._recent)
+        start = (self._next - self._count) % size
+        return [self._recent[(start + i) % size] for i in range(self._count)]
+
+    def to_dict(self, include_context=False):
+        data = {
+            "session_id": self.session_id,
+            "type": self.type,
+            "interests": list(self.interests),
+            "previous_questions": self.previous_questions,
+        }
+        if include_context and self.context is not None:
+            data["context"] = self.context.to_dict()
+        return data
+
+    @classmethod
+    def from_dict(cls, data, recent=RECENT):
+        session = cls(data["session_id"], recent)
+        session.type = data.get("type", "general")
+        session.interests = list(data.get("interests", ()))
+        for question in data.get("previous_questions", ())[-recent:]:
+            session.add_question(question)
+        if "context" in data and chat_context.BUDGET:
+            session.context = chat_context.Conversation.from_dict(data["context"])
+            session.nbytes += session.context.chars
+        return session
+
+
+class SessionManager:
+    """Thread-safe, bounded map of session ID -> Session."""
+
+    def __init__(self, max_sessions=MAX_SESSIONS, idle_timeout=IDLE_TIMEOUT, max_bytes=MEMORY_MB * 2**20,
+                 recent=RECENT, snapshot_path=None):
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.max_bytes = max_bytes
+        self.recent = recent
+        self.snapshot_path = snapshot_path
+        self._sessions = OrderedDict()  # least recently used first
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evicted = 0
+        self.expired = 0
+        if snapshot_path and os.path.exists(snapshot_path):
+            self.load(snapshot_path)
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def _session(self, session_id):
+        # caller holds the lock; creates, touches and trims
+        now = time.monotonic()
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = self._sessions[session_id] = Session(session_id, self.recent)
+            self._bytes += session.nbytes
+        else:
+            self._sessions.move_to_end(session_id)
+        session.last_seen = now
+        self._trim(now, keep=session_id)
+        return session
+
+    def _drop(self, session_id):
+        self._bytes -= self._sessions.pop(session_id).nbytes
+
+    def _trim(self, now, keep=None):
+        while self._sessions:
+            oldest_id, oldest = next(iter(self._sessions.items()))
+            if oldest_id == keep:
+                break
+            if now - oldest.last_seen > self.idle_timeout:
+                self.expired += 1
+            elif len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes:
+                self.evicted += 1
+            else:
+                break
+            self._drop(oldest_id)
+
+    def _update(self, session, change):
+        before = session.nbytes
+        change()
+        self._bytes += session.nbytes - before
+        self._trim(time.monotonic(), keep=session.session_id)
+
+    def get_type(self, session_id):
+        with self._lock:
+            return self._session(session_id).type
+
+    def set_type(self, session_id, user_type):
+        with self._lock:
+            self._session(session_id).type = user_type
+
+    def record_question(self, session_id, question, detected_type=None):
+        """Remember a question; a non-general detected_type becomes the session's type. Returns the type."""
+        with self._lock:
+            session = self._session(session_id)
+            self._update(session, lambda: session.add_question(question))
+            if detected_type and detected_type != "general":
+                session.type = detected_type
+            return session.type
+
+    def conversation(self, session_id):
+        """The session's chat_context.Conversation; None when ALPHA_CONTEXT_TOKENS is off."""
+        if not chat_context.BUDGET:
+            return None
+        with self._lock:
+            session = self._session(session_id)
+            if session.context is None:
+                session.context = chat_context.Conversation()
+            return session.context
+
+    def record_answer(self, session_id, question, answer):
+        """Add an answered turn to the session's conversation (no-op when context is off)."""
+        conversation = self.conversation(session_id)
+        if conversation is None:
+            return
+        with self._lock:
+            before = conversation.chars
+            conversation.add(question, answer)
+            session = self._sessions.get(session_id)
+            if session is not None and session.context is conversation:
+                session.nbytes += conversation.chars - before
+                self._bytes += conversation.chars - before
+
+    def profile(self, session_id, create=True):
+        """Plain-dict copy of the session's profile; None for an unknown session when create=False."""
+        with self._lock:
+            if not create and session_id not in self._sessions:
+                return None
+            return self._session(session_id).to_dict()
+
+    def purge_idle(self):
+        """Drop idle sessions now (they are otherwise dropped lazily on access)."""
+        with self._lock:
+            self._trim(time.monotonic())
+
+    def stats(self):
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "approx_bytes": self._bytes,
+                "max_sessions": self.max_sessions,
+                "max_bytes": int(self.max_bytes),
+                "evicted": self.evicted,
+                "expired": self.expired,
+            }
+
+    def save(self, path=None):
+        """Write every session to a JSONL snapshot (atomically replaced)."""
+        path = path or self.snapshot_path
+        with self._lock:
+            records = [session.to_dict(include_context=True) for session in self._sessions.values()]
+        tmp = f"{path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as out:
+            for record in records:
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        os.replace(tmp, path)
+        return len(records)
+
+    def load(self, path=None):
+        """Restore sessions from a snapshot; they count as just seen."""
+        path = path or self.snapshot_path
+        loaded = 0
+        with open(path, encoding="utf-8") as stream, self._lock:
+            for line in stream:
+                try:
+                    session = Session.from_dict(json.loads(line), self.recent)
+                except (ValueError, KeyError, TypeError):
+                    continue
+                if session.session_id in self._sessions:
+                    self._drop(session.session_id)
+                self._sessions[session.session_id] = session
+                self._bytes += session.nbytes
+                loaded += 1
+            self._trim(time.monotonic())
+        return loaded
+
+
+_default_manager = None
+_default_lock = threading.Lock()
+
+
+def get_manager():
+    """Process-wide manager from the ALPHA_SESSION_* settings; snapshots at exit when configured."""
+    global _default_manager
+    with _default_lock:
+        if _default_manager is None:
+            _default_manager = SessionManager(snapshot_path=SNAPSHOT_PATH)
+            if SNAPSHOT_PATH:
+                import atexit
+
+                atexit.register(_default_manager.save)
+        return _default_manager
@@ -0,0 +1,81 @@
+import threading
+
+# Request coalescing: concurrent callers asking for the same key share one
+# in-flight call, and every caller gets its result (or its exception).
+# Used by engine.call_deepseek_api so N identical questions cost one completion.
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Collapse concurrent identical calls (thread and asyncio callers)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._async_calls = {}
+        self.coalesced = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        """Run fn(*args, **kwargs) unless a call for key is already running; then wait for it."""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if leader:
+            try:
+                call.result = fn(*args, **kwargs)
+            except BaseException as e:
+                call.error = e
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        else:
+            call.done.wait()
+
+        if call.error is not None:
+            raise call.error
+        return call.result
+
+    async def do_async(self, key, fn, *args, **kwargs):
+        """Await fn(*args, **kwargs) unless a call for key is already running on this loop.
+
+        The call runs as its own task and every caller awaits it shielded, so
+        cancelling any caller (the first one included) leaves the rest waiting.
+        """
+        import asyncio  # only asyncio callers pay for the import
+
+        loop = asyncio.get_running_loop()
+        flight_key = (loop, key)
+        with self._lock:
+            task = self._async_calls.get(flight_key)
+            if task is None:
+                task = self._async_calls[flight_key] = loop.create_task(fn(*args, **kwargs))
+                task.add_done_callback(lambda done: self._finish_async(flight_key, done))
+            else:
+                self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _finish_async(self, flight_key, task):
+        with self._lock:
+            if self._async_calls.get(flight_key) is task:
+                del self._async_calls[flight_key]
+        # every caller may have been cancelled; don't warn about an unretrieved exception
+        if not task.cancelled():
+            task.exception()
+
+    def in_flight(self):
+        with self._lock:
+            return len(self._calls) + len(self._async_calls)
@@ -1,10 +1,16 @@
 import os
-import copy
-import requests
-from responses import custom_responses as SHARED_CUSTOM_RESPONSES
 from dotenv import load_dotenv
+import chat_context
+import engine
+import hedging
+import metrics
+import question_log
+import rate_limiter
+import response_cache
+import response_store
+import ui_jobs
+from chat_history import ChatHistory
 import streamlit as st  # ensure st is available for page config
-import webbrowser  # Import webbrowser module
 
 load_dotenv()
 # Do NOT prefill the UI with the key. Keep default empty so the key is never shown.
@@ -82,70 +88,126 @@ button[aria-label="Send"]:active{
 st.markdown(DARK_CSS, unsafe_allow_html=True)
 
 # --- API call (same as your app.py) ---
-def call_deepseek_api(question, api_key: str = None):
+MISSING_KEY = "Missing API key. Enter it in Settings (sidebar) or set OPENROUTER_API_KEY in .env"
+
+def resolve_api_key(api_key: str = None):
     # Use explicit api_key if provided; otherwise try session_state then .env (hidden)
-    api_key = (api_key or st.session_state.get("api_key") or os.getenv("OPENROUTER_API_KEY", "")).strip()
-    url = "https://openrouter.ai/api/v1/chat/completions"
+    return (api_key or st.session_state.get("api_key") or os.getenv("OPENROUTER_API_KEY", "")).strip()
+
+def call_deepseek_api(question, api_key: str = None, on_token=None, use_cache=True):
+    api_key = resolve_api_key(api_key)
+    if not api_key:
+        return {"error": MISSING_KEY}
+
+    # shared engine call: pooled client, response cache, and one upstream
+    # request for identical questions asked by concurrent sessions
+    utype = st.session_state.get("user_profile", {}).get("type", "general")
+    return engine.call_deepseek_api(question, api_key, on_token=on_token, use_cache=use_cache,
+                                    user_type=utype, max_tokens=512)
+
+# --- chat history: rendered window + capped in-memory store ---
+# messages shown per page ("Load earlier" adds another page)
+CHAT_WINDOW = int(os.getenv("ALPHA_CHAT_WINDOW", "50"))
+# messages kept in session state; older ones are spilled to a temp file
+CHAT_MEMORY = int(os.getenv("ALPHA_CHAT_MEMORY", "200"))
+
+def message_html(msg):
+    role = "user" if msg["role"] == "user" else "ai"
+    return f"<div class='msg {role}'>{msg['content']}</div><div class='clear'></div>"
+
+def load_earlier():
+    st.session_state.chat_window += CHAT_WINDOW
+
+# --- background upstream calls (shared pool, see ui_jobs.py) ---
+THINKING = "Alpha is thinking..."
+# seconds between fragment polls while answers are pending
+POLL_INTERVAL = float(os.getenv("ALPHA_UI_POLL", "0.5"))
+
+def submit_question(question):
+    """Queue the upstream call; a placeholder message is filled in by the chat fragment."""
+    api_key = resolve_api_key()
     if not api_key:
-        return {"error": "Missing API key. Enter it in Settings (sidebar) or set OPENROUTER_API_KEY in .env"}
-
-    headers = {
-        "Content-Type": "application/json",
-        "Authorization": f"Bearer {api_key}"
-    }
-    data = {
-        "model": "deepseek/deepseek-chat",
-        "messages": [{"role": "user", "content": f"Question: {question}\nAnswer:"}],
-        "temperature": 0.7,
-        "max_tokens": 512
-    }
-    try:
-        r = requests.post(url, headers=headers, json=data, timeout=30)
-    except Exception as e:
-        return {"error": f"Request failed: {e}"}
-    if r.status_code != 200:
-        return {"error": f"HTTP {r.status_code}: {r.text}"}
-    return r.json()
-
-# --- simple user type detection (copied/simplified) ---
-def detect_user_type(question):
-    q = question.lower()
-    if any(w in q for w in ["what is", "how do i", "explain", "beginner", "new to"]):
-        return "beginner"
-    if any(w in q for w in ["algorithm", "optimization", "performance", "scalability"]):
-        return "expert"
-    if any(w in q for w in ["homework", "assignment", "study", "exam"]):
-        return "student"
-    if any(w in q for w in ["business", "project", "client", "deadline"]):
-        return "professional"
-    return "general"
+        st.session_state.messages.append("ai", f"Error: {MISSING_KEY}")
+        return
+    # resolved here: worker threads can't read session state
+    utype = st.session_state.user_profile.get("type", "general")
+    job = ui_jobs.get_pool().submit(question, engine.call_deepseek_api, question, api_key,
+                                    stream=st.session_state.get("stream_responses", True),
+                                    user_type=utype, max_tokens=512, context=st.session_state.conversation)
+    if job is None:
+        st.session_state.messages.append("ai", "Error: Alpha is busy right now, please try again in a moment.")
+        return
+    index = st.session_state.messages.append("ai", THINKING)
+    st.session_state.pending_jobs[index] = job
+
+def cancel_job(index):
+    job = st.session_state.pending_jobs.get(index)
+    if job is not None:
+        job.cancel()
+
+def poll_jobs():
+    """Copy finished results (or streamed text so far) into their placeholder messages."""
+    history = st.session_state.messages
+    for index, job in list(st.session_state.pending_jobs.items()):
+        if job.done():
+            del st.session_state.pending_jobs[index]
+            result = job.result()
+            if result is None:
+                content = "(cancelled)"
+            elif "error" in result:
+                content = f"Error: {result['error']}"
+            else:
+                content = result["choices"][0]["message"]["content"]
+                if st.session_state.conversation is not None:
+                    st.session_state.conversation.add(job.label, content)
+        elif job.partial:
+            content = job.partial
+        else:
+            continue
+        try:
+            history.update(index, content)
+        except IndexError:
+            # placeholder already spilled out of memory; nothing left to fill in
+            st.session_state.pending_jobs.pop(index, None)
 
 # --- initial UI state ---
 if "api_key" not in st.session_state:
     st.session_state.api_key = DEFAULT_KEY
 if "messages" not in st.session_state:
-    st.session_state.messages = [{"role": "ai", "content": "Hello! I'm Alpha AI — ask me anything."}]
+    st.session_state.messages = ChatHistory(message_html, max_in_memory=CHAT_MEMORY)
+    st.session_state.messages.append("ai", "Hello! I'm Alpha AI — ask me anything.")
+if "chat_window" not in st.session_state:
+    st.session_state.chat_window = CHAT_WINDOW
+if "pending_jobs" not in st.session_state:
+    # history index of the placeholder -> ui_jobs.Job
+    st.session_state.pending_jobs = {}
+if "conversation" not in st.session_state:
+    # earlier turns sent with each question; None unless ALPHA_CONTEXT_TOKENS is set
+    st.session_state.conversation = chat_context.Conversation() if chat_context.BUDGET else None
 if "user_profile" not in st.session_state:
     st.session_state.user_profile = {"type": "general", "previous_questions": []}
 if "custom_responses" not in st.session_state:
-    # load shared responses from responses.py (deepcopy to avoid cross-module mutation)
-    st.session_state.custom_responses = copy.deepcopy(SHARED_CUSTOM_RESPONSES)
+    # shared responses.py store + this session's teachings (no per-session copy)
+    st.session_state.custom_responses = response_store.get_shared_responses().overlay()
+    st.session_state.seen_remote_changes = response_store.get_shared_responses().remote_changes
+
+# teachings saved by the CLI, the service or other Streamlit processes
+_shared_responses = response_store.get_shared_responses()
+_shared_responses.poll()
+if _shared_responses.remote_changes != st.session_state.seen_remote_changes:
+    st.toast(f"{_shared_responses.remote_changes - st.session_state.seen_remote_changes} new custom response(s) taught elsewhere")
+    st.session_state.seen_remote_changes = _shared_responses.remote_changes
 
 # --- helpers ---
 def get_custom_response(question):
-    """Flexible matching: exact or containment; returns profile-specific answer if present."""
+    """Flexible matching: exact, containment, then closest by similarity; profile-specific answer if present."""
     q = question.lower().strip()
-    # exact match
-    if q in st.session_state.custom_responses:
-        responses = st.session_state.custom_responses[q]
-        utype = st.session_state.user_profile.get("type", "general")
-        return responses.get(utype) or responses.get("general")
-    # containment fallback
-    for key, responses in st.session_state.custom_responses.items():
-        if key in q or q in key:
-            utype = st.session_state.user_profile.get("type", "general")
-            return responses.get(utype) or responses.get("general")
-    return None
+    # exact match, else longest key inside q, else shortest key containing q, else fuzzy
+    utype = st.session_state.user_profile.get("type", "general")
+    match = st.session_state.custom_responses.match(q, utype)
+    # shown in the debug panel, for tuning ALPHA_FUZZY_THRESHOLD
+    st.session_state.last_match = {"question": q, "match": match[1], "score": match[2]} if match else None
+    return match[0] if match else None
 
 def mask_key(key: str):
     if not key:
@@ -158,7 +220,7 @@ st.sidebar.text_input("OpenRouter API key", key="api_key", type="password")
 # Only verify the key on demand; don't show the key or mask automatically in the UI
 if st.sidebar.button("Test API key"):
     with st.spinner("Testing..."):
-        probe = call_deepseek_api("ping", st.session_state.api_key)
+        probe = call_deepseek_api("ping", st.session_state.api_key, use_cache=False)
         if "error" in probe:
             st.sidebar.error("Invalid key or request failed.")
         else:
@@ -167,6 +229,7 @@ if st.sidebar.button("Test API key"):
 st.sidebar.markdown("---")
 st.sidebar.selectbox("Profile type", options=["general","beginner","expert","student","professional","lover"], key="profile_select")
 st.sidebar.checkbox("Auto-detect profile from messages", value=True, key="auto_detect_profile")
+st.sidebar.checkbox("Stream responses", value=True, key="stream_responses")
 # keep UI selection in the profile state
 st.session_state.user_profile["type"] = st.session_state.profile_select
 
@@ -175,14 +238,23 @@ st.title("Alpha AI — Dark Chat")
 with st.container():
     st.markdown("<div class='chat-wrap'>", unsafe_allow_html=True)
     st.markdown("<div class='chat-list'>", unsafe_allow_html=True)
-    # render messages with CSS classes
-    for msg in st.session_state.messages:
-        if msg["role"] == "user":
-            html = f"<div class='msg user'>{msg['content']}</div><div class='clear'></div>"
-            st.markdown(html, unsafe_allow_html=True)
-        else:
-            html = f"<div class='msg ai'>{msg['content']}</div><div class='clear'></div>"
-            st.markdown(html, unsafe_allow_html=True)
+    def chat_list():
+        # render the newest window of messages in one element, from cached HTML
+        had_pending = bool(st.session_state.pending_jobs)
+        poll_jobs()
+        history = st.session_state.messages
+        start = max(0, len(history) - st.session_state.chat_window)
+        if start:
+            st.button(f"Load earlier messages ({start} more)", on_click=load_earlier)
+        st.markdown(history.html(start), unsafe_allow_html=True)
+        for index, job in st.session_state.pending_jobs.items():
+            st.button(f"Cancel: {job.label[:60]}", key=f"cancel_{index}", on_click=cancel_job, args=(index,))
+        if had_pending and not st.session_state.pending_jobs:
+            # last answer arrived: full rerun so the fragment stops polling
+            st.rerun()
+
+    # polls (reruns just this fragment) only while answers are pending
+    st.fragment(run_every=POLL_INTERVAL if st.session_state.pending_jobs else None)(chat_list)()
     st.markdown("</div>", unsafe_allow_html=True)
 
     # define send_message before widgets
@@ -192,10 +264,10 @@ with st.container():
             return
 
         # append user message
-        st.session_state.messages.append({"role": "user", "content": question})
+        st.session_state.messages.append("user", question)
 
         # profile auto-detect (only if enabled)
-        detected = detect_user_type(question)
+        detected = engine.detect_user_type(question)
         if detected != "general" and st.session_state.get("auto_detect_profile", True):
             st.session_state.user_profile["type"] = detected
 
@@ -206,22 +278,16 @@ with st.container():
 
         # custom response check
         custom = get_custom_response(question)
+        question_log.record(question, st.session_state.user_profile.get("type", "general"), bool(custom))
         if custom:
-            st.session_state.messages.append({"role": "ai", "content": custom})
+            st.session_state.messages.append("ai", custom)
+            if st.session_state.conversation is not None:
+                st.session_state.conversation.add(question, custom)
             st.session_state.input_text = ""
             return
 
-        # call API
-        with st.spinner("Alpha is thinking..."):
-            result = call_deepseek_api(question, st.session_state.api_key)
-        if "error" in result:
-            st.session_state.messages.append({"role": "ai", "content": f"Error: {result['error']}"})
-        else:
-            try:
-                content = result["choices"][0]["message"]["content"]
-            except Exception:
-                content = str(result)
-            st.session_state.messages.append({"role": "ai", "content": content})
+        # call API in the background; more questions can be queued meanwhile
+        submit_question(question)
 
         # clear input after processing
         st.session_state.input_text = ""
@@ -243,21 +309,24 @@ with st.expander("Teach Alpha (add custom response)"):
     teach_type = st.selectbox("User type", options=["general","beginner","expert","student","professional","lover"], key="teach_type")
     teach_q = st.text_input("Question (exact match)", key="teach_q")
     teach_a = st.text_area("Answer", key="teach_a")
+    teach_shared = st.checkbox("Share with all sessions (saved to the teach store)", key="teach_shared")
     if st.button("Save teaching"):
         if not teach_q or not teach_a:
             st.error("Question and answer required.")
         else:
-            ql = teach_q.strip().lower()
-            if ql not in st.session_state.custom_responses:
-                st.session_state.custom_responses[ql] = {}
-            st.session_state.custom_responses[ql][teach_type] = teach_a.strip()
-            st.success("Saved.")
+            st.session_state.custom_responses.teach(teach_q, teach_type, teach_a.strip(), promote=teach_shared)
+            st.success("Saved for all sessions." if teach_shared else "Saved.")
+    if st.button("Share my earlier teachings"):
+        moved = st.session_state.custom_responses.promote()
+        st.success(f"Shared {moved} question(s) with all sessions.")
 
 # Weather quick action
 with st.expander("Weather"):
     city = st.text_input("City", key="city_input")
     if st.button("Open weather"):
         if city:
+            import webbrowser  # only needed for this button
+
             weather_url = f"https://www.google.com/search?q=weather+{city.replace(' ', '+')}"
             webbrowser.open(weather_url)
             st.info(f"Opened weather for {city} in browser.")
@@ -268,4 +337,21 @@ with st.expander("Weather"):
 if st.checkbox("Show debug info"):
     # Do NOT show the API key even masked in debug mode
     st.write("Profile:", st.session_state.user_profile)
-    st.write("Stored custom responses count:", len(st.session_state.custom_responses))
\ No newline at end of file
+    st.write("Stored custom responses count:", len(st.session_state.custom_responses))
+    st.write("Last custom response match:", st.session_state.get("last_match"))
+    st.write("Chat history:", {"messages": len(st.session_state.messages),
+                               "spilled_to_disk": st.session_state.messages.spilled,
+                               "window": st.session_state.chat_window})
+    st.write("Custom response memory:", {
+        "this_session_bytes": st.session_state.custom_responses.memory_bytes(),
+        **response_store.get_shared_responses().memory_stats(),
+    })
+    st.write("Response cache:", response_cache.get_cache().stats())
+    st.write("Coalesced upstream requests:", engine.upstream_flights.coalesced)
+    st.write("Rate limiter:", rate_limiter.all_stats())
+    st.write("Hedged / fallback requests:", hedging.counters)
+    if metrics.ENABLED:
+        st.write("Pipeline metrics:", metrics.snapshot())
+    if st.session_state.conversation is not None:
+        st.write("Conversation context:", st.session_state.conversation.stats())
+    st.write("Background jobs:", {"this_session": len(st.session_state.pending_jobs), **ui_jobs.get_pool().stats()})
\ No newline at end of file
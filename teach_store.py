@@ -0,0 +1,348 @@
+"""Durable custom responses, keyed by (question, profile).
+
+Teachings from main.py (TeAcH), server.py (/teach) and Streamlit's shared
+teach option land in one SQLite file, so they survive restarts and every
+process sees them. Knowledge packs are JSONL, streamed in and out:
+
+    python teach_store.py import pack.jsonl --db alpha_teach.db
+    python teach_store.py export pack.jsonl     # store from ALPHA_TEACH_DB
+
+Pack lines are {"question", "responses": {profile: answer}} or
+{"question", "user_type", "answer"}. Nothing is loaded up front: lookups
+are indexed queries, and "question inside a longer key" uses an FTS5
+trigram index when SQLite has it.
+
+Env settings:
+  ALPHA_TEACH_DB   path of the store (unset = off: teachings last only for the process)
+"""
+import json
+import os
+import sys
+import threading
+import time
+
+# rows per transaction during import
+IMPORT_BATCH = 5000
+# below this length FTS5's trigram index can't answer LIKE; scan instead
+GRAM = 3
+# bind parameters per query; older SQLite builds allow at most 999
+MAX_VARIABLES = 900
+
+
+class TeachStore:
+    """SQLite-backed taught responses with change notification across processes."""
+
+    def __init__(self, path):
+        import sqlite3
+
+        self.path = path
+        self._db = sqlite3.connect(path, timeout=5, check_same_thread=False)
+        self._lock = threading.RLock()
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.executescript("""
+            CREATE TABLE IF NOT EXISTS teachings (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                question TEXT NOT NULL,
+                profile TEXT NOT NULL,
+                answer TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                UNIQUE (question, profile)
+            );
+            CREATE TABLE IF NOT EXISTS question_lengths (length INTEGER PRIMARY KEY);
+        """)
+        try:
+            self._db.execute("CREATE VIRTUAL TABLE IF NOT EXISTS question_grams USING fts5(question, tokenize='trigram')")
+            self._fts = True
+        except sqlite3.OperationalError:
+            # SQLite without FTS5/trigram: substring lookups fall back to a scan
+            self._fts = False
+        self._db.commit()
+        self._lengths = None
+        self._data_version = self._pragma_data_version()
+        self._last_seq = self._max_seq()
+        self._subscribers = []
+        self._fuzzy = None
+
+    # --- change notification ---
+    def _pragma_data_version(self):
+        return self._db.execute("PRAGMA data_version").fetchone()[0]
+
+    def _max_seq(self):
+        return self._db.execute("SELECT COALESCE(MAX(seq), 0) FROM teachings").fetchone()[0]
+
+    def subscribe(self, callback):
+        """callback(changes, remote) after every commit; changes is a list of (question, profile).
+
+        remote is True for commits picked up from other processes/connections.
+        """
+        self._subscribers.append(callback)
+
+    def _notify(self, since, remote):
+        self._lengths = None
+        if not self._subscribers:
+            self._last_seq = self._max_seq()
+            return
+        rows = self._db.execute(
+            "SELECT question, profile FROM teachings WHERE seq > ? ORDER BY seq", (since,)
+        ).fetchall()
+        if rows:
+            self._last_seq = self._max_seq()
+            for callback in list(self._subscribers):
+                callback(rows, remote)
+
+    def poll(self):
+        """Pick up commits made by other processes; cheap enough to call before every lookup."""
+        with self._lock:
+            version = self._pragma_data_version()
+            if version != self._data_version:
+                self._data_version = version
+                self._notify(self._last_seq, remote=True)
+
+    def watch(self, interval=1.0):
+        """Poll from a daemon thread so subscribers hear about changes without lookups."""
+        def loop():
+            while True:
+                time.sleep(interval)
+                self.poll()
+
+        threading.Thread(target=loop, name="teach-store-watch", daemon=True).start()
+
+    # --- reads ---
+    def __contains__(self, question):
+        with self._lock:
+            return self._db.execute(
+                "SELECT 1 FROM teachings WHERE question = ? LIMIT 1", (question,)
+            ).fetchone() is not None
+
+    def get(self, question):
+        """{profile: answer} for question, or None."""
+        self.poll()
+        with self._lock:
+            rows = self._db.execute(
+                "SELECT profile, answer FROM teachings WHERE question = ?", (question,)
+            ).fetchall()
+        return dict(rows) or None
+
+    def fuzzy_index(self):
+        """FuzzyIndex over every stored question, built on first use and kept current."""
+        with self._lock:
+            if self._fuzzy is None:
+                from fuzzy_index import FuzzyIndex
+
+                self._fuzzy = FuzzyIndex(q for (q,) in self._db.execute("SELECT DISTINCT question FROM teachings"))
+                self.subscribe(self._index_changes)
+            return self._fuzzy
+
+    def _index_changes(self, changes, remote):
+        for question, _ in changes:
+            self._fuzzy.add(question)
+
+    def count_questions(self):
+        with self._lock:
+            return self._db.execute("SELECT COUNT(DISTINCT question) FROM teachings").fetchone()[0]
+
+    def _key_lengths(self):
+        if self._lengths is None:
+            self._lengths = [n for (n,) in self._db.execute(
+                "SELECT length FROM question_lengths ORDER BY length DESC")]
+        return self._lengths
+
+    def ranked_match(self, question):
+        """(preference, key) like ResponseIndex.ranked_match, or None."""
+        if not question:
+            return None
+        self.poll()
+        m = len(question)
+        with self._lock:
+            # exact, then the longest stored key inside the question
+            for n in self._key_lengths():
+                if n > m:
+                    continue
+                subs = list({question[i:i + n] for i in range(m - n + 1)})
+                key = None
+                for start in range(0, len(subs), MAX_VARIABLES):
+                    chunk = subs[start:start + MAX_VARIABLES]
+                    row = self._db.execute(
+                        f"SELECT question FROM teachings WHERE question IN ({','.join('?' * len(chunk))})"
+                        " ORDER BY question LIMIT 1", chunk,
+                    ).fetchone()
+                    if row and (key is None or row[0] < key):
+                        key = row[0]
+                if key is not None:
+                    return ((0, 0, key) if n == m else (1, -n, key)), key
+
+            # shortest stored key containing the question
+            row = self._db.execute(*self._containment_query(question)).fetchone()
+        if row is None:
+            return None
+        key = row[0]
+        return (2, len(key), key), key
+
+    def _containment_query(self, question):
+        # FTS5 only answers LIKE from its trigram index without an ESCAPE
+        # clause, so questions with LIKE wildcards in them take the scan
+        if self._fts and len(question) >= GRAM and "%" not in question and "_" not in question:
+            sql, pattern = "SELECT question FROM question_grams WHERE question LIKE ?", f"%{question}%"
+        else:
+            sql = "SELECT DISTINCT question FROM teachings WHERE question LIKE ? ESCAPE '\\'"
+            pattern = "%" + question.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+        # LIKE ignores ASCII case; instr() keeps the match exact
+        return (f"SELECT question FROM ({sql}) WHERE instr(question, ?) > 0"
+                " ORDER BY length(question), question LIMIT 1", (pattern, question))
+
+    def best_match(self, question):
+        ranked = self.ranked_match(question)
+        return ranked[1] if ranked else None
+
+    # --- writes ---
+    def _write(self, rows):
+        # rows: (question, profile, answer); caller holds the lock and commits
+        now = time.time()
+        new_questions = {q for q, _, _ in rows if q not in self}
+        self._db.executemany(
+            "INSERT OR REPLACE INTO teachings (question, profile, answer, updated_at) VALUES (?, ?, ?, ?)",
+            [(q, p, a, now) for q, p, a in rows],
+        )
+        if new_questions:
+            self._db.executemany("INSERT OR IGNORE INTO question_lengths (length) VALUES (?)",
+                                 [(len(q),) for q in new_questions])
+            if self._fts:
+                self._db.executemany("INSERT INTO question_grams (question) VALUES (?)",
+                                     [(q,) for q in new_questions])
+
+    def _commit_and_notify(self):
+        self._db.commit()
+        # our own commits don't bump data_version; tell local subscribers directly
+        self._data_version = self._pragma_data_version()
+        self._notify(self._last_seq, remote=False)
+
+    def set(self, question, profile, answer):
+        """Store one answer; question is normalized to lowercase."""
+        self.set_many(question, {profile: answer})
+
+    def set_many(self, question, answers):
+        """Store {profile: answer} for one question."""
+        question = question.strip().lower()
+        with self._lock:
+            self._write([(question, profile, answer) for profile, answer in answers.items()])
+            self._commit_and_notify()
+
+    # --- bulk JSONL ---
+    def import_jsonl(self, stream, batch_size=IMPORT_BATCH):
+        """Stream a JSONL pack in; returns (answers stored, lines skipped)."""
+        stored = skipped = 0
+        batch = []
+
+        def flush():
+            with self._lock:
+                # duplicates inside one batch would hide each other from the new-question check
+                self._write(list({(q, p): (q, p, a) for q, p, a in batch}.values()))
+                self._db.commit()
+            batch.clear()
+
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = json.loads(line)
+                question = str(item["question"]).strip().lower()
+                answers = item.get("responses") or {item.get("user_type") or "general": item["answer"]}
+                if not isinstance(answers, dict):
+                    raise TypeError("responses must be an object")
+            except (ValueError, KeyError, TypeError):
+                skipped += 1
+                continue
+            if not question:
+                skipped += 1
+                continue
+            for profile, answer in answers.items():
+                batch.append((question, str(profile).lower(), str(answer)))
+                stored += 1
+            if len(batch) >= batch_size:
+                flush()
+        if batch:
+            flush()
+        with self._lock:
+            self._commit_and_notify()
+        return stored, skipped
+
+    def export_jsonl(self, out):
+        """Stream every question as {"question", "responses"}; returns the number of lines."""
+        lines = 0
+        with self._lock:
+            rows = self._db.execute("SELECT question, profile, answer FROM teachings ORDER BY question, profile")
+            question, answers = None, {}
+            for q, profile, answer in rows:
+                if q != question and answers:
+                    out.write(json.dumps({"question": question, "responses": answers}, ensure_ascii=False) + "\n")
+                    lines += 1
+                    answers = {}
+                question = q
+                answers[profile] = answer
+            if answers:
+                out.write(json.dumps({"question": question, "responses": answers}, ensure_ascii=False) + "\n")
+                lines += 1
+        return lines
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+
+_default_store = None
+_default_lock = threading.Lock()
+_disabled = False
+
+
+def get_store():
+    """Process-wide store at ALPHA_TEACH_DB, or None when disabled."""
+    global _default_store, _disabled
+    with _default_lock:
+        if _default_store is None and not _disabled:
+            path = os.getenv("ALPHA_TEACH_DB")
+            if path:
+                _default_store = TeachStore(path)
+            else:
+                _disabled = True
+        return _default_store
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Import or export a JSONL knowledge pack.")
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("file", help="JSONL file, or - for stdin/stdout")
+    parser.add_argument("--db", default=None, help="store path (default: ALPHA_TEACH_DB)")
+    args = parser.parse_args(argv)
+
+    path = args.db or os.getenv("ALPHA_TEACH_DB")
+    if not path:
+        parser.error("no --db given and ALPHA_TEACH_DB is unset")
+    store = TeachStore(path)
+    start = time.perf_counter()
+    try:
+        if args.command == "import":
+            stream = sys.stdin if args.file == "-" else open(args.file, encoding="utf-8")
+            try:
+                stored, skipped = store.import_jsonl(stream)
+            finally:
+                if stream is not sys.stdin:
+                    stream.close()
+            summary = f"imported {stored} answers ({skipped} lines skipped)"
+        else:
+            out = sys.stdout if args.file == "-" else open(args.file, "w", encoding="utf-8")
+            try:
+                lines = store.export_jsonl(out)
+            finally:
+                if out is not sys.stdout:
+                    out.close()
+            summary = f"exported {lines} questions"
+    finally:
+        store.close()
+    print(f"{summary} in {time.perf_counter() - start:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
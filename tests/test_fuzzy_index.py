@@ -0,0 +1,73 @@
+import pytest
+
+from fuzzy_index import FuzzyIndex, is_typo, similarity
+from responses import custom_responses
+
+
+@pytest.fixture(scope="module")
+def index():
+    return FuzzyIndex(custom_responses)
+
+
+@pytest.mark.parametrize("question, key", [
+    ("what is pyhton", "what is python"),
+    ("waht is python", "what is python"),
+    ("what is pythn", "what is python"),
+    ("whats python?", "what is python"),
+    ("what's python", "what is python"),
+    ("whatis python", "what is python"),
+    ("what is your nmae", "what is your name"),
+    ("how are yuo", "how are you"),
+])
+def test_typos_match(index, question, key):
+    hit = index.best(question)
+    assert hit is not None and hit[1] == key
+
+
+@pytest.mark.parametrize("question", [
+    "what is your game",
+    "what is your plan",
+    "what is your aim",
+    "what is cython",
+    "what is jython",
+    "what is pytorch",
+    "hell",
+])
+def test_near_misses_do_not_match(index, question):
+    # all of these clear the trigram threshold against some key
+    assert index.search(question)
+    assert index.best(question) is None
+
+
+def test_search_ranks_by_similarity():
+    index = FuzzyIndex(["what is python", "what is java", "good morning"])
+    hits = index.search("what is pyhton", threshold=0.3)
+    assert hits[0][1] == "what is python"
+    assert all(a[0] >= b[0] for a, b in zip(hits, hits[1:]))
+
+
+def test_add_is_incremental():
+    index = FuzzyIndex()
+    assert index.best("how are yuo") is None
+    index.add("how are you")
+    index.add("how are you")
+    assert len(index) == 1
+    assert index.best("how are yuo")[1] == "how are you"
+
+
+
+def test_best_agrees_with_a_full_scan():
+    # swapped, dropped and doubled letters at every position: the lookups by
+    # letters (one long word or none) and by grams (more) must both find the
+    # best typo match a scan of every key finds
+    keys = list(custom_responses) + ["tell me about python", "tell me about pythons", "explain python decorators",
+                                     "explain python generators", "how do i install python packages"]
+    index = FuzzyIndex(keys)
+    questions = []
+    for key in keys:
+        for i in range(len(key) - 1):
+            questions += [key[:i] + key[i + 1] + key[i] + key[i + 2:], key[:i] + key[i + 1:], key[:i] + key[i] + key[i:]]
+    for question in questions:
+        hits = [(round(similarity(question, key), 4), key) for key in keys]
+        hits = [hit for hit in hits if hit[0] >= index.threshold and is_typo(question, hit[1])]
+        assert index.best(question) == min(hits, key=lambda hit: (-hit[0], len(hit[1]), hit[1]), default=None)
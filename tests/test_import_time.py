@@ -0,0 +1,23 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks"))
+import check_import_time  # noqa: E402
+
+BUDGET_MS = float(os.getenv("ALPHA_IMPORT_BUDGET_MS", "50"))
+RUNS = 5
+
+
+@pytest.mark.parametrize("module", check_import_time.MODULES)
+def test_import_stays_within_budget(module):
+    # each run is a cold `python -X importtime` subprocess; the best one filters out noisy neighbours
+    runs = [check_import_time.import_profile(module) for _ in range(RUNS)]
+    assert min(run[module] for run in runs) / 1000 <= BUDGET_MS
+
+
+@pytest.mark.parametrize("module", check_import_time.MODULES)
+def test_heavy_modules_stay_lazy(module):
+    eager = {name for name in check_import_time.import_profile(module) if name.split(".")[0] in check_import_time.LAZY}
+    assert not eager
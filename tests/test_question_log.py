@@ -0,0 +1,68 @@
+import json
+import os
+
+import warmup
+from question_log import QuestionLog
+
+
+def read(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_rotates_past_max_bytes_and_keeps_backups(tmp_path):
+    path = str(tmp_path / "questions.log")
+    log = QuestionLog(path, max_bytes=200, backups=2)
+    for n in range(40):
+        log.record(f"question {n}", "general", False)
+    log.close()
+    assert log.files() == [f"{path}.2", f"{path}.1", path]
+    assert not os.path.exists(f"{path}.3")
+    for name in log.files():
+        assert os.path.getsize(name) <= 200
+    questions = [entry["question"] for name in log.files() for entry in read(name)]
+    # oldest first, nothing lost between the kept files
+    assert questions == [f"question {n}" for n in range(40 - len(questions), 40)]
+
+
+def test_limit_counts_bytes_not_characters(tmp_path):
+    path = str(tmp_path / "questions.log")
+    log = QuestionLog(path, max_bytes=300, backups=5)
+    for _ in range(10):
+        log.record("что такое питон", "general", False)
+    log.close()
+    for name in log.files():
+        assert os.path.getsize(name) <= 300
+    assert sum(len(read(name)) for name in log.files()) == 10
+
+
+def test_no_backups_truncates(tmp_path):
+    path = str(tmp_path / "questions.log")
+    log = QuestionLog(path, max_bytes=150, backups=0)
+    for n in range(10):
+        log.record(f"question {n}", "general", True)
+    log.close()
+    assert log.files() == [path]
+    assert read(path)[-1]["question"] == "question 9"
+
+
+def test_warmup_picks_frequent_misses_per_profile(tmp_path):
+    path = str(tmp_path / "questions.log")
+    log = QuestionLog(path, max_bytes=10**6)
+    for question, user_type, custom in [
+        ("What is Rust?", "beginner", False),
+        ("what is rust", "beginner", False),
+        ("what is rust", "beginner", False),
+        ("hello", "general", True),
+        ("hello", "general", True),
+        ("explain the gil", "expert", False),
+        ("Explain the GIL", "expert", False),
+        ("asked once", "general", False),
+    ]:
+        log.record(question, user_type, custom)
+    log.close()
+    assert warmup.top_misses(log.files(), top=5) == [
+        (3, "beginner", "what is rust"),  # the most common raw form
+        (2, "expert", "explain the gil"),
+    ]
+    assert warmup.top_misses(log.files(), top=1, min_count=1)[-1] == (1, "general", "asked once")
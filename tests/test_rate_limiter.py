@@ -0,0 +1,112 @@
+import time
+
+import pytest
+
+import openrouter_client
+import rate_limiter
+from rate_limiter import RateLimiter, RateLimitTimeout
+
+
+def test_throttle_halves_the_limit_once_per_cooldown(monkeypatch):
+    limiter = RateLimiter(max_concurrency=16, min_concurrency=2)
+    for _ in range(3):
+        limiter.acquire()
+    for _ in range(3):
+        limiter.release(429)
+    assert limiter.limit == 8
+    monkeypatch.setattr(rate_limiter, "DECREASE_COOLDOWN", 0)
+    for _ in range(5):
+        limiter.acquire()
+        limiter.release(503)
+    assert limiter.limit == 2
+    assert limiter.stats()["throttled"] == 8
+
+
+def test_successes_grow_the_limit_additively():
+    limiter = RateLimiter(max_concurrency=4)
+    limiter.limit = 2.0
+    for _ in range(2):
+        limiter.acquire()
+        limiter.release(200)
+    assert limiter.limit == pytest.approx(2 + 1 / 2 + 1 / 2.5)
+    for _ in range(50):
+        limiter.acquire()
+        limiter.release(200)
+    assert limiter.limit == 4
+
+
+def test_full_limiter_times_out_at_the_deadline():
+    limiter = RateLimiter(max_concurrency=1)
+    limiter.acquire()
+    with pytest.raises(RateLimitTimeout):
+        limiter.acquire(deadline=time.monotonic() + 0.05)
+    assert limiter.stats()["timeouts"] == 1
+    limiter.release(200)
+    limiter.acquire(deadline=time.monotonic() + 0.05)
+
+
+def test_retry_after_pauses_the_key():
+    limiter = RateLimiter()
+    limiter.acquire()
+    limiter.release(429, retry_after=0.2)
+    start = time.monotonic()
+    limiter.acquire(deadline=start + 5)
+    assert time.monotonic() - start >= 0.15
+
+
+def test_parse_retry_after():
+    assert rate_limiter.parse_retry_after("3") == 3.0
+    assert rate_limiter.parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+    assert rate_limiter.parse_retry_after("soon") is None
+    assert rate_limiter.parse_retry_after(None) is None
+
+
+class FakeResponse:
+    def __init__(self, status_code, headers=None):
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    def close(self):
+        pass
+
+
+class ScriptedSession:
+    """Answers each post with the next status from a script."""
+
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.posts = 0
+
+    def post(self, url, data=None, timeout=None, stream=False):
+        self.posts += 1
+        return FakeResponse(self.statuses.pop(0))
+
+
+def test_client_backs_off_on_injected_429s(monkeypatch):
+    pytest.importorskip("requests")
+    session = ScriptedSession([429, 429, 200])
+    monkeypatch.setattr(openrouter_client, "get_session", lambda api_key: session)
+    monkeypatch.setattr(openrouter_client, "BACKOFF_BASE", 0)
+    monkeypatch.setattr(rate_limiter, "_limiters", {})
+    monkeypatch.setattr(rate_limiter, "DECREASE_COOLDOWN", 0)
+    monkeypatch.setattr(rate_limiter, "MAX_CONCURRENCY", 8)
+
+    response = openrouter_client.post_chat({"messages": []}, "test-key", max_retries=3)
+
+    limiter = rate_limiter.get_limiter("test-key")
+    assert response.status_code == 200 and session.posts == 3
+    assert limiter.throttled == 2
+    # halved twice, then one success adds 1/limit
+    assert limiter.limit == pytest.approx(2 + 1 / 2)
+    assert limiter.in_flight == 0
+
+
+def test_stats_never_show_key_fragments(monkeypatch):
+    monkeypatch.setattr(rate_limiter, "_limiters", {})
+    key = "sk-or-v1-0123456789abcdef"
+    rate_limiter.get_limiter(key)
+    rate_limiter.get_limiter("another-key")
+    stats = rate_limiter.all_stats()
+    assert len(stats) == 2
+    for label in stats:
+        assert key[:4] not in label and key[-4:] not in label
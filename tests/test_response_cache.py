@@ -0,0 +1,103 @@
+import pytest
+
+import response_cache
+from response_cache import ResponseCache
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(response_cache.time, "time", clock)
+    return clock
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = ResponseCache(ttl=10)
+    cache.set("k", {"answer": 1})
+    clock.now += 9.9
+    assert cache.get("k") == {"answer": 1}
+    clock.now += 0.2
+    assert cache.get("k") is None
+    assert cache.stats()["memory_entries"] == 0
+
+
+def test_least_recently_used_is_evicted():
+    cache = ResponseCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1 and cache.get("c") == 3
+
+
+def test_sqlite_tier_outlives_memory_and_expires(clock, tmp_path):
+    path = str(tmp_path / "cache.db")
+    ResponseCache(ttl=10, db_path=path).set("k", {"answer": 1})
+    fresh = ResponseCache(ttl=10, db_path=path)
+    assert fresh.get("k") == {"answer": 1}
+    assert fresh.stats()["disk_hits"] == 1
+    clock.now += 11
+    assert ResponseCache(ttl=10, db_path=path).get("k") is None
+
+
+def test_purge_expired(clock, tmp_path):
+    cache = ResponseCache(ttl=10, db_path=str(tmp_path / "cache.db"))
+    cache.set("old", 1)
+    clock.now += 5
+    cache.set("new", 2)
+    clock.now += 6
+    cache.purge_expired()
+    assert cache.stats()["memory_entries"] == 1
+    assert cache._db.execute("SELECT key FROM responses").fetchall() == [("new",)]
+
+
+def rows(cache):
+    return sorted(key for (key,) in cache._db.execute("SELECT key FROM responses"))
+
+
+def test_expired_rows_are_dropped_on_open_and_read(clock, tmp_path):
+    path = str(tmp_path / "cache.db")
+    cache = ResponseCache(ttl=10, db_path=path)
+    cache.set("old", 1)
+    clock.now += 5
+    cache.set("new", 2)
+    clock.now += 6
+    assert rows(ResponseCache(ttl=10, db_path=path)) == ["new"]
+    clock.now += 5
+    assert cache.get("new") is None
+    assert rows(cache) == []
+
+
+def test_sqlite_tier_keeps_max_rows(clock, tmp_path):
+    cache = ResponseCache(ttl=10, db_path=str(tmp_path / "cache.db"), max_rows=3)
+    for n in range(5):
+        cache.set(f"k{n}", n)
+        clock.now += 1
+    # the rows that expire soonest go first
+    assert rows(cache) == ["k2", "k3", "k4"]
+    # a lower cap applies when the file is opened
+    ResponseCache(ttl=10, db_path=str(tmp_path / "cache.db"), max_rows=2)
+    assert rows(cache) == ["k3", "k4"]
+
+
+def test_bypass_stores_nothing():
+    cache = ResponseCache(enabled=False)
+    cache.set("k", 1)
+    assert cache.get("k") is None
+
+
+def test_key_ignores_case_and_punctuation():
+    params = {"temperature": 0.7}
+    assert (response_cache.make_key("What is Python?", "general", "m", params)
+            == response_cache.make_key("what is  python", "general", "m", params))
+    assert (response_cache.make_key("what is python", "general", "m", params)
+            != response_cache.make_key("what is python", "expert", "m", params))
@@ -0,0 +1,75 @@
+import pytest
+
+import sessions
+from sessions import SessionManager
+
+
+class Clock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(sessions.time, "monotonic", clock)
+    return clock
+
+
+def test_least_recently_used_session_is_evicted(clock):
+    manager = SessionManager(max_sessions=2)
+    manager.set_type("a", "expert")
+    manager.set_type("b", "student")
+    manager.get_type("a")
+    manager.get_type("c")
+    assert manager.profile("b", create=False) is None
+    assert manager.get_type("a") == "expert"
+    assert manager.stats()["evicted"] == 1
+
+
+def test_idle_sessions_are_dropped(clock):
+    manager = SessionManager(idle_timeout=60)
+    manager.record_question("old", "hello")
+    clock.now += 30
+    manager.record_question("recent", "hello")
+    clock.now += 31
+    manager.purge_idle()
+    assert manager.profile("old", create=False) is None
+    assert manager.profile("recent", create=False) is not None
+    assert manager.stats()["expired"] == 1
+
+
+def test_memory_cap_evicts_but_keeps_the_current_session(clock):
+    manager = SessionManager(max_bytes=4096)
+    for n in range(50):
+        manager.record_question(f"s{n}", "x" * 200)
+    stats = manager.stats()
+    assert stats["approx_bytes"] <= 4096
+    assert 0 < stats["sessions"] < 50
+    assert manager.profile("s49", create=False) is not None
+
+
+def test_recent_questions_are_a_ring(clock):
+    manager = SessionManager(recent=3)
+    for n in range(5):
+        manager.record_question("a", f"q{n}")
+    assert manager.profile("a")["previous_questions"] == ["q2", "q3", "q4"]
+
+
+def test_detected_type_sticks_until_another_is_detected(clock):
+    manager = SessionManager()
+    assert manager.record_question("a", "explain loops", "beginner") == "beginner"
+    assert manager.record_question("a", "thanks", "general") == "beginner"
+    assert manager.record_question("a", "my exam", "student") == "student"
+
+
+def test_snapshot_round_trip(clock, tmp_path):
+    path = str(tmp_path / "sessions.jsonl")
+    manager = SessionManager()
+    manager.record_question("a", "what is python", "beginner")
+    assert manager.save(path) == 1
+    restored = SessionManager(snapshot_path=path)
+    assert restored.profile("a") == manager.profile("a")
@@ -0,0 +1,124 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from singleflight import SingleFlight
+
+
+def run_threads(n, target):
+    threads = [threading.Thread(target=target) for _ in range(n)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+
+
+def test_threads_share_one_call():
+    flights = SingleFlight()
+    release = threading.Event()
+    calls, results = [], []
+
+    def fetch():
+        calls.append(1)
+        release.wait(5)
+        return "answer"
+
+    def caller():
+        results.append(flights.do("q", fetch))
+
+    starter = threading.Thread(target=caller)
+    starter.start()
+    while not flights.in_flight():
+        time.sleep(0.001)
+    waiters = [threading.Thread(target=caller) for _ in range(4)]
+    for thread in waiters:
+        thread.start()
+    while flights.coalesced < 4:
+        time.sleep(0.001)
+    release.set()
+    for thread in [starter, *waiters]:
+        thread.join(5)
+    assert calls == [1]
+    assert results == ["answer"] * 5
+    assert flights.in_flight() == 0
+
+
+def test_threads_all_get_the_error():
+    flights = SingleFlight()
+    release = threading.Event()
+    errors = []
+
+    def fetch():
+        release.wait(5)
+        raise ValueError("upstream broke")
+
+    def caller():
+        try:
+            flights.do("q", fetch)
+        except ValueError as e:
+            errors.append(str(e))
+
+    timer = threading.Timer(0.1, release.set)
+    timer.start()
+    run_threads(3, caller)
+    assert errors == ["upstream broke"] * 3
+
+
+def test_later_calls_run_again():
+    flights = SingleFlight()
+    assert flights.do("q", lambda: 1) == 1
+    assert flights.do("q", lambda: 2) == 2
+    assert flights.coalesced == 0
+
+
+def test_async_callers_share_one_call():
+    flights = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def main():
+        return await asyncio.gather(*(flights.do_async("q", fetch) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["answer"] * 5
+    assert calls == [1] and flights.coalesced == 4
+    assert flights.in_flight() == 0
+
+
+def test_cancelled_first_caller_does_not_cancel_the_others():
+    flights = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.05)
+        return "answer"
+
+    async def main():
+        first = asyncio.ensure_future(flights.do_async("q", fetch))
+        await asyncio.sleep(0)
+        second = asyncio.ensure_future(flights.do_async("q", fetch))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(main()) == "answer"
+
+
+def test_async_callers_all_get_the_error():
+    flights = SingleFlight()
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream broke")
+
+    async def main():
+        return await asyncio.gather(*(flights.do_async("q", fetch) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(main())
+    assert [str(e) for e in results] == ["upstream broke"] * 3
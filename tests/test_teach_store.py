@@ -0,0 +1,103 @@
+import io
+import json
+
+import pytest
+
+import teach_store
+from teach_store import TeachStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TeachStore(str(tmp_path / "teach.db"))
+    yield store
+    store.close()
+
+
+def pack(*lines):
+    return io.StringIO("\n".join(line if isinstance(line, str) else json.dumps(line) for line in lines) + "\n")
+
+
+def test_import_both_line_shapes(store):
+    stored, skipped = store.import_jsonl(pack(
+        {"question": "What is Rust?", "responses": {"general": "A language.", "Expert": "A systems language."}},
+        {"question": "what is go", "user_type": "student", "answer": "Another language."},
+        {"question": "what is zig", "answer": "Yet another."},
+    ))
+    assert (stored, skipped) == (4, 0)
+    assert store.get("what is rust?") == {"general": "A language.", "expert": "A systems language."}
+    assert store.get("what is go") == {"student": "Another language."}
+    assert store.get("what is zig") == {"general": "Yet another."}
+
+
+@pytest.mark.parametrize("line", [
+    "not json",
+    "[1, 2]",
+    {"answer": "no question"},
+    {"question": "no answer"},
+    {"question": "   ", "answer": "blank question"},
+    {"question": "list responses", "responses": ["a", "b"]},
+    {"question": "string responses", "responses": "a"},
+])
+def test_bad_lines_are_skipped(store, line):
+    stored, skipped = store.import_jsonl(pack(line, {"question": "good", "answer": "kept"}))
+    assert (stored, skipped) == (1, 1)
+    assert store.count_questions() == 1
+
+
+def test_blank_lines_are_ignored(store):
+    assert store.import_jsonl(io.StringIO("\n\n" + json.dumps({"question": "q", "answer": "a"}) + "\n\n")) == (1, 0)
+
+
+def test_import_batches_and_later_lines_win(store):
+    lines = [{"question": f"q{n % 7}", "answer": f"a{n}"} for n in range(30)]
+    assert store.import_jsonl(pack(*lines), batch_size=4) == (30, 0)
+    assert store.count_questions() == 7
+    assert store.get("q0") == {"general": "a28"}
+
+
+def test_export_round_trip(store, tmp_path):
+    store.import_jsonl(pack({"question": "what is rust", "responses": {"general": "g", "expert": "e"}}))
+    out = io.StringIO()
+    assert store.export_jsonl(out) == 1
+    other = TeachStore(str(tmp_path / "other.db"))
+    try:
+        other.import_jsonl(io.StringIO(out.getvalue()))
+        assert other.get("what is rust") == store.get("what is rust")
+    finally:
+        other.close()
+
+
+def test_ranked_match_on_very_long_questions(store):
+    store.set("hello world", "general", "hi")
+    question = "x" * 3000 + " hello world " + "y" * 3000
+    assert store.best_match(question) == "hello world"
+
+
+def test_store_is_off_without_env(monkeypatch):
+    monkeypatch.delenv("ALPHA_TEACH_DB", raising=False)
+    monkeypatch.setattr(teach_store, "_default_store", None)
+    monkeypatch.setattr(teach_store, "_disabled", False)
+    assert teach_store.get_store() is None
+
+
+def test_containment_uses_the_trigram_index(store):
+    if not store._fts:
+        pytest.skip("SQLite without FTS5 trigram")
+    store.import_jsonl(pack(*({"question": f"how do i use library {n} in production", "answer": "a"}
+                              for n in range(2000))))
+    sql, params = store._containment_query("library 1234")
+    plan = " ".join(row[-1] for row in store._db.execute("EXPLAIN QUERY PLAN " + sql, params))
+    # "INDEX 0:" alone is a full scan of the FTS table
+    assert "VIRTUAL TABLE INDEX 0:L" in plan
+    assert store.best_match("library 1234") == "how do i use library 1234 in production"
+    assert store.best_match("library 99999") is None
+
+
+def test_containment_with_like_wildcards(store):
+    store.set("what does 100% mean", "general", "all of it")
+    store.set("what is snake_case", "general", "a naming style")
+    store.set("what is snakescase", "general", "not a thing")
+    assert store.best_match("100% mean") == "what does 100% mean"
+    assert store.best_match("snake_case") == "what is snake_case"
+    assert store.best_match("10% mean") is None
@@ -0,0 +1,63 @@
+import json
+import os
+import threading
+import time
+import uuid
+
+# Conversation traces for load testing; benchmarks/load_test.py replays them
+# against the engine or server.py. With ALPHA_TRACE_FILE set, the CLI
+# appends one JSON line per event of its command loop:
+#
+#   {"session", "t", "op": "ask", "question"}
+#   {"session", "t", "op": "profile", "type"}
+#   {"session", "t", "op": "teach", "question", "user_type", "answer"}
+#
+# t is seconds since the session started, so replays keep think time.
+
+TRACE_PATH = os.getenv("ALPHA_TRACE_FILE") or None
+OPS = ("ask", "profile", "teach")
+
+
+class TraceRecorder:
+    """Appends one session's events to a JSONL trace file."""
+
+    def __init__(self, path, session=None):
+        self.path = path
+        self.session = session or uuid.uuid4().hex[:12]
+        self._start = time.monotonic()
+        self._out = None
+        self._lock = threading.Lock()
+
+    def record(self, op, **fields):
+        event = {"session": self.session, "t": round(time.monotonic() - self._start, 3), "op": op, **fields}
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        with self._lock:
+            if self._out is None:
+                self._out = open(self.path, "a", encoding="utf-8")
+            self._out.write(line)
+            self._out.flush()
+
+    def close(self):
+        with self._lock:
+            if self._out is not None:
+                self._out.close()
+                self._out = None
+
+
+def load(stream):
+    """{session: [events in time order]} from JSONL lines; unknown or broken lines are skipped."""
+    sessions = {}
+    for line in stream:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            event = json.loads(line)
+            if event["op"] not in OPS:
+                continue
+            sessions.setdefault(str(event["session"]), []).append(event)
+        except (ValueError, KeyError, TypeError):
+            continue
+    for events in sessions.values():
+        events.sort(key=lambda event: event.get("t", 0))
+    return sessions
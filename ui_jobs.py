@@ -0,0 +1,108 @@
+import os
+import threading
+
+# Process-wide background pool for Streamlit upstream calls. Button
+# callbacks submit a job and return at once; the session's polling fragment
+# shows partial output and collects the result. One pool is shared by every
+# session, so the number of threads blocked on network I/O is bounded no
+# matter how many users are connected.
+#
+#   ALPHA_UI_WORKERS       concurrent upstream calls (default 8)
+#   ALPHA_UI_QUEUE_LIMIT   jobs allowed to wait for a worker (default 32)
+
+WORKERS = int(os.getenv("ALPHA_UI_WORKERS", "8"))
+QUEUE_LIMIT = int(os.getenv("ALPHA_UI_QUEUE_LIMIT", "32"))
+
+
+class Job:
+    """One background call; partial streamed text is readable while it runs."""
+
+    __slots__ = ("label", "future", "chunks", "cancelled")
+
+    def __init__(self, label):
+        self.label = label
+        self.future = None
+        self.chunks = []
+        self.cancelled = False
+
+    def on_token(self, text):
+        if not self.cancelled:
+            self.chunks.append(text)
+
+    @property
+    def partial(self):
+        return "".join(self.chunks)
+
+    def done(self):
+        return self.cancelled or self.future.done()
+
+    def cancel(self):
+        """Drop the job. A call already in flight finishes but its result is discarded."""
+        self.cancelled = True
+        self.future.cancel()
+
+    def result(self):
+        """The call's return value; None when cancelled."""
+        if self.cancelled:
+            return None
+        return self.future.result()
+
+
+class JobPool:
+    """Bounded thread pool; submit() returns None when the pool and its queue are full."""
+
+    def __init__(self, workers=WORKERS, queue_limit=QUEUE_LIMIT):
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ui-job")
+        # running + queued jobs
+        self._slots = threading.BoundedSemaphore(workers + queue_limit)
+        self._lock = threading.Lock()
+        self.counters = {"submitted": 0, "rejected": 0, "cancelled": 0, "in_flight": 0}
+
+    def _count(self, name, delta=1):
+        with self._lock:
+            self.counters[name] += delta
+
+    def submit(self, label, fn, *args, stream=False, **kwargs):
+        """Run fn(*args, **kwargs) in the background; stream=True passes on_token=job.on_token."""
+        if not self._slots.acquire(blocking=False):
+            self._count("rejected")
+            return None
+        job = Job(label)
+        if stream:
+            kwargs["on_token"] = job.on_token
+        self._count("submitted")
+        self._count("in_flight")
+        job.future = self._executor.submit(self._run, job, fn, args, kwargs)
+        job.future.add_done_callback(lambda _future: self._release(job))
+        return job
+
+    def _run(self, job, fn, args, kwargs):
+        if job.cancelled:
+            return None
+        return fn(*args, **kwargs)
+
+    def _release(self, job):
+        if job.cancelled:
+            self._count("cancelled")
+        self._count("in_flight", -1)
+        self._slots.release()
+
+    def stats(self):
+        with self._lock:
+            return dict(self.counters, workers=self.workers)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """The shared pool, created on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = JobPool()
+        return _pool
@@ -0,0 +1,172 @@
+"""Pre-answer the most frequent questions that miss the custom responses.
+
+    python warmup.py --dry-run                      # show what would be answered
+    python warmup.py --top 100 --rate 30            # into the response cache (ALPHA_CACHE_DB)
+    python warmup.py --top 100 --into teach         # as taught answers (ALPHA_TEACH_DB)
+
+Reads the rotating question logs (question_log.py), counts questions per
+profile type after normalization (case, punctuation, spacing), and asks
+the model for the top-N misses of each type, at most --rate per minute, so
+that peak traffic for recurring questions is served locally. Questions
+answered since they were logged (taught, or already cached) are skipped.
+A cache warm-up from a separate process only helps other processes when
+the cache has its SQLite tier (ALPHA_CACHE_DB).
+
+With ALPHA_WARMUP=1, main.py and `python server.py` run the same job in
+a background thread at startup, filling their in-memory cache as well
+(importing server.py under a WSGI server does not).
+
+Env settings:
+  ALPHA_WARMUP             "1" warms up at startup (needs ALPHA_QUESTION_LOG)
+  ALPHA_WARMUP_TOP         questions per profile type (default 50)
+  ALPHA_WARMUP_RATE        upstream calls per minute (default 30)
+  ALPHA_WARMUP_INTO        cache or teach (default cache)
+  ALPHA_WARMUP_MAX_TOKENS  max_tokens of the warmed answers; must match the
+                           callers' for cache hits (default 256, as CLI/server)
+"""
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+import engine
+import question_log
+import response_cache
+
+ENABLED = os.getenv("ALPHA_WARMUP", "0") == "1"
+TOP = int(os.getenv("ALPHA_WARMUP_TOP", "50"))
+RATE = float(os.getenv("ALPHA_WARMUP_RATE", "30"))
+INTO = os.getenv("ALPHA_WARMUP_INTO", "cache")
+MAX_TOKENS = int(os.getenv("ALPHA_WARMUP_MAX_TOKENS", "256"))
+
+
+def aggregate(paths):
+    """{(profile, normalized question): Counter of raw forms} for logged custom-response misses."""
+    import json
+
+    groups = {}
+    for path in paths:
+        with open(path, encoding="utf-8") as stream:
+            for line in stream:
+                try:
+                    entry = json.loads(line)
+                    if entry.get("custom"):
+                        continue
+                    raw = str(entry["question"]).strip().lower()
+                    profile = str(entry.get("type") or "general")
+                except (ValueError, KeyError, TypeError, AttributeError):
+                    continue
+                normalized = response_cache.normalize_question(raw)
+                if normalized:
+                    groups.setdefault((profile, normalized), Counter())[raw] += 1
+    return groups
+
+
+def top_misses(paths, top=TOP, min_count=2):
+    """[(count, profile, question)] most frequent first, top per profile type.
+
+    question is the most common raw form of each normalized group.
+    """
+    per_profile = {}
+    for (profile, _), forms in aggregate(paths).items():
+        count = sum(forms.values())
+        if count >= min_count:
+            per_profile.setdefault(profile, []).append((count, profile, forms.most_common(1)[0][0]))
+    selected = []
+    for entries in per_profile.values():
+        entries.sort(key=lambda entry: (-entry[0], entry[2]))
+        selected.extend(entries[:top])
+    selected.sort(key=lambda entry: (-entry[0], entry[1], entry[2]))
+    return selected
+
+
+def warm(entries, api_key, into=INTO, rate=RATE, max_tokens=MAX_TOKENS, stop=None, log=None):
+    """Answer entries from top_misses() at most `rate` upstream calls/min; returns counts."""
+    counts = {"answered": 0, "skipped": 0, "errors": 0}
+    interval = 60.0 / rate if rate > 0 else 0.0
+    next_call = 0.0
+    for count, profile, question in entries:
+        if stop is not None and stop.is_set():
+            break
+        if engine.match_custom_response(question, profile):
+            counts["skipped"] += 1
+            continue
+        if into == "cache" and response_cache.get_cache().get(engine.cache_key_for(question, profile, max_tokens)):
+            counts["skipped"] += 1
+            continue
+        delay = next_call - time.monotonic()
+        if delay > 0 and (stop.wait(delay) if stop is not None else time.sleep(delay)):
+            break
+        next_call = time.monotonic() + interval
+        result = engine.call_deepseek_api(question, api_key, user_type=profile, max_tokens=max_tokens)
+        if "choices" not in result:
+            counts["errors"] += 1
+            if log:
+                log(f"error for {question!r} ({profile}): {result.get('error', 'Unknown error')}")
+            continue
+        if into == "teach":
+            engine.teach(question, profile, result["choices"][0]["message"]["content"])
+        counts["answered"] += 1
+        if log:
+            log(f"warmed {question!r} ({profile}, asked {count}x)")
+    return counts
+
+
+def start_background(api_key):
+    """Run the warm-up in a daemon thread when ALPHA_WARMUP=1; returns (thread, stop event) or None."""
+    log = question_log.get_log()
+    if not ENABLED or log is None or not api_key:
+        return None
+    stop = threading.Event()
+
+    def run():
+        warm(top_misses(log.files()), api_key, stop=stop)
+
+    thread = threading.Thread(target=run, name="warmup", daemon=True)
+    thread.start()
+    return thread, stop
+
+
+def main(argv=None):
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--log", action="append", help="log file (repeatable; default: ALPHA_QUESTION_LOG and its backups)")
+    parser.add_argument("--top", type=int, default=TOP, help="questions per profile type")
+    parser.add_argument("--min-count", type=int, default=2, help="ignore questions asked fewer times")
+    parser.add_argument("--rate", type=float, default=RATE, help="upstream calls per minute")
+    parser.add_argument("--into", choices=["cache", "teach"], default=INTO)
+    parser.add_argument("--max-tokens", type=int, default=MAX_TOKENS)
+    parser.add_argument("--dry-run", action="store_true", help="only list the questions")
+    args = parser.parse_args(argv)
+
+    paths = args.log
+    if not paths:
+        log = question_log.get_log()
+        if log is None:
+            parser.error("no --log given and ALPHA_QUESTION_LOG is unset")
+        paths = log.files()
+    entries = top_misses(paths, args.top, args.min_count)
+    if args.dry_run:
+        for count, profile, question in entries:
+            print(f"{count:>7}  {profile:<12} {question}")
+        return
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    api_key = os.getenv("OPENROUTER_API_KEY", "").strip()
+    if not api_key:
+        parser.error("OPENROUTER_API_KEY is not set")
+    if args.into == "cache" and not os.getenv("ALPHA_CACHE_DB"):
+        print("warning: ALPHA_CACHE_DB is unset; cached answers will be lost when this job exits", file=sys.stderr)
+    start = time.perf_counter()
+    counts = warm(entries, api_key, args.into, args.rate, args.max_tokens,
+                  log=lambda message: print(message, file=sys.stderr))
+    print(f"{len(entries)} questions in {time.perf_counter() - start:.1f}s ({counts['answered']} answered, "
+          f"{counts['skipped']} skipped, {counts['errors']} errors)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()